@@ -51,3 +51,10 @@ if __name__ == '__main__':
         pickle.dump(encode_list_known_with_ids, f)
 
     print('Encoding file saved')
+
+    # Pre-render everyone's greetings so the speaker never synthesizes them live
+    try:
+        from greeting_bundle import build_bundle
+        build_bundle(studentIds)
+    except Exception as e:
+        print(f"Greeting bundle not built: {e}")
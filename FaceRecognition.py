@@ -2,13 +2,16 @@ import os
 import threading
 
 import cv2
-import face_recognition
 import pickle
 
 import numpy as np
 from PyQt5.QtCore import pyqtSignal, QObject, QThread
 from PyQt5.QtGui import QImage
 
+from vision_pipeline import build_pipeline
+from vision_engine import VisionEngine
+from vision_sinks import Sink
+
 
 def encode_pickle(payload: str, file: str):
     data = []
@@ -18,9 +21,145 @@ def encode_pickle(payload: str, file: str):
     data.append(payload)
 
 
+class LatestFrameSlot:
+    """Single-slot mailbox between the vision thread and the UI thread.
+
+    The producer always replaces the pending frame with the newest one, so
+    a slow UI only ever sees the latest frame and at most one wake-up signal
+    is queued at a time. QImages own their pixels; frames the UI never took
+    and frames it hands back via recycle() are reused instead of allocated.
+    """
+
+    def __init__(self, spare=2):
+        self.lock = threading.Lock()
+        self.pending = None
+        self.signalled = False
+        self.free = []
+        self.spare = spare
+        self.published = 0
+        self.dropped = 0
+        self.taken = 0
+
+    def acquire(self, width, height):
+        """Producer: a QImage to draw the next frame into."""
+        with self.lock:
+            # UI is behind: take the undisplayed frame back and overwrite it
+            if self.pending is not None:
+                img, self.pending = self.pending, None
+                self.dropped += 1
+                if img.width() == width and img.height() == height:
+                    return img
+            while self.free:
+                img = self.free.pop()
+                if img.width() == width and img.height() == height:
+                    return img
+        return QImage(width, height, QImage.Format_RGB888)
+
+    def publish(self, img) -> bool:
+        """Producer: hand over a finished frame. True if the UI needs a wake-up signal."""
+        with self.lock:
+            self.pending = img
+            self.published += 1
+            if self.signalled:
+                return False
+            self.signalled = True
+            return True
+
+    def take(self):
+        """UI: latest frame (or None). The UI owns it until recycle()."""
+        with self.lock:
+            img, self.pending = self.pending, None
+            self.signalled = False
+            if img is not None:
+                self.taken += 1
+            return img
+
+    def recycle(self, img):
+        with self.lock:
+            if len(self.free) < self.spare:
+                self.free.append(img)
+
+
+def qimage_array(q_image):
+    """numpy (h, w, 3) view over an RGB888 QImage's own pixels, or None if rows are padded."""
+    width, height = q_image.width(), q_image.height()
+    if q_image.bytesPerLine() != width * 3:
+        return None
+    ptr = q_image.bits()
+    ptr.setsize(height * width * 3)
+    return np.frombuffer(ptr, np.uint8).reshape(height, width, 3)
+
+
+class QtSink(Sink):
+    """Annotates frames for the PyQt GUI and emits them through `thread`'s signals."""
+    name = 'qt'
+
+    def __init__(self, thread, avatar_path=r'Resources/avatar.png', faces_dir='images/faces'):
+        self.thread = thread
+        self.avatar_path = avatar_path
+        self.faces_dir = faces_dir
+        self.avatar = None
+        self.student_images = {}  # id -> BGR photo (read once)
+        self.last_name = None
+
+    def open(self):
+        # Default avatar if no face or unknown (read once, not every frame)
+        self.avatar = cv2.imread(self.avatar_path)
+
+    def student_image(self, person_id):
+        if person_id not in self.student_images:
+            img_path = os.path.join(self.faces_dir, f'{person_id}.jpg')
+            self.student_images[person_id] = cv2.imread(img_path) if os.path.exists(img_path) else None
+        img = self.student_images[person_id]
+        return img if img is not None else self.avatar
+
+    def publish(self, result):
+        frame = result.frame
+        height, width = frame.shape[:2]
+        slot = self.thread.frame_slot
+        # Convert straight into the QImage's own buffer (one copy, owned by Qt)
+        q_image = slot.acquire(width, height)
+        rgb = qimage_array(q_image)
+        in_place = rgb is not None
+        if in_place:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        else:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        student_name = "Unknown"
+        for (y1, x2, y2, x1), person_id in result.faces:
+            student_name = person_id
+            if person_id != "Unknown":
+                cv2.rectangle(rgb, (x1, y1), (x2, y2), (0, 255, 0), 2, cv2.LINE_AA)
+                cv2.putText(rgb, person_id, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+            else:
+                cv2.rectangle(rgb, (x1, y1), (x2, y2), (0, 0, 255), 2, cv2.LINE_AA)
+                cv2.putText(rgb, "Unknown", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (15, 0, 255), 2)
+
+        if not in_place:
+            # Padded QImage rows: fall back to an owning copy
+            q_image = QImage(rgb.data, width, height, 3 * width, QImage.Format_RGB888).copy()
+
+        # Latest frame wins; only wake the UI if it is not already due to look
+        if slot.publish(q_image):
+            self.thread.frame_ready.emit()
+
+        # Name/photo only change when the recognised person changes
+        if student_name != self.last_name:
+            self.last_name = student_name
+            image_student = self.avatar if student_name == "Unknown" else self.student_image(student_name)
+            if image_student is not None:
+                height, width, channels = image_student.shape
+                # cv2.imread reads in BGR, so use Format_BGR888 for image_student
+                q1_image = QImage(image_student.data, width, height, channels * width, QImage.Format_BGR888).copy()
+                self.thread.image_signal.emit(q1_image)
+            self.thread.name_signal.emit(student_name)
+        return True
+
+
 class FaceRecognitionThread(QThread):
-    # Signal for sending processed frames to UI.
-    frame_signal = pyqtSignal(QImage)
+    # Signal telling the UI a new frame is waiting in `frame_slot`.
+    frame_ready = pyqtSignal()
     name_signal = pyqtSignal(str)
     image_signal = pyqtSignal(QImage)
 
@@ -28,92 +167,15 @@ class FaceRecognitionThread(QThread):
         super(FaceRecognitionThread, self).__init__()
         self.stop_event = threading.Event()
         self.url = camera_url
+        self.engine = None
+        self.frame_slot = LatestFrameSlot()
 
     def run(self) -> None:
-        print("Loading Encoder File")
-        with open('images/encoded_file.p', 'rb') as f:
-            encode_list_known_with_ids = pickle.load(f)
-
-        encode_list_known, faceIds = encode_list_known_with_ids
-        print("Loaded Encoder File.")
-
-        known_faces = faceIds
-        known_encodings = encode_list_known
-
-        cap = cv2.VideoCapture(self.url)
-
-        while not self.stop_event.is_set():
-            # Read Frames
-            _, frame = cap.read()
-
-            if frame is None:
-                continue
-
-            print(frame.shape)
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            face_locations = face_recognition.face_locations(frame)
-            face_current_encodings = face_recognition.face_encodings(frame, face_locations)
-
-            student_name = "Unknown"
-            # Default avatar if no face or unknown
-            image_student = cv2.imread(r'Resources/avatar.png') 
-            
-            if not face_locations:
-                 # If no face detected, we still might want to show the camera feed
-                 pass
-
-            for face_location, face_encoding in zip(face_locations, face_current_encodings):
-                # Compare face encodings with known encodings
-                matches = face_recognition.compare_faces(known_encodings, face_encoding)
-                face_distance = face_recognition.face_distance(known_encodings, face_encoding)
-
-                match_index = np.argmin(face_distance)
-
-                if matches[match_index]:
-                    print(f"Known face detected: {known_faces[match_index]}")
-                    # Check if file exists before reading
-                    img_path = f'images/{known_faces[match_index]}.jpg'
-                    if os.path.exists(img_path):
-                        image_student = cv2.imread(img_path)
-                    
-                    student_name = known_faces[match_index]
-                    y1, x2, y2, x1 = face_location
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2, cv2.LINE_AA)
-                    cv2.putText(frame, known_faces[match_index], (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                                0.9, (0, 255, 0), 2)
-                    cv2.putText(frame, "Listening...", (0, 0), cv2.FONT_HERSHEY_SIMPLEX,
-                                0.5, (0, 255, 0), 1)
-                else:
-                    # image_student is already set to avatar.png
-                    student_name = "Unknown"
-                    print("Unrecognised Face Found")
-                    y1, x2, y2, x1 = face_location
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2, cv2.LINE_AA)
-                    cv2.putText(frame, "Unknown", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                                0.5, (15, 0, 255), 2)
-            
-            # Frame
-            height, width, channels = frame.shape
-            bytes_per_line = channels * width
-            # Frame is RGB now, so use Format_RGB888
-            q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            
-            # Student Image
-            if image_student is not None:
-                height, width, channels = image_student.shape
-                bytes_per_line = channels * width
-                # cv2.imread reads in BGR, so use Format_BGR888 for image_student
-                q1_image = QImage(image_student.data, width, height, bytes_per_line, QImage.Format_BGR888)
-                self.image_signal.emit(q1_image)
-
-            # Emit the frame signal to update UI
-            self.frame_signal.emit(q_image)
-            self.name_signal.emit(student_name)
+        # Same downscaled, frame-skipped pipeline as the kiosk (main.py)
+        self.engine = VisionEngine(build_pipeline(), source=self.url, sinks=[QtSink(self)],
+                                   publish_state=False)
+        self.engine.stop_event = self.stop_event
+        self.engine.run()
 
     def stop(self):
         self.stop_event.set()
-
-
-
-
@@ -0,0 +1,275 @@
+"""
+Attendance / event log backed by SQLite.
+
+The vision loop only ever calls `record_sighting()` / `log_event()`, which
+put a tuple on a bounded in-memory queue (constant time, never touches the
+disk, drops and counts events if the writer falls behind). A background
+writer thread drains the queue in batches, one transaction per batch, into
+an SQLite database in WAL mode so readers (voice commands, reports) never
+block it.
+
+Repeat sightings of the same person are collapsed into visit intervals:
+a sighting within VISIT_GAP seconds of that person's last one extends the
+open visit instead of adding a row.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, time as dtime
+
+from vision_sinks import Sink
+import metrics
+
+ATTENDANCE_DB = os.environ.get('OMNIS_ATTENDANCE_DB', 'attendance.db')
+VISIT_GAP = float(os.environ.get('OMNIS_VISIT_GAP', '300'))   # 5 min without a sighting ends a visit
+QUEUE_SIZE = 4096
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    person TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    sightings INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_visits_first_seen ON visits(first_seen);
+CREATE INDEX IF NOT EXISTS idx_visits_person ON visits(person, first_seen);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    person TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+"""
+
+_SIGHTING = 0
+_EVENT = 1
+_FLUSH = 2
+_STOP = 3
+
+
+def _day_start(day=None):
+    day = day or datetime.now().date()
+    return datetime.combine(day, dtime.min).timestamp()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class AttendanceLog(threading.Thread):
+    def __init__(self, path=ATTENDANCE_DB, visit_gap=VISIT_GAP, queue_size=QUEUE_SIZE):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.path = path
+        self.visit_gap = visit_gap
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0   # Queue full
+        self.written = 0   # Rows committed
+        self.lost = 0      # Rows that failed to write
+        self.open_visits = {}  # person -> (visit row id, last_seen), writer thread only
+
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.commit()
+        conn.close()
+        self._reader = None
+        self._reader_lock = threading.Lock()
+
+    # --- Producer side (vision loop): O(1), never blocks ---
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def record_sighting(self, person, ts=None):
+        return self._put((_SIGHTING, ts or time.time(), person, None))
+
+    def log_event(self, kind, person=None, detail=None, ts=None):
+        return self._put((_EVENT, ts or time.time(), kind, (person, detail)))
+
+    # --- Writer thread ---
+
+    def run(self):
+        conn = _connect(self.path)
+        self._load_open_visits(conn)
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=FLUSH_INTERVAL)]
+            except queue.Empty:
+                continue
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Markers first, so a failed write can never strand a flush() or stop()
+            waiters = [a for kind, _, a, _ in batch if kind == _FLUSH]
+            if any(kind == _STOP for kind, _, _, _ in batch):
+                running = False
+            rows = [item for item in batch if item[0] in (_SIGHTING, _EVENT)]
+
+            t0 = time.perf_counter()
+            if rows:
+                try:
+                    with conn:
+                        for item in rows:
+                            self._write(conn, item)
+                    self.written += len(rows)
+                except sqlite3.Error as e:
+                    print(f"[attendance] Write error: {e}, retrying {len(rows)} rows one by one")
+                    self._write_each(conn, rows)
+                metrics.observe('attendance_write', time.perf_counter() - t0)
+            for event in waiters:
+                event.set()
+        conn.close()
+
+    def _write(self, conn, item):
+        kind, ts, a, b = item
+        if kind == _SIGHTING:
+            self._write_sighting(conn, a, ts)
+        else:
+            person, detail = b
+            conn.execute("INSERT INTO events (ts, kind, person, detail) VALUES (?, ?, ?, ?)",
+                         (ts, a, person, detail))
+
+    def _write_each(self, conn, rows):
+        """After a failed batch: one transaction per row, so one bad row does not lose the rest."""
+        self.open_visits.clear()  # Re-read rather than trust the cache (the rollback undid its updates)
+        self._load_open_visits(conn)
+        lost = 0
+        for item in rows:
+            try:
+                with conn:
+                    self._write(conn, item)
+                self.written += 1
+            except sqlite3.Error as e:
+                lost += 1
+                self._load_open_visits(conn)
+                print(f"[attendance] Dropped {'sighting' if item[0] == _SIGHTING else 'event'} ({e})")
+        if lost:
+            self.lost += lost
+            metrics.inc('attendance_lost', lost)
+
+    def _load_open_visits(self, conn):
+        try:
+            rows = conn.execute("SELECT person, id, MAX(last_seen) FROM visits WHERE last_seen > ? GROUP BY person",
+                                (time.time() - self.visit_gap,)).fetchall()
+            self.open_visits = {person: (row_id, last) for person, row_id, last in rows}
+        except sqlite3.Error:
+            self.open_visits = {}
+
+    def _write_sighting(self, conn, person, ts):
+        open_visit = self.open_visits.get(person)
+        # abs(): cameras' recognition workers deliver sightings slightly out of timestamp order
+        if open_visit and abs(ts - open_visit[1]) <= self.visit_gap:
+            row_id = open_visit[0]
+            conn.execute("UPDATE visits SET first_seen = MIN(first_seen, ?), last_seen = MAX(last_seen, ?), "
+                         "sightings = sightings + 1 WHERE id = ?", (ts, ts, row_id))
+            ts = max(open_visit[1], ts)
+        else:
+            cur = conn.execute("INSERT INTO visits (person, first_seen, last_seen) VALUES (?, ?, ?)", (person, ts, ts))
+            row_id = cur.lastrowid
+        self.open_visits[person] = (row_id, ts)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is committed (for tests/reports, not the vision loop)."""
+        done = threading.Event()
+        try:
+            self.queue.put((_FLUSH, 0, done, None), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self):
+        try:
+            self.queue.put((_STOP, 0, None, None), timeout=2)
+        except queue.Full:
+            pass
+
+    def close(self, timeout=5.0):
+        """Stop once everything queued so far is written, and wait for the writer to finish."""
+        if self.is_alive():
+            self.stop()
+            self.join(timeout)
+
+    # --- Queries (any thread; WAL readers do not block the writer) ---
+
+    def _query(self, sql, args=()):
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = _connect(self.path)
+            return self._reader.execute(sql, args).fetchall()
+
+    def present_today(self, day=None):
+        """[(person, first_seen, last_seen)] for everyone seen on `day` (default today)."""
+        start = _day_start(day)
+        return self._query(
+            "SELECT person, MIN(first_seen), MAX(last_seen) FROM visits "
+            "WHERE first_seen >= ? AND first_seen < ? GROUP BY person ORDER BY MIN(first_seen)",
+            (start, start + 86400))
+
+    def first_seen(self, person, day=None):
+        """Timestamp `person` was first seen on `day` (default today), or None."""
+        start = _day_start(day)
+        rows = self._query("SELECT MIN(first_seen) FROM visits WHERE person = ? AND first_seen >= ? AND first_seen < ?",
+                           (person, start, start + 86400))
+        return rows[0][0] if rows else None
+
+    def visits(self, person, since=0):
+        return self._query("SELECT first_seen, last_seen, sightings FROM visits WHERE person = ? AND last_seen >= ? "
+                           "ORDER BY first_seen", (person, since))
+
+
+class AttendanceSink(Sink):
+    """Pushes a sighting for every recognised face whenever recognition runs."""
+    name = 'attendance'
+
+    def __init__(self, log, include_unknown=False):
+        self.log = log
+        self.include_unknown = include_unknown
+
+    def open(self):
+        if self.log.ident is None:
+            self.log.start()
+
+    def publish(self, result):
+        if result.refreshed:
+            now = time.time()
+            for i, (_, person_id) in enumerate(result.faces):
+                if person_id != "Unknown":
+                    self.log.record_sighting(person_id, now)
+                elif self.include_unknown:
+                    # Log strangers under their temporary visitor id when there is one
+                    visitor = result.visitors[i] if i < len(result.visitors) else None
+                    self.log.record_sighting(visitor or person_id, now)
+        return True
+
+    def close(self):
+        self.log.close()
+
+
+_attendance = None
+
+
+def init_attendance(path=ATTENDANCE_DB):
+    global _attendance
+    if _attendance is None:
+        _attendance = AttendanceLog(path)
+        _attendance.start()
+    return _attendance
@@ -0,0 +1,211 @@
+"""
+Audio device discovery, probed once and kept in a profile on disk.
+
+Finding the devices used to happen over and over: the speaker checked
+/proc/asound/card1 and rewrote AUDIODEV/SDL_* before every utterance, and
+the speech thread listed every microphone and tried each index with a
+one-second calibration on every open. On the Pi that made startup (and
+recovery after a USB hiccup) take several seconds.
+
+get_profile() now does it once. The result is saved to PROFILE_FILE
+(JSON) together with a fingerprint of the attached sound hardware (the
+/proc/asound/cards listing, or the PortAudio device names elsewhere) and
+the OMNIS_AUDIO_DEVICE / OMNIS_MIC_DEVICE settings. A later start with the
+same fingerprint reuses the profile without opening PortAudio; a changed
+fingerprint (speaker or mic plugged in or out, setting changed) triggers a
+new probe. Reconnect paths pass recheck=True, which re-reads the
+fingerprint and only probes if it changed.
+
+The profile holds:
+
+- output: PortAudio index and name of the speaker stream (audio_out.py)
+- inputs: input-capable PortAudio indices, preferred first
+- microphone: the index that last opened, with its calibrated energy
+  threshold (filled in by sr_class.py), so the next start skips the
+  calibration
+- alsa_device: the ALSA name for mpg123 / SDL when there is no stream
+
+Discovery time is recorded as `audio_discovery`; probes and profile hits
+are counted as audio_profile_probe / audio_profile_hit.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import metrics
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+PROFILE_FILE = os.environ.get('OMNIS_AUDIO_PROFILE', 'audio_profile.json')
+AUDIO_DEVICE = os.environ.get('OMNIS_AUDIO_DEVICE', '')  # Speaker: PortAudio index or name fragment
+MIC_DEVICE = os.environ.get('OMNIS_MIC_DEVICE', '')      # Microphone: same
+CARDS_FILE = '/proc/asound/cards'
+USB_CARD = '/proc/asound/card1'  # The Pi's USB speakers show up as card 1
+
+
+def find_device(pa, spec='', output=True):
+    """PortAudio index for `spec` (index, name fragment or '' for the first USB device), or None for the default."""
+    if spec.isdigit():
+        return int(spec)
+    channels = 'maxOutputChannels' if output else 'maxInputChannels'
+    wanted = spec.lower() or 'usb'
+    for i in range(pa.get_device_count()):
+        info = pa.get_device_info_by_index(i)
+        if info.get(channels, 0) > 0 and wanted in info.get('name', '').lower():
+            return i
+    if spec:
+        print(f"⚠️ Audio device '{spec}' not found, using the default {'output' if output else 'input'}")
+    return None
+
+
+def find_output_device(pa, spec=AUDIO_DEVICE):
+    return find_device(pa, spec, output=True)
+
+
+def _device_names(pa):
+    return [pa.get_device_info_by_index(i).get('name', '') for i in range(pa.get_device_count())]
+
+
+def hardware_fingerprint():
+    """Short hash of the attached sound hardware and the device settings."""
+    try:
+        with open(CARDS_FILE) as f:
+            listing = f.read()
+    except OSError:
+        listing = ''
+        if pyaudio is not None:
+            pa = pyaudio.PyAudio()
+            try:
+                listing = '\n'.join(_device_names(pa))
+            finally:
+                pa.terminate()
+    raw = '\0'.join((listing, AUDIO_DEVICE, MIC_DEVICE))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def probe():
+    """Enumerate the devices and pick the speaker and microphone candidates."""
+    t0 = time.perf_counter()
+    profile = {
+        'output': None,
+        'inputs': [],
+        'microphone': None,
+        'alsa_device': 'hw:1,0' if os.path.exists(USB_CARD) else 'default',
+        'probed_at': time.time(),
+    }
+    if pyaudio is not None:
+        pa = pyaudio.PyAudio()
+        try:
+            names = _device_names(pa)
+            out = find_device(pa, AUDIO_DEVICE, output=True)
+            if out is not None and out < len(names):
+                profile['output'] = {'index': out, 'name': names[out]}
+            preferred = find_device(pa, MIC_DEVICE, output=False)
+            inputs = [i for i in range(len(names))
+                      if pa.get_device_info_by_index(i).get('maxInputChannels', 0) > 0]
+            if preferred in inputs:
+                inputs.remove(preferred)
+                inputs.insert(0, preferred)
+            profile['inputs'] = inputs
+        except Exception as e:
+            print(f"⚠️ Audio probe failed: {e}")
+        finally:
+            pa.terminate()
+    metrics.observe('audio_probe', time.perf_counter() - t0)
+    return profile
+
+
+def load_profile(path=PROFILE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Audio profile not loaded: {e}")
+        return None
+
+
+def save_profile(profile, path=PROFILE_FILE):
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(profile, f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Audio profile not saved: {e}")
+
+
+def apply_env(profile):
+    """Point SDL / mpg123-style players at the profile's ALSA device (once, not per utterance)."""
+    if profile['alsa_device'] != 'default':
+        os.environ['AUDIODEV'] = profile['alsa_device']
+        os.environ['SDL_PATH_ALSA_DEVICE'] = profile['alsa_device']
+        os.environ['SDL_ALSA_DEVICE'] = profile['alsa_device']
+
+
+_profile = None
+_lock = threading.Lock()
+
+
+def get_profile(refresh=False, recheck=False, path=PROFILE_FILE):
+    """The device profile: from memory, from disk if the hardware is unchanged, else a fresh probe.
+
+    refresh=True always probes; recheck=True re-reads the hardware fingerprint (for reconnects).
+    """
+    global _profile
+    with _lock:
+        if _profile is not None and not refresh and not recheck:
+            return _profile
+        t0 = time.perf_counter()
+        fingerprint = hardware_fingerprint()
+        if not refresh and _profile is not None and _profile.get('fingerprint') == fingerprint:
+            return _profile
+        profile = None if refresh else load_profile(path)
+        if profile is not None and profile.get('fingerprint') == fingerprint:
+            source = 'profile'
+            metrics.inc('audio_profile_hit')
+        else:
+            source = 'probe'
+            metrics.inc('audio_profile_probe')
+            profile = probe()
+            profile['fingerprint'] = fingerprint
+            save_profile(profile, path)
+        _profile = profile
+        apply_env(profile)
+        dt = time.perf_counter() - t0
+        metrics.observe('audio_discovery', dt)
+        out = profile['output']
+        print(f"🎚️ Audio devices from {source} in {dt * 1000:.0f} ms: "
+              f"out {out['name'] if out else 'default'}, alsa {profile['alsa_device']}")
+        return profile
+
+
+def update_profile(path=PROFILE_FILE, **fields):
+    """Record something learned at run time (e.g. the working microphone) in the saved profile."""
+    with _lock:
+        if _profile is None:
+            return
+        _profile.update(fields)
+        save_profile(_profile, path)
+
+
+def output_device(pa, recheck=False):
+    """PortAudio index of the speaker output, or None for the default."""
+    profile = get_profile(recheck=recheck)
+    out = profile['output']
+    if out is None:
+        return None
+    try:
+        if pa.get_device_info_by_index(out['index']).get('name') == out['name']:
+            return out['index']
+    except (OSError, ValueError, IOError):
+        pass
+    # Same cards, different PortAudio numbering: look again
+    out = get_profile(refresh=True)['output']
+    return out['index'] if out else None
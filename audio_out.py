@@ -0,0 +1,192 @@
+"""
+In-memory audio playback through one long-lived output stream.
+
+The old path wrote every utterance to an MP3 file, spawned mpg123 (or
+loaded it with pygame) and deleted the file: a process start and an ALSA
+device open per sentence, hundreds of milliseconds on the Pi.
+AudioOutput instead opens a single PyAudio stream (16-bit mono at
+AUDIO_RATE) once and keeps it open. MP3 bytes are decoded to PCM in
+memory with miniaudio (falling back to an `mpg123 -s` pipe) on the
+prefetch thread, so the playback thread only writes samples.
+
+Writes go in BLOCK-frame pieces, so stop() (speaker interrupt) takes
+effect within ~40 ms. play() returns once the samples are queued;
+drain() waits for the device to play them, so the speaker can tell when
+speech has really ended. That wait is an estimate (the stream's reported
+output latency plus one block): a blocking PortAudio stream has no
+"played" notification, so the end edge can be off by about a block on
+devices that misreport their latency.
+
+If a reopen has to fall back to another rate, PCM decoded for the old
+rate is resampled in play() (callers pass the rate they decoded at), so
+chunks queued before the switch keep their pitch. If the device goes away the stream is reopened on
+the next write.
+
+OMNIS_AUDIO_DEVICE picks the output: a PortAudio device index, or part of
+its name (e.g. "USB"). When unset, the first output device with "USB" in
+its name is used (the Pi's speakers), otherwise the system default. The
+choice comes from the saved device profile (audio_devices.py), so a normal
+start does not enumerate the devices again; a reopen after an output error
+re-initialises PortAudio and re-probes only if the hardware changed
+(`audio_reconnect`).
+"""
+import os
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from audio_devices import AUDIO_DEVICE, find_output_device, output_device
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+try:
+    import miniaudio
+except ImportError:
+    miniaudio = None
+
+AUDIO_RATE = int(os.environ.get('OMNIS_AUDIO_RATE', '24000'))  # gTTS speaks at 24 kHz
+FALLBACK_RATES = (48000, 44100)  # Tried when the device will not open at AUDIO_RATE
+BLOCK = 1024                     # Frames per write (~43 ms at 24 kHz)
+
+
+def resample_pcm(pcm, src_rate, dst_rate):
+    """16-bit mono PCM from `src_rate` to `dst_rate` (linear interpolation; plenty for speech)."""
+    if src_rate == dst_rate or not pcm:
+        return pcm
+    samples = np.frombuffer(pcm, np.int16)
+    n = int(len(samples) * dst_rate / src_rate)
+    positions = np.arange(n) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16).tobytes()
+
+
+def decode_mp3(data, rate=AUDIO_RATE):
+    """MP3 bytes -> 16-bit mono PCM bytes at `rate`."""
+    with metrics.timed('audio_decode'):
+        if miniaudio is not None:
+            decoded = miniaudio.decode(data, output_format=miniaudio.SampleFormat.SIGNED16,
+                                       nchannels=1, sample_rate=rate)
+            return decoded.samples.tobytes()
+        out = subprocess.run(['mpg123', '-q', '-s', '-m', '-r', str(rate), '-e', 's16', '-'],
+                             input=data, capture_output=True, timeout=30)
+        if out.returncode != 0:
+            raise RuntimeError(f"mpg123 decode failed ({out.returncode})")
+        return out.stdout
+
+
+class AudioOutput:
+    def __init__(self, device=AUDIO_DEVICE, rate=AUDIO_RATE):
+        self.device_spec = device
+        self.rate = rate
+        self.pa = None
+        self.stream = None
+        self.device = None
+        self.lock = threading.Lock()  # One writer at a time
+        self.open()
+
+    def open(self, reconnect=False):
+        t0 = time.perf_counter()
+        if self.pa is None:
+            self.pa = pyaudio.PyAudio()
+        if self.device_spec == AUDIO_DEVICE:
+            self.device = output_device(self.pa, recheck=reconnect)
+        else:
+            self.device = find_output_device(self.pa, self.device_spec)
+        for rate in (self.rate,) + tuple(r for r in FALLBACK_RATES if r != self.rate):
+            try:
+                self.stream = self.pa.open(format=pyaudio.paInt16, channels=1, rate=rate, output=True,
+                                           output_device_index=self.device, frames_per_buffer=BLOCK)
+                self.rate = rate
+                break
+            except (OSError, ValueError):
+                continue
+        else:
+            raise OSError(f"Could not open audio output (device {self.device})")
+        metrics.observe('audio_reconnect' if reconnect else 'audio_open', time.perf_counter() - t0)
+        print(f"🔊 Audio out: device {'default' if self.device is None else self.device} at {self.rate} Hz")
+
+    def decode(self, data, rate=None):
+        return decode_mp3(data, rate or self.rate)
+
+    def play(self, pcm, stop=None, rate=None):
+        """Write PCM (decoded at `rate`, default the stream's) and return once it is queued or `stop` is set."""
+        step = BLOCK * 2
+        with self.lock:
+            if rate and rate != self.rate:
+                pcm = resample_pcm(pcm, rate, self.rate)
+            rate = self.rate
+            i = 0
+            while i < len(pcm):
+                if stop is not None and stop.is_set():
+                    return
+                try:
+                    self.stream.write(pcm[i:i + step], exception_on_underflow=False)
+                except OSError as e:
+                    print(f"[audio] Output error ({e}), reopening")
+                    metrics.inc('audio_reopen')
+                    self._reopen()
+                    if self.rate != rate:  # Fell back to another rate: convert what is left
+                        pcm, i = resample_pcm(pcm[i:], rate, self.rate), 0
+                        rate = self.rate
+                    self.stream.write(pcm[i:i + step], exception_on_underflow=False)
+                i += step
+
+    def drain(self, stop=None):
+        """Wait until the audio already written has been played (or `stop` is set).
+
+        Estimated from the output latency plus one block, not reported by the device.
+        """
+        try:
+            pending = self.stream.get_output_latency() + BLOCK / self.rate
+        except (AttributeError, OSError):
+            return
+        if stop is not None:
+            stop.wait(pending)
+        else:
+            time.sleep(pending)
+
+    def _reopen(self):
+        try:
+            self.stream.close()
+        except Exception:
+            pass
+        try:
+            self.pa.terminate()  # PortAudio only sees replugged devices after a fresh init
+        except Exception:
+            pass
+        self.pa = None
+        self.open(reconnect=True)
+
+    def close(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.stop_stream()
+                self.stream.close()
+                self.stream = None
+            if self.pa is not None:
+                self.pa.terminate()
+                self.pa = None
+
+
+_output = None
+_failed = False
+
+
+def init_audio_output(**kwargs):
+    """The shared AudioOutput, or None when PyAudio is missing or no device opens."""
+    global _output, _failed
+    if _output is None and not _failed:
+        if pyaudio is None:
+            _failed = True
+            print("⚠️ PyAudio not installed: playing speech through mpg123/pygame")
+            return None
+        try:
+            _output = AudioOutput(**kwargs)
+        except Exception as e:
+            _failed = True
+            print(f"⚠️ Audio output not available ({e}): playing speech through mpg123/pygame")
+    return _output
@@ -0,0 +1,44 @@
+"""
+Throughput benchmark for attendance.py.
+
+Pushes N sightings (a rotating cast of people, as the vision loop would)
+and reports the producer-side cost per enqueue plus the sustained rate at
+which the writer thread commits them to SQLite.
+
+Usage: python bench_attendance.py [events]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from attendance import AttendanceLog
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    people = [f"Person {i}" for i in range(40)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = AttendanceLog(os.path.join(tmp, 'bench.db'), queue_size=n + 10)
+        log.start()
+
+        base = time.time()
+        t0 = time.perf_counter()
+        for i in range(n):
+            log.record_sighting(people[i % len(people)], base + i * 0.01)
+        t_enqueue = time.perf_counter() - t0
+
+        log.flush(timeout=600)
+        t_total = time.perf_counter() - t0
+
+        visits = sum(len(log.visits(p)) for p in people)
+        print(f"{n} sightings from {len(people)} people")
+        print(f"enqueue:   {t_enqueue * 1e9 / n:8.0f} ns/event (vision loop cost), dropped={log.dropped}")
+        print(f"committed: {n / t_total:8.0f} events/s sustained ({t_total:.2f} s)")
+        print(f"collapsed into {visits} visit rows, present today: {len(log.present_today())}")
+        log.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+speak() -> first sample latency for acknowledgements from the earcon bank.
+
+Runs an idle GTTSThread offline with a stand-in audio output that records
+when each clip reaches it. "Yes?" (an earcon phrase) and a listen_start
+tone are compared with a short phrase that is not in the bank and goes
+through the prefetch thread and the TTS cache (stub backend, no network).
+Target: earcons well under 50 ms.
+
+Usage: python bench_earcons.py [rounds]
+"""
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from speaker import GTTSThread
+from tts_cache import StubBackend, TTSCache
+
+
+class RecordingOutput:
+    rate = 24000
+
+    def __init__(self):
+        self.played = threading.Event()
+        self.at = None
+
+    def decode(self, data, rate=None):
+        return data  # Stub audio: pretend it is PCM already
+
+    def play(self, pcm, stop=None, rate=None):
+        self.at = time.perf_counter()
+        self.played.set()
+
+    def drain(self, stop=None):
+        pass
+
+
+def measure(speaker, output, action, rounds):
+    times = []
+    for _ in range(rounds):
+        output.played.clear()
+        t0 = time.perf_counter()
+        action()
+        output.played.wait(5)
+        times.append(output.at - t0)
+        time.sleep(0.01)
+    return statistics.median(times) * 1000, max(times) * 1000
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    root = tempfile.mkdtemp(prefix='omnis_earcons_')
+    try:
+        output = RecordingOutput()
+        cache = TTSCache(root=root, backend=StubBackend(delay=0.3))
+        speaker = GTTSThread(cache=cache, output=output, offline=False, bundle=False)
+        speaker.daemon = True
+        speaker.start()
+        time.sleep(1.0 + 0.3 * len(speaker.earcons.phrases))  # Bank loads in the background
+
+        cases = [
+            ("earcon 'Yes?'", lambda: speaker.speak("Yes?", 'urgent')),
+            ("tone listen_start", lambda: speaker.earcon('listen_start')),
+            ("cached phrase", lambda: speaker.speak("One moment while I look that up.", 'urgent')),
+        ]
+        for label, action in cases:
+            median, worst = measure(speaker, output, action, rounds)
+            print(f"{label:18s}: median {median:6.2f} ms, worst {worst:6.2f} ms")
+        speaker.stop()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
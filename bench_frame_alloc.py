@@ -0,0 +1,114 @@
+"""
+Allocation benchmark for the capture -> resize -> colour-convert -> paste path.
+
+Compares the old per-frame path in main.py (new arrays from cap.read(),
+cv2.resize, cv2.cvtColor and np.zeros) against FrameBufferPool, using
+tracemalloc. No camera needed: frames come from a synthetic source that
+behaves like cv2.VideoCapture.read().
+
+Usage: python bench_frame_alloc.py [frames]
+"""
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frame_buffers import FrameBufferPool
+
+RESIZE_FACTOR = 0.20
+
+
+class SyntheticCapture:
+    """Mimics cv2.VideoCapture.read(): allocates unless given a buffer."""
+
+    def __init__(self, width=640, height=480, drop_every=0):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        self.count = 0
+        self.drop_every = drop_every
+
+    def read(self, image=None):
+        self.count += 1
+        if self.drop_every and self.count % self.drop_every == 0:
+            return False, None
+        src = self.frames[self.count % len(self.frames)]
+        if image is not None and image.shape == src.shape:
+            np.copyto(image, src)
+            return True, image
+        return True, src.copy()
+
+
+def legacy_frame(cap, background):
+    success, img = cap.read()
+    if not success or img is None:
+        img = np.zeros((480, 640, 3), np.uint8)
+    imgS = cv2.resize(img, (0, 0), None, RESIZE_FACTOR, RESIZE_FACTOR)
+    imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
+    background[162:162+480, 55:55+640] = img
+    return imgS
+
+
+def pooled_frame(cap, pool, cam_view):
+    success, img = pool.read(cap)
+    imgS = pool.downscale(img)
+    np.copyto(cam_view, img)
+    return imgS
+
+
+def measure(step, frames):
+    # Warm up (first calls allocate OpenCV internals / the pool itself)
+    for _ in range(10):
+        step()
+
+    tracemalloc.start()
+    base_current, _ = tracemalloc.get_traced_memory()
+    per_frame = []
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        step()
+        _, peak = tracemalloc.get_traced_memory()
+        per_frame.append(peak - before)
+    elapsed = time.perf_counter() - t0
+    end_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'mean_bytes': sum(per_frame) / len(per_frame),
+        'max_bytes': max(per_frame),
+        'frames_allocating': sum(1 for b in per_frame if b > 1024),
+        'retained_bytes': end_current - base_current,
+        'ms_per_frame': elapsed * 1000 / frames,
+    }
+
+
+def report(label, r, frames):
+    print(f"{label:<8} {r['mean_bytes'] / 1024:10.1f} KiB/frame (mean)  "
+          f"{r['max_bytes'] / 1024:10.1f} KiB (max)  "
+          f"{r['frames_allocating']:5d}/{frames} frames > 1 KiB  "
+          f"{r['ms_per_frame']:6.2f} ms/frame")
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    background = np.zeros((720, 1280, 3), np.uint8)
+    cap = SyntheticCapture(drop_every=50)
+    legacy = measure(lambda: legacy_frame(cap, background), frames)
+
+    background = np.zeros((720, 1280, 3), np.uint8)
+    cap = SyntheticCapture(drop_every=50)
+    pool = FrameBufferPool(640, 480, RESIZE_FACTOR)
+    cam_view = background[162:162+480, 55:55+640]
+    pooled = measure(lambda: pooled_frame(cap, pool, cam_view), frames)
+
+    print(f"Frame path allocations over {frames} frames (tracemalloc peak per frame)")
+    report("before", legacy, frames)
+    report("after", pooled, frames)
+
+
+if __name__ == '__main__':
+    main()
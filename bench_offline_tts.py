@@ -0,0 +1,50 @@
+"""
+Per-phrase latency of the offline TTS engines in offline_tts.py.
+
+Renders the short phrases the speaker can send to espeak-ng ("Yes?", "Ok, I
+am listening.", ...) with each available engine and reports the median and
+worst time from text to PCM ready for the audio stream:
+
+    spawn    one espeak-ng process per phrase (the old speak_offline path)
+    library  libespeak-ng loaded once, kept initialised
+
+Engines that are not installed are skipped.
+
+Usage: python bench_offline_tts.py [rounds]
+"""
+import statistics
+import sys
+import time
+
+from audio_out import AUDIO_RATE
+from offline_tts import EspeakLibrary, EspeakProcess, OfflineTTS
+
+PHRASES = ["Yes?", "Ok, I am listening.", "I didn't catch a name.", "Hello Arjun!", "Welcome."]
+
+
+def run(engine, rounds):
+    tts = OfflineTTS(engine)
+    tts.pcm("Warm up.", AUDIO_RATE)
+    times = []
+    for _ in range(rounds):
+        for phrase in PHRASES:
+            t0 = time.perf_counter()
+            tts.pcm(phrase, AUDIO_RATE)
+            times.append(time.perf_counter() - t0)
+    return statistics.median(times), max(times)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for cls in (EspeakProcess, EspeakLibrary):
+        try:
+            engine = cls()
+        except OSError as e:
+            print(f"{cls.name:8s}: skipped ({e})")
+            continue
+        median, worst = run(engine, rounds)
+        print(f"{cls.name:8s}: median {median * 1000:6.1f} ms, worst {worst * 1000:6.1f} ms per phrase")
+
+
+if __name__ == '__main__':
+    main()
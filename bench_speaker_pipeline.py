@@ -0,0 +1,120 @@
+"""
+Time to first audio and gaps between sentences, whole-text vs pipelined.
+
+Runs GTTSThread offline: a StubBackend whose synthesis time grows with the
+text length (like gTTS), and a fake player that "plays" each file for as
+long as its text would take to say. The same long answer is spoken with
+the whole text synthesized first (the old behaviour) and with the
+sentence pipeline, and the script reports when the first audio started,
+the silences between chunks and the total time. A last run queues an
+urgent acknowledgement while the answer plays (behind a greeting that goes
+stale) and reports how long the acknowledgement waited.
+
+Usage: python bench_speaker_pipeline.py [synth_ms_per_char] [speech_chars_per_s]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from speaker import GTTSThread, split_sentences
+from state_bus import bus
+from tts_cache import StubBackend, TTSCache
+
+ANSWER = ("MGM Model School was founded in 1983 and follows the CBSE curriculum. "
+          "Classes run from kindergarten to grade twelve, with science, commerce and humanities streams. "
+          "The campus has two computer labs, a library with over ten thousand books, and a football ground. "
+          "Admissions for the next academic year open in January, and the office can help with the forms. "
+          "Is there anything else you would like to know?")
+
+
+class SlowStub(StubBackend):
+    def __init__(self, seconds_per_char):
+        StubBackend.__init__(self)
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text, lang='en', tld='com', voice=None):
+        time.sleep(0.15 + len(text) * self.seconds_per_char)  # Round trip + generation
+        return StubBackend.synthesize(self, text, lang, tld, voice)
+
+
+def run(pipelined, seconds_per_char, chars_per_second):
+    root = tempfile.mkdtemp(prefix='omnis_tts_')
+    spans = []
+    done = threading.Event()
+
+    def play(path, stop=None):
+        start = time.perf_counter()
+        time.sleep(os.path.getsize(path) / 200 / chars_per_second)  # StubBackend writes 200 bytes/char
+        spans.append((start, time.perf_counter()))
+
+    try:
+        cache = TTSCache(root=root, backend=SlowStub(seconds_per_char))
+        speaker = GTTSThread(cache=cache, play=play, pipelined=pipelined)
+        speaker.daemon = True
+        unsubscribe = bus.subscribe(lambda old, new: new.speaking or done.set(), keys=('speaking',))
+        speaker.start()
+        t0 = time.perf_counter()
+        speaker.speak(ANSWER)
+        done.wait(60)
+        unsubscribe()
+        speaker.stop()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    gaps = [b[0] - a[1] for a, b in zip(spans, spans[1:])]
+    return spans[0][0] - t0, gaps, spans[-1][1] - t0
+
+
+def run_urgent(seconds_per_char, chars_per_second):
+    """Seconds from speak(urgent) to its playback, and the texts played."""
+    root = tempfile.mkdtemp(prefix='omnis_tts_')
+    played = []
+    ack_played = threading.Event()
+
+    try:
+        cache = TTSCache(root=root, backend=SlowStub(seconds_per_char))
+        ack = "Yes? I am listening to you now."
+        ack_path = cache.fetch(ack)  # Acks are short and cached
+
+        def play(path, stop=None):
+            played.append(path)
+            if path == ack_path:
+                ack_played.set()
+            time.sleep(os.path.getsize(path) / 200 / chars_per_second)
+
+        speaker = GTTSThread(cache=cache, play=play, greeting_ttl=0.5)
+        speaker.daemon = True
+        speaker.start()
+        speaker.speak(ANSWER)
+        speaker.speak("Hello Arjun! Welcome to MGM Model School, have a good day.", 'greeting')
+        time.sleep(0.6)
+        t0 = time.perf_counter()
+        speaker.speak(ack, 'urgent')
+        ack_played.wait(30)
+        wait = time.perf_counter() - t0
+        bus.wait_for(lambda s: not s.speaking, timeout=30)
+        speaker.stop()
+        return wait, len(played)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    seconds_per_char = (float(sys.argv[1]) if len(sys.argv) > 1 else 2.0) / 1000
+    chars_per_second = float(sys.argv[2]) if len(sys.argv) > 2 else 150.0
+    print(f"{len(ANSWER)} chars in {len(split_sentences(ANSWER))} chunks, "
+          f"synth {seconds_per_char * 1000:.1f} ms/char, speech {chars_per_second:g} chars/s")
+    for pipelined in (False, True):
+        first, gaps, total = run(pipelined, seconds_per_char, chars_per_second)
+        worst = f"max gap {max(gaps) * 1000:.0f} ms" if gaps else "no gaps"
+        print(f"{'pipelined' if pipelined else 'whole text':10s}: first audio {first * 1000:5.0f} ms, "
+              f"{worst}, done in {total:.2f} s")
+    wait, played = run_urgent(seconds_per_char, chars_per_second)
+    print(f"urgent ack : played {wait * 1000:.0f} ms after speak() while the answer was playing "
+          f"({played} chunks played in all, stale greeting dropped: {played == len(split_sentences(ANSWER)) + 1})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Hit/miss behaviour and latency of tts_cache.py, offline.
+
+Replays a day of speech (a few greetings and school answers repeated many
+times, plus one-off answers) through a TTSCache backed by StubBackend with
+a simulated network delay, in a throwaway directory. Reports the hit rate,
+time to audio on hits vs misses, and how many files were evicted to stay
+under the byte budget. A second TTSCache on the same directory checks that
+the cache survives a restart.
+
+Usage: python bench_tts_cache.py [budget_kb] [synth_delay_ms]
+"""
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from tts_cache import StubBackend, TTSCache
+
+PHRASES = [
+    "Hello Arjun! Welcome to MGM Model School.",
+    "Hello Meera! Welcome to MGM Model School.",
+    "The school office is open from 9 AM to 4 PM on weekdays.",
+    "The principal's office is on the first floor, next to the library.",
+    "Sorry, I couldn't reach the internet right now.",
+]
+
+
+def run(budget_kb, delay, utterances=600, seed=0):
+    rng = random.Random(seed)
+    root = tempfile.mkdtemp(prefix='omnis_tts_')
+    try:
+        backend = StubBackend(delay=delay)
+        cache = TTSCache(root=root, max_bytes=budget_kb * 1024, backend=backend)
+        hit_t, miss_t = [], []
+        for i in range(utterances):
+            text = rng.choice(PHRASES) if rng.random() < 0.8 else f"One-off answer number {i} about the timetable."
+            t0 = time.perf_counter()
+            hit = cache.get(text) is not None
+            cache.fetch(text)
+            (hit_t if hit else miss_t).append(time.perf_counter() - t0)
+
+        restarted = TTSCache(root=root, max_bytes=budget_kb * 1024, backend=backend)
+        calls = backend.calls
+        for text in PHRASES:
+            restarted.fetch(text)
+        return cache, hit_t, miss_t, restarted, backend.calls - calls
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    budget_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 300) / 1000
+    cache, hit_t, miss_t, restarted, resynth = run(budget_kb, delay)
+    avg = lambda xs: sum(xs) * 1000 / len(xs) if xs else 0.0
+    print(f"budget={budget_kb} KB  synth delay={delay * 1000:.0f} ms")
+    print(f"hits={cache.hits} misses={cache.misses} hit rate={cache.hits / (cache.hits + cache.misses):.1%}")
+    print(f"time to audio: hit {avg(hit_t):.2f} ms, miss {avg(miss_t):.1f} ms")
+    print(f"evictions={cache.evictions} on disk={cache.total // 1024} KB in {len(cache.entries)} files")
+    print(f"after restart: {len(restarted.entries)} files, {resynth} of {len(PHRASES)} common phrases re-synthesized")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+speak() -> first audio with and without the TTS router's deadline.
+
+Simulates gTTS at several network latencies (stub backend, no network)
+and a fast offline voice, and times a fresh (uncached) sentence through
+GTTSThread with a stand-in audio output. "no deadline" is the old
+behaviour: wait for gTTS however long it takes. With the router, a
+sentence that gTTS cannot deliver within OMNIS_TTS_DEADLINE plays in the
+offline voice instead.
+Once a late call has shown gTTS to be slower than the deadline, later
+sentences skip it outright (the median), while background probes every
+OMNIS_TTS_PROBE_EVERY seconds would bring it back once it is fast again
+(see test_tts_router.py).
+
+Usage: python bench_tts_router.py [rounds]
+"""
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from speaker import GTTSThread
+from tts_cache import StubBackend, TTSCache
+from tts_router import TTSRouter
+
+LATENCIES = (0.3, 1.5, 4.0)  # Simulated gTTS seconds per sentence
+
+
+class RecordingOutput:
+    rate = 24000
+
+    def __init__(self):
+        self.played = threading.Event()
+
+    def decode(self, data, rate=None):
+        return data
+
+    def play(self, pcm, stop=None, rate=None):
+        self.played.set()
+
+    def drain(self, stop=None):
+        pass
+
+
+class FakeOffline:
+    def pcm(self, text, rate):
+        time.sleep(0.03)  # About what libespeak-ng takes for a sentence on the Pi
+        return b'\0' * 2400
+
+
+def measure(latency, deadline, rounds):
+    root = tempfile.mkdtemp(prefix='omnis_router_')
+    try:
+        output = RecordingOutput()
+        cache = TTSCache(root=root, backend=StubBackend(delay=latency))
+        speaker = GTTSThread(cache=cache, output=output, offline=FakeOffline(), bundle=False)
+        speaker.router = TTSRouter(deadline=deadline)
+        speaker.router.register('stub', speaker._render_online)
+        speaker.router.register('espeak', speaker._render_offline, online=False)
+        speaker.earcons = None
+        speaker.daemon = True
+        speaker.start()
+        times = []
+        for i in range(rounds):
+            output.played.clear()
+            t0 = time.perf_counter()
+            speaker.speak(f"Round {i}: the library is open from nine in the morning until four.")
+            output.played.wait(30)
+            times.append(time.perf_counter() - t0)
+        speaker.stop()
+        return statistics.median(times) * 1000, max(times) * 1000
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for latency in LATENCIES:
+        for label, deadline in (("no deadline", 3600.0), ("router 2.5s", 2.5)):
+            median, worst = measure(latency, deadline, rounds)
+            print(f"gTTS {latency:.1f}s, {label:12s}: first audio median {median:7.1f} ms, worst {worst:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
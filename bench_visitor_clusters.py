@@ -0,0 +1,48 @@
+"""
+Per-face cost of visitor_clusters.py as the number of strangers grows.
+
+Simulates a day of visitors (each seen several times, with encoding noise)
+and reports the average assign() time per face, plus how many clusters
+were created and evicted. The cost should stay flat once every slot is
+in use, however many visitors have come through.
+
+Usage: python bench_visitor_clusters.py [slots]
+"""
+import sys
+import time
+
+import numpy as np
+
+from visitor_clusters import VisitorClusters
+
+
+def run(visitors, slots, sightings=5, seed=0):
+    rng = np.random.default_rng(seed)
+    # Random 128-d faces are ~1.0 apart; sightings add ~0.1 of noise
+    faces = rng.normal(0, 1 / np.sqrt(128), (visitors, 128))
+    clusters = VisitorClusters(slots=slots, tolerance=0.5)
+    correct = 0
+    t0 = time.perf_counter()
+    for i in range(visitors):
+        first = None
+        for _ in range(sightings):
+            enc = faces[i] + rng.normal(0, 0.1 / np.sqrt(128), 128)
+            visitor = clusters.assign([enc])[0]
+            first = first or visitor
+            correct += visitor == first
+    elapsed = time.perf_counter() - t0
+    n = visitors * sightings
+    return elapsed * 1e6 / n, clusters.created, clusters.evicted, correct / n
+
+
+def main():
+    slots = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    print(f"slots={slots}")
+    for visitors in (10, 100, 1000, 5000):
+        us, created, evicted, stable = run(visitors, slots)
+        print(f"{visitors:5d} visitors: {us:6.1f} us/face  created={created} evicted={evicted} "
+              f"stable ids={stable:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Event-triggered clip recorder for debugging recognition.
+
+ClipRecorderSink keeps the last CLIP_PRE seconds of downscaled, annotated
+frames in a preallocated ring, sampled at CLIP_FPS. When an event fires,
+the writer thread turns the ring into an .mp4 with cv2.VideoWriter:
+
+- a new unknown visitor
+- a low-margin match, where the face nearly matched someone else or
+  nearly fell to "Unknown"
+- trigger() from any thread (main.py maps SIGUSR1 to it)
+
+Each clip covers CLIP_PRE seconds before the event to CLIP_POST seconds
+after it. Events during a clip extend it, up to CLIP_MAX seconds. A .json
+sidecar lists the ids and match margins of every frame.
+
+The vision thread only resizes into the next ring slot; it never copies a
+clip or touches the disk. The writer copies one slot at a time and checks
+the slot's sequence number around the copy, so if the disk stalls long
+enough for the ring to lap it, those frames are skipped rather than
+blocking the loop. Memory is the ring, sized once at start-up; disk is
+bounded by keeping the newest CLIP_KEEP clips.
+"""
+import glob
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+from vision_sinks import Sink
+
+CLIP_DIR = os.environ.get('OMNIS_CLIP_DIR', 'clips')
+CLIP_FPS = float(os.environ.get('OMNIS_CLIP_FPS', '10'))
+CLIP_PRE = float(os.environ.get('OMNIS_CLIP_PRE', '5'))     # Seconds before the event
+CLIP_POST = float(os.environ.get('OMNIS_CLIP_POST', '5'))   # Seconds after the (last) event
+CLIP_MAX = 60.0                                             # Longest clip, however many events
+CLIP_SCALE = float(os.environ.get('OMNIS_CLIP_SCALE', '0.5'))
+CLIP_KEEP = int(os.environ.get('OMNIS_CLIP_KEEP', '50'))
+LOW_MARGIN = float(os.environ.get('OMNIS_CLIP_LOW_MARGIN', '0.04'))
+EVENT_COOLDOWN = 30.0   # Seconds between automatic clips of the same kind
+SLACK = 3.0             # Extra seconds of ring so the writer can fall behind without losing frames
+MAX_SEEN_VISITORS = 512
+
+
+class ClipRecorderSink(Sink):
+    name = 'clips'
+
+    def __init__(self, out_dir=CLIP_DIR, fps=CLIP_FPS, pre=CLIP_PRE, post=CLIP_POST, scale=CLIP_SCALE,
+                 keep=CLIP_KEEP, low_margin=LOW_MARGIN, width=640, height=480):
+        self.out_dir = out_dir
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.pre_frames = int(pre * fps)
+        self.post_frames = int(post * fps)
+        self.max_frames = int(CLIP_MAX * fps)
+        self.keep = keep
+        self.low_margin = low_margin
+        self.size = (max(2, int(width * scale)) // 2 * 2, max(2, int(height * scale)) // 2 * 2)
+
+        # Ring of annotated, downscaled frames; slot i holds frame seq where seq % capacity == i
+        self.capacity = self.pre_frames + self.post_frames + int(SLACK * fps) + 1
+        self.ring = np.zeros((self.capacity, self.size[1], self.size[0], 3), np.uint8)
+        self.slot_seq = np.full(self.capacity, -1, np.int64)
+        self.slot_meta = [None] * self.capacity
+        self.seq = -1           # Last frame written into the ring
+        self.last_sample = 0.0
+
+        # Events (any thread) -> clip plan (writer thread)
+        self.cond = threading.Condition()
+        self.events = []        # (reason, seq at the event)
+        self.last_auto = {}     # event kind -> time of last automatic clip
+        self.seen_visitors = set()
+        self.running = False
+        self.thread = None
+        self.clips_written = 0
+        self.frames_lost = 0
+
+    # --- Any thread ---
+
+    def trigger(self, reason='manual'):
+        with self.cond:
+            self.events.append((reason, self.seq))
+            self.cond.notify()
+
+    # --- Vision thread ---
+
+    def open(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, daemon=True, name='clip-writer')
+        self.thread.start()
+
+    def publish(self, result):
+        now = time.monotonic()
+        if result.refreshed:
+            self._check_events(result, now)
+        if now - self.last_sample < self.interval or not result.success:
+            return True
+        self.last_sample = now
+
+        seq = self.seq + 1
+        slot = seq % self.capacity
+        self.slot_seq[slot] = -1  # Mark in progress so the writer never reads a half-drawn frame
+        dst = self.ring[slot]
+        cv2.resize(result.frame, self.size, dst=dst, interpolation=cv2.INTER_LINEAR)
+        sx, sy = self.size[0] / result.frame.shape[1], self.size[1] / result.frame.shape[0]
+        for (y1, x2, y2, x1), person_id in result.faces:
+            color = (0, 0, 255) if person_id == "Unknown" else (0, 255, 0)
+            cv2.rectangle(dst, (int(x1 * sx), int(y1 * sy)), (int(x2 * sx), int(y2 * sy)), color, 1)
+            cv2.putText(dst, person_id, (int(x1 * sx), max(8, int(y1 * sy) - 4)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.35, color, 1)
+        self.slot_meta[slot] = (time.time(), result.ids, list(result.margins))
+        self.slot_seq[slot] = seq
+        with self.cond:
+            self.seq = seq
+            self.cond.notify()
+        return True
+
+    def _check_events(self, result, now):
+        for visitor in result.visitors:
+            # Own cooldown (an unclustered unknown must not hide a new visitor), and only marked
+            # seen once its clip fires, so one held back by the cooldown gets a clip later
+            if visitor and visitor not in self.seen_visitors and \
+                    self._auto('new_visitor', now, f"unknown_{visitor.replace(' ', '')}"):
+                if len(self.seen_visitors) >= MAX_SEEN_VISITORS:
+                    self.seen_visitors.clear()
+                self.seen_visitors.add(visitor)
+        if "Unknown" in result.ids and not any(result.visitors):
+            self._auto('unknown', now, 'unknown')  # No clustering: rate-limited only
+        if any(m is not None and m < self.low_margin for m in result.margins):
+            self._auto('low_margin', now, 'low_margin')
+
+    def _auto(self, kind, now, reason):
+        """Trigger unless a clip of `kind` fired within EVENT_COOLDOWN. True if it fired."""
+        if now - self.last_auto.get(kind, -EVENT_COOLDOWN) < EVENT_COOLDOWN:
+            return False
+        self.last_auto[kind] = now
+        self.trigger(reason)
+        return True
+
+    # --- Writer thread ---
+
+    def _writer(self):
+        while self.running:
+            with self.cond:
+                self.cond.wait_for(lambda: self.events or not self.running, timeout=1.0)
+                if not self.events:
+                    continue
+                reason, event_seq = self.events.pop(0)
+            try:
+                self._write_clip(reason, event_seq)
+            except Exception as e:
+                print(f"[clips] Error writing clip: {e}")
+
+    def _write_clip(self, reason, event_seq):
+        start = max(0, event_seq - self.pre_frames + 1, self.seq - self.capacity + 1)
+        end = event_seq + self.post_frames
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        base = os.path.join(self.out_dir, f"{stamp}_{reason}")
+        writer = cv2.VideoWriter(base + '.mp4', cv2.VideoWriter_fourcc(*'mp4v'), self.fps, self.size)
+        if not writer.isOpened():
+            print(f"[clips] Could not open {base}.mp4")
+            return
+        t0 = time.perf_counter()
+        frame = np.empty_like(self.ring[0])
+        frames, reasons = [], [reason]
+        seq = start
+        while seq <= end and self.running:
+            with self.cond:
+                # Later events extend this clip instead of starting another
+                while self.events:
+                    more, more_seq = self.events.pop(0)
+                    reasons.append(more)
+                    end = min(start + self.max_frames, max(end, more_seq + self.post_frames))
+                if seq > self.seq:
+                    self.cond.wait(timeout=1.0)
+                    continue
+            slot = seq % self.capacity
+            meta = self.slot_meta[slot]
+            if self.slot_seq[slot] == seq:
+                np.copyto(frame, self.ring[slot])
+            if self.slot_seq[slot] == seq:  # Still the same frame after the copy
+                writer.write(frame)
+                frames.append({'seq': seq, 't': round(meta[0], 3), 'ids': meta[1],
+                               'margins': [None if m is None else round(m, 4) for m in meta[2]]})
+            else:
+                self.frames_lost += 1  # Writer fell a whole ring behind
+            seq += 1
+        writer.release()
+
+        with open(base + '.json', 'w') as f:
+            json.dump({'reasons': reasons, 'fps': self.fps, 'frames': frames}, f)
+        self.clips_written += 1
+        metrics.inc('clips_written')
+        metrics.observe('clip_write', time.perf_counter() - t0)
+        print(f"🎬 Clip saved: {base}.mp4 ({len(frames)} frames, {', '.join(reasons)})")
+        self._prune()
+
+    def _prune(self):
+        clips = sorted(glob.glob(os.path.join(self.out_dir, '*.mp4')))
+        for old in clips[:max(0, len(clips) - self.keep)]:
+            for path in (old, old[:-4] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
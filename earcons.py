@@ -0,0 +1,93 @@
+"""
+In-memory bank of short acknowledgement clips and tones.
+
+"Yes?" after the wake word has to sound instant. Synthesizing it each time
+means an espeak-ng run or, for phrases that miss the short-phrase rule, a
+network round trip. EarconBank holds ready-to-write PCM for:
+
+- tones generated at start-up: listen_start (mic open again after a
+  reply in a conversation), listen_stop (conversation timed out), error
+- acknowledgement phrases (ACK_PHRASES), rendered once. A cached gTTS copy
+  is preferred, then the offline espeak-ng engine, then gTTS (which is
+  cached for the next start).
+
+The speaker loads the bank on a thread of its own at start-up; until a
+phrase is ready it is spoken the normal way.
+
+The speaker checks every text against the bank (case and punctuation
+insensitive). A match skips the prefetch thread entirely and goes
+straight to playback.
+"""
+import re
+import time
+
+import numpy as np
+
+import metrics
+
+ACK_PHRASES = ["Yes?", "Ok.", "Ok, I am listening.", "I didn't catch a name.", "Sorry, I couldn't process that."]
+# name -> ((frequency Hz, seconds), ...)
+TONES = {
+    'listen_start': ((660, 0.07), (990, 0.09)),
+    'listen_stop': ((990, 0.07), (660, 0.09)),
+    'error': ((330, 0.12), (220, 0.2)),
+}
+TONE_VOLUME = 0.25
+FADE = 0.005  # Seconds of fade in/out per segment (no clicks)
+
+
+def normalize(text):
+    return ' '.join(re.sub(r"[^a-z0-9' ]+", ' ', text.lower()).split())
+
+
+def tone(segments, rate, volume=TONE_VOLUME):
+    """16-bit mono PCM for a sequence of (frequency, seconds) sine segments."""
+    parts = []
+    fade = max(1, int(FADE * rate))
+    for freq, seconds in segments:
+        t = np.arange(int(seconds * rate)) / rate
+        wave = np.sin(2 * np.pi * freq * t)
+        ramp = np.minimum(1.0, np.minimum(np.arange(len(t)), np.arange(len(t))[::-1]) / fade)
+        parts.append(wave * ramp)
+    return (np.concatenate(parts) * volume * 32767).astype(np.int16).tobytes()
+
+
+class EarconBank:
+    def __init__(self, output, cache=None, offline=None, phrases=ACK_PHRASES):
+        self.output = output      # audio_out.AudioOutput (rate and MP3 decoding)
+        self.cache = cache        # tts_cache.TTSCache
+        self.offline = offline    # offline_tts.OfflineTTS
+        self.rate = output.rate   # Every clip is rendered at this rate (the stream may reopen at another)
+        self.phrases = list(phrases)
+        self.clips = {name: tone(segments, self.rate) for name, segments in TONES.items()}
+        self.by_text = {}         # normalized phrase -> PCM
+
+    def load(self):
+        """Render the acknowledgement phrases (the tones are ready from __init__)."""
+        t0 = time.perf_counter()
+        for phrase in self.phrases:
+            try:
+                pcm = self._render(phrase)
+            except Exception as e:
+                print(f"[earcons] Could not render '{phrase}': {e}")
+                continue
+            if pcm:
+                self.by_text[normalize(phrase)] = pcm
+        metrics.observe('earcon_load', time.perf_counter() - t0)
+        print(f"🔔 Earcons: {len(self.clips)} tones, {len(self.by_text)} phrases in memory")
+
+    def _render(self, phrase):
+        if self.cache is not None and self.cache.get(phrase) is not None:
+            return self.output.decode(self.cache.load(phrase), self.rate)
+        if self.offline is not None:
+            return self.offline.pcm(phrase, self.rate)
+        if self.cache is not None:
+            return self.output.decode(self.cache.load(phrase), self.rate)
+        return None
+
+    def match(self, text):
+        """PCM for `text` if it is one of the acknowledgement phrases."""
+        return self.by_text.get(normalize(text))
+
+    def get(self, name):
+        return self.clips.get(name)
@@ -0,0 +1,273 @@
+"""
+Voice enrollment of unknown visitors, running beside the vision loop.
+
+1. EnrollmentSink watches the primary (largest) unknown face. Once the same
+   visitor (visitor_clusters.py) has been in view for ENROLL_DWELL seconds,
+   it hands small face crops to the EnrollmentManager thread. The vision
+   loop only slices and copies a crop on frames where recognition ran, and
+   never waits on the manager.
+2. For ENROLL_CAPTURE seconds the manager scores the crops (size x
+   sharpness) and keeps the best few. It also takes the visitor's
+   encodings, which the clusterer already computed.
+3. It asks for a name and sets awaiting_name/_encoding/_face_image on
+   the state bus in one update. The speech thread (sr_class.py) passes the answer back
+   with submit_name(), which reports whether the name was taken (it is not
+   if NAME_TIMEOUT ran out while the answer was being recognised).
+4. The commit runs on the manager thread: register_face.register_name()
+   writes the gallery file and photo, then the live pipelines pick up the
+   new person on their next processed frame.
+"""
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+from state_bus import bus
+from register_face import register_name
+from vision_sinks import Sink
+
+ENROLL_DWELL = float(os.environ.get('OMNIS_ENROLL_DWELL', '3'))      # Seconds in view before we ask
+ENROLL_CAPTURE = float(os.environ.get('OMNIS_ENROLL_CAPTURE', '3'))  # Seconds of crops to collect
+NAME_TIMEOUT = 20.0     # Give up waiting for a name after this long
+COMMIT_WAIT = 5.0       # submit_name() waits this long for the commit
+MIN_CROPS = 3           # Good crops needed before asking
+MAX_CROPS = 5
+MIN_FACE_PX = 60        # Full-size face box width below this is too small to enroll
+MIN_SHARPNESS = 30.0    # Laplacian variance below this is too blurry
+MAX_DECLINED = 256
+ASK_TEXT = "Hello! I don't think we have met. What is your name?"
+
+IDLE = 'idle'
+CAPTURING = 'capturing'
+ASKING = 'asking'
+
+_CROP = 0
+_NAME = 1
+_CANCEL = 2
+_STOP = 3
+
+
+def face_crop(frame, box, margin=0.25):
+    """Copy of the face box (top, right, bottom, left) plus a margin, clipped to the frame."""
+    top, right, bottom, left = box
+    h, w = frame.shape[:2]
+    mx, my = int((right - left) * margin), int((bottom - top) * margin)
+    y1, y2 = max(0, top - my), min(h, bottom + my)
+    x1, x2 = max(0, left - mx), min(w, right + mx)
+    if y2 <= y1 or x2 <= x1:
+        return None
+    return frame[y1:y2, x1:x2].copy()
+
+
+def sharpness(crop):
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class EnrollmentManager(threading.Thread):
+    def __init__(self, clusters, ask=None, pipelines=(), greeter=None, register=register_name,
+                 clock=time.time):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.clusters = clusters
+        self.ask = ask or (lambda text: None)  # e.g. speaker.speak
+        self.pipelines = list(pipelines)       # Live pipelines that get the new person
+        self.greeter = greeter
+        self.register = register
+        self.clock = clock
+        self.queue = queue.Queue(maxsize=32)
+        self.running = True
+
+        self.state = IDLE
+        self.visitor = None
+        self.deadline = 0.0
+        self.crops = []  # [(score, crop)], best first
+        self.encodings = []
+        self.declined = set()  # Visitors who timed out or gave no name
+
+        self.enrolled = 0
+        self.dropped = 0
+
+    # --- Vision thread side: O(1), never blocks ---
+
+    def wants(self, visitor):
+        if visitor in self.declined:
+            return False
+        return self.state == IDLE or (self.state == CAPTURING and visitor == self.visitor)
+
+    def offer(self, visitor, crop):
+        try:
+            self.queue.put_nowait((_CROP, visitor, crop))
+        except queue.Full:
+            self.dropped += 1
+
+    # --- Speech thread side ---
+
+    def submit_name(self, name, timeout=COMMIT_WAIT):
+        """Name heard for the pending visitor, committed on the manager thread.
+
+        True once they are enrolled; False if nobody is waiting for a name any more or saving failed.
+        """
+        done, result = threading.Event(), []
+        try:
+            self.queue.put((_NAME, None, (name, done, result)), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout) and bool(result and result[0])
+
+    def cancel(self):
+        self.queue.put((_CANCEL, None, None))
+
+    def stop(self):
+        self.running = False
+        self.queue.put((_STOP, None, None))
+
+    # --- Manager thread ---
+
+    def run(self):
+        while self.running:
+            try:
+                kind, visitor, payload = self.queue.get(timeout=0.25)
+            except queue.Empty:
+                kind = None
+            try:
+                if kind == _CROP:
+                    self._add_crop(visitor, payload)
+                elif kind == _NAME:
+                    name, done, result = payload
+                    try:
+                        result.append(self._commit(name))
+                    finally:
+                        done.set()
+                elif kind == _CANCEL:
+                    self._reset(declined=True)
+                self._check_deadlines()
+            except Exception as e:
+                print(f"[enrollment] Error: {e}")
+                self._reset()
+
+    def _add_crop(self, visitor, crop):
+        if not self.wants(visitor):
+            return
+        if self.state == IDLE:
+            self.state = CAPTURING
+            self.visitor = visitor
+            self.deadline = self.clock() + ENROLL_CAPTURE
+            self.crops = []
+            print(f"[enrollment] Capturing {visitor}...")
+        score = sharpness(crop)
+        if score < MIN_SHARPNESS:
+            return
+        self.crops.append((score * crop.shape[0] * crop.shape[1], crop))
+        self.crops.sort(key=lambda c: c[0], reverse=True)
+        del self.crops[MAX_CROPS:]
+
+    def _check_deadlines(self):
+        now = self.clock()
+        if self.state == CAPTURING and now >= self.deadline:
+            self.encodings = self.clusters.encodings(self.visitor) if self.clusters else []
+            if len(self.crops) < MIN_CROPS or not self.encodings:
+                print(f"[enrollment] Not enough good views of {self.visitor}, will retry")
+                self._reset()
+                return
+            self.state = ASKING
+            self.deadline = now + NAME_TIMEOUT
+            bus.update(awaiting_name=True, awaiting_encoding=self.encodings, awaiting_face_image=self.crops[0][1])
+            self.ask(ASK_TEXT)
+        elif self.state == ASKING and now >= self.deadline:
+            print(f"[enrollment] No name for {self.visitor}")
+            self._reset(declined=True)
+
+    def _commit(self, name):
+        """Enroll the pending visitor as `name`. Returns the person id, or None."""
+        if self.state != ASKING:
+            print(f"[enrollment] Name '{name}' arrived after the question timed out")
+            return None
+        visitor, encodings, photo = self.visitor, self.encodings, self.crops[0][1]
+        self._reset()
+        t0 = time.perf_counter()
+        person = self.register(name, encodings, photo)
+        metrics.observe('enroll_commit', time.perf_counter() - t0)
+        if not person:
+            return None
+        for pipeline in self.pipelines:
+            pipeline.add_known(person, encodings)
+        if self.greeter is not None:
+            self.greeter.mark_greeted(person)  # They were just welcomed by name
+        if self.clusters is not None:
+            self.clusters.forget(visitor)
+        self.enrolled += 1
+        metrics.inc('enrollments')
+        print(f"[enrollment] {visitor} enrolled as {person} ({len(encodings)} encodings)")
+        return person
+
+    def _reset(self, declined=False):
+        if declined and self.visitor:
+            if len(self.declined) >= MAX_DECLINED:
+                self.declined.clear()
+            self.declined.add(self.visitor)
+        if self.state == ASKING:
+            bus.update(awaiting_name=False, awaiting_encoding=None, awaiting_face_image=None)
+        self.state = IDLE
+        self.visitor = None
+        self.crops = []
+        self.encodings = []
+
+
+class EnrollmentSink(Sink):
+    """Feeds crops of the primary unknown face to the EnrollmentManager."""
+    name = 'enrollment'
+
+    def __init__(self, manager, dwell=ENROLL_DWELL):
+        self.manager = manager
+        self.dwell = dwell
+        self.candidate = None
+        self.since = 0.0
+
+    def open(self):
+        if self.manager.ident is None:
+            self.manager.start()
+
+    def publish(self, result):
+        if not result.refreshed or result.speaking or self.manager.state == ASKING:
+            return True
+        # Primary unknown face: the largest one with a visitor id
+        best, best_w = None, 0
+        for (box, _), visitor in zip(result.faces, result.visitors):
+            width = box[1] - box[3]
+            if visitor and width > best_w:
+                best, best_w = (box, visitor), width
+        if best is None:
+            self.candidate = None
+            return True
+        box, visitor = best
+        now = self.manager.clock()
+        if visitor != self.candidate:
+            self.candidate, self.since = visitor, now
+        if now - self.since >= self.dwell and best_w >= MIN_FACE_PX and self.manager.wants(visitor):
+            crop = face_crop(result.frame, box)
+            if crop is not None:
+                self.manager.offer(visitor, crop)
+        return True
+
+    def close(self):
+        self.manager.stop()
+
+
+_enrollment = None
+
+
+def init_enrollment(clusters, ask=None, pipelines=(), greeter=None):
+    global _enrollment
+    if _enrollment is None:
+        _enrollment = EnrollmentManager(clusters, ask=ask, pipelines=pipelines, greeter=greeter)
+    return _enrollment
+
+
+def get_enrollment():
+    """The running EnrollmentManager, or None when voice enrollment is off."""
+    return _enrollment
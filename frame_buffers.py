@@ -0,0 +1,63 @@
+"""
+Preallocated frame buffers for the vision loop.
+
+`cv2.resize` / `cv2.cvtColor` / `np.zeros` hand back a brand new array on
+every call. At 30 FPS on the Pi that churn shows up as allocator and GC
+stalls, so the capture -> resize -> colour-convert path writes into buffers
+that are created once and reused (`cap.read(image)` and OpenCV `dst=`).
+"""
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    def __init__(self, width=640, height=480, scale=0.20, slots=3):
+        self.width = width
+        self.height = height
+        self.scale = scale
+        # Same rounding cv2.resize uses for (0, 0) + fx/fy
+        self.small_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        small_w, small_h = self.small_size
+
+        # Ring of capture buffers: a frame handed to a slower consumer is not
+        # overwritten by the very next cap.read()
+        self.capture = [np.zeros((height, width, 3), np.uint8) for _ in range(max(1, slots))]
+        self.index = 0
+
+        self.small_bgr = np.zeros((small_h, small_w, 3), np.uint8)
+        self.small_rgb = np.zeros((small_h, small_w, 3), np.uint8)
+
+        # Shared placeholder when the camera is not delivering frames
+        self.black = np.zeros((height, width, 3), np.uint8)
+        self.black.flags.writeable = False
+
+    def read(self, cap):
+        """Read the next frame into the ring. Returns (success, frame)."""
+        buf = self.capture[self.index]
+        try:
+            success, frame = cap.read(buf)
+        except Exception:
+            success, frame = False, None
+
+        if not success or frame is None:
+            return False, self.black
+
+        # cap.read() only reuses `buf` when size/type match; otherwise OpenCV
+        # allocated a new array and we just pass it through.
+        if frame is buf:
+            self.index = (self.index + 1) % len(self.capture)
+        return True, frame
+
+    def downscale(self, img):
+        """Resize + BGR->RGB into the pooled small buffers. Returns the RGB view."""
+        cv2.resize(img, self.small_size, dst=self.small_bgr, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self.small_bgr, cv2.COLOR_BGR2RGB, dst=self.small_rgb)
+        return self.small_rgb
+
+    def scale_back(self, face_loc):
+        """Map a (top, right, bottom, left) box from the small frame to full size."""
+        small_w, small_h = self.small_size
+        sx = self.width / small_w
+        sy = self.height / small_h
+        y1, x2, y2, x1 = face_loc
+        return int(y1 * sy), int(x2 * sx), int(y2 * sy), int(x1 * sx)
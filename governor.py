@@ -0,0 +1,233 @@
+"""
+Thermal- and throttle-aware workload governor for the Raspberry Pi.
+
+A background thread samples the SoC temperature (/sys/class/thermal) and
+the firmware throttling flags every SAMPLE_INTERVAL seconds and picks a
+workload level. The levels step the vision profile (downscale factor),
+the detection interval and the number of worker threads down *before* the
+firmware starts clocking the CPU down, and back up once there has been
+headroom for UP_HOLD seconds. The decision uses the temperature projected
+LOOKAHEAD seconds ahead, so a fast climb steps down early.
+
+The vision thread applies a new level at the start of its next frame
+(VisionEngine calls apply()), so nothing is resized under its feet.
+
+The sysfs root is configurable (OMNIS_SYSFS_ROOT) so the governor can be
+exercised with fake files:
+    <root>/class/thermal/thermal_zone*/temp                 millidegrees C
+    <root>/devices/platform/soc/soc:firmware/get_throttled  hex flags
+On a real Pi without the get_throttled node, `vcgencmd get_throttled` is
+used instead.
+"""
+import glob
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+
+import cv2
+
+import metrics
+from power import IDLE
+from vision_pipeline import RESIZE_FACTOR
+
+SYSFS_ROOT = os.environ.get('OMNIS_SYSFS_ROOT', '/sys')
+SAMPLE_INTERVAL = float(os.environ.get('OMNIS_THERMAL_INTERVAL', '2'))
+# Start stepping down well before the Pi's 80 C soft limit
+STEP_TEMPS = tuple(float(t) for t in os.environ.get('OMNIS_THERMAL_STEPS', '70,75,78').split(','))
+HYSTERESIS = 4.0    # Degrees below a step's threshold before stepping back up
+UP_HOLD = 30.0      # Seconds of headroom needed before each step up
+LOOKAHEAD = 20.0    # Seconds of temperature trend to project forward
+MAX_TREND = 4.0     # Cap on how far ahead of the reading the projection may run (degrees)
+
+# Firmware get_throttled bits that mean "slowed down right now"
+UNDER_VOLTAGE = 0x1
+FREQ_CAPPED = 0x2
+THROTTLED = 0x4
+SOFT_TEMP_LIMIT = 0x8
+THROTTLED_NOW = UNDER_VOLTAGE | FREQ_CAPPED | THROTTLED | SOFT_TEMP_LIMIT
+
+
+class Profile:
+    __slots__ = ('name', 'detect_scale', 'resize_factor', 'workers')
+
+    def __init__(self, name, detect_scale, resize_factor, workers):
+        self.name = name
+        self.detect_scale = detect_scale    # Multiplier on the detection interval / frame skip
+        self.resize_factor = resize_factor  # Downscale factor before detection
+        self.workers = workers              # Recognition workers / OpenCV threads
+
+    def __repr__(self):
+        return f"{self.name}(detect x{self.detect_scale}, resize {self.resize_factor}, workers {self.workers})"
+
+
+def default_profiles(resize_factor=RESIZE_FACTOR, workers=os.cpu_count() or 4):
+    """Level 0 is full speed; each later level is one step cooler (one per STEP_TEMPS entry)."""
+    return [
+        Profile('full', 1, resize_factor, workers),
+        Profile('warm', 2, resize_factor, max(1, workers // 2)),
+        Profile('hot', 3, round(resize_factor * 0.75, 3), 1),
+        Profile('critical', 5, round(resize_factor * 0.75, 3), 1),
+    ]
+
+
+class ThermalSensor:
+    def __init__(self, root=SYSFS_ROOT):
+        self.root = root
+        self.zones = sorted(glob.glob(os.path.join(root, 'class', 'thermal', 'thermal_zone*', 'temp')))
+        self.throttled_path = os.path.join(root, 'devices', 'platform', 'soc', 'soc:firmware', 'get_throttled')
+        self.use_vcgencmd = not os.path.exists(self.throttled_path) and root == '/sys'
+
+    def temperature(self):
+        """Hottest thermal zone in degrees C, or None if there are none."""
+        temps = []
+        for path in self.zones:
+            try:
+                with open(path) as f:
+                    temps.append(int(f.read().strip()) / 1000.0)
+            except (OSError, ValueError):
+                pass
+        return max(temps) if temps else None
+
+    def throttled(self):
+        """Firmware throttling flags (0 if unavailable)."""
+        try:
+            if os.path.exists(self.throttled_path):
+                with open(self.throttled_path) as f:
+                    return int(f.read().strip(), 16)
+            if self.use_vcgencmd:
+                out = subprocess.run(['vcgencmd', 'get_throttled'], capture_output=True, text=True,
+                                     timeout=2).stdout
+                return int(out.strip().split('=')[-1], 16)
+        except (OSError, ValueError, subprocess.SubprocessError):
+            self.use_vcgencmd = False
+        return 0
+
+
+class ThermalGovernor(threading.Thread):
+    def __init__(self, sensor=None, profiles=None, step_temps=STEP_TEMPS, interval=SAMPLE_INTERVAL,
+                 clock=time.monotonic):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.sensor = sensor or ThermalSensor()
+        self.profiles = profiles or default_profiles()
+        self.step_temps = tuple(step_temps)[:len(self.profiles) - 1]
+        self.interval = interval
+        self.clock = clock
+        self.running = True
+
+        self.level = 0
+        self.applied = None      # Level the vision thread last applied
+        self.base = None         # Engine settings at level 0 (captured on first apply)
+        self.temp = None
+        self.rate = 0.0          # Degrees C per second (smoothed)
+        self.flags = 0
+        self.headroom_since = None
+        self.last_sample = None
+        self.decisions = deque(maxlen=50)  # (wall time, from level, to level, reason)
+
+    @property
+    def profile(self):
+        return self.profiles[self.level]
+
+    def run(self):
+        print(f"🌡️ Thermal governor: steps at {', '.join(f'{t:g}C' for t in self.step_temps)}")
+        while self.running:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[governor] Error: {e}")
+            time.sleep(self.interval)
+
+    def sample(self):
+        """Read the sensors once and update the level. Returns the level."""
+        now = self.clock()
+        temp = self.sensor.temperature()
+        self.flags = self.sensor.throttled()
+        if temp is not None:
+            if self.temp is not None and self.last_sample is not None and now > self.last_sample:
+                rate = (temp - self.temp) / (now - self.last_sample)
+                self.rate = 0.7 * self.rate + 0.3 * rate
+            self.temp = temp
+            self.last_sample = now
+            metrics.set_gauge('thermal_temp_c', round(temp, 1))
+        metrics.set_gauge('thermal_throttled', self.flags)
+        self.decide(now)
+        metrics.set_gauge('thermal_level', self.level)
+        return self.level
+
+    def decide(self, now):
+        if self.temp is None:
+            projected = None
+            wanted = 0
+        else:
+            projected = self.temp + min(MAX_TREND, max(0.0, self.rate) * LOOKAHEAD)
+            wanted = sum(1 for t in self.step_temps if projected >= t)
+        if self.flags & THROTTLED_NOW:
+            # Already being slowed down by the firmware: shed load now
+            wanted = max(wanted, min(self.level + 1, len(self.profiles) - 1))
+
+        if wanted > self.level:
+            self.headroom_since = None
+            reason = f"throttled 0x{self.flags:x}" if self.flags & THROTTLED_NOW else \
+                f"{self.temp:.1f}C (projected {projected:.1f}C)"
+            self._step(wanted, reason)
+        elif self.level > 0 and self.temp is not None:
+            cool = self.temp < self.step_temps[self.level - 1] - HYSTERESIS and not self.flags & THROTTLED_NOW
+            if not cool:
+                self.headroom_since = None
+            elif self.headroom_since is None:
+                self.headroom_since = now
+            elif now - self.headroom_since >= UP_HOLD:
+                self.headroom_since = now
+                self._step(self.level - 1, f"{self.temp:.1f}C, headroom for {UP_HOLD:g}s")
+
+    def _step(self, level, reason):
+        old = self.level
+        self.level = level
+        self.decisions.append((time.time(), old, level, reason))
+        metrics.inc('governor_step_down' if level > old else 'governor_step_up')
+        print(f"🌡️ Governor: {self.profiles[old].name} -> {self.profiles[level].name} ({reason})")
+
+    # --- Vision thread ---
+
+    def apply(self, engine):
+        """Apply the current level to `engine` (cheap no-op unless the level changed)."""
+        level = self.level
+        if level == self.applied:
+            return
+        pipeline = engine.pipeline
+        hub = getattr(pipeline, 'hub', None)  # multi_camera.HubPipeline
+        if self.base is None:
+            self.base = {'frame_skip': pipeline.frame_skip, 'threads': cv2.getNumThreads()}
+        profile = self.profiles[level]
+
+        cv2.setNumThreads(max(1, min(profile.workers, self.base['threads'])))
+        if hub is not None:
+            hub.detect_scale = profile.detect_scale
+            hub.max_active = profile.workers
+        else:
+            skip = self.base['frame_skip'] * profile.detect_scale
+            power = engine.power
+            if power is not None:
+                power.active_frame_skip = skip
+            if power is None or power.state != IDLE:
+                pipeline.frame_skip = skip
+            if pipeline.pool.scale != profile.resize_factor:
+                pipeline.set_resize_factor(profile.resize_factor)
+        self.applied = level
+
+    def stop(self):
+        self.running = False
+
+
+_governor = None
+
+
+def init_governor(**kwargs):
+    global _governor
+    if _governor is None:
+        _governor = ThermalGovernor(**kwargs)
+        _governor.start()
+    return _governor
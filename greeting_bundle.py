@@ -0,0 +1,123 @@
+"""
+Ahead-of-time greeting audio, built alongside the face encodings.
+
+Every greeting GreetingManager can produce for an enrolled person is known
+in advance: the formal "Hello {name}! ..." (or their special intro) and the
+casual variants built from their nickname. build_bundle() renders all of
+them, plus the unknown-visitor greeting, into one indexed file:
+
+    b'OMNISGB1' | index length (4 bytes, little endian) | JSON index | audio...
+
+The index maps tts_cache.cache_key(text) to (offset, length) in the audio
+section and records the backend/language/TLD the bundle was built with.
+Rendering goes through the TTS cache, so rebuilding after adding one
+person only synthesizes that person's greetings.
+
+At run time the speaker loads the bundle into memory once and plays a
+greeting from it with no synthesis. Names enrolled since the last build
+(voice enrollment) fall back to live TTS and the cache.
+
+    python greeting_bundle.py     # rebuild from images/encoded_file.p
+"""
+import json
+import os
+import struct
+
+import metrics
+from greeting_manager import GreetingManager, UNKNOWN_GREETING
+from tts_cache import cache_key, init_tts_cache
+
+BUNDLE_FILE = os.environ.get('OMNIS_GREETING_BUNDLE', 'images/greetings.bundle')
+MAGIC = b'OMNISGB1'
+LANG = 'en'
+TLD = 'com'
+
+
+def greeting_texts(names, greeter=None):
+    """Every distinct greeting for `names`, in a stable order."""
+    greeter = greeter or GreetingManager()
+    texts = [UNKNOWN_GREETING]
+    for name in sorted(set(names)):
+        texts.extend(greeter.all_greetings(name))
+    return list(dict.fromkeys(texts))
+
+
+def build_bundle(names, path=BUNDLE_FILE, cache=None, greeter=None):
+    """Render every greeting for `names` into `path`. Returns (rendered, failed) counts."""
+    cache = cache or init_tts_cache()
+    texts = greeting_texts(names, greeter)
+    entries, blobs, offset, failed = {}, [], 0, 0
+    for text in texts:
+        try:
+            data = cache.load(text, LANG, TLD)
+        except Exception as e:
+            print(f"[greetings] Could not render '{text}': {e}")
+            failed += 1
+            continue
+        entries[cache_key(text, LANG, TLD, None, cache.backend.name)] = (offset, len(data))
+        blobs.append(data)
+        offset += len(data)
+
+    index = json.dumps({'backend': cache.backend.name, 'lang': LANG, 'tld': TLD, 'entries': entries}).encode()
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(index)) + index)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp, path)
+    print(f"🔈 Greeting bundle: {len(entries)} greetings for {len(set(names))} people "
+          f"({offset // 1024} KB) -> {path}" + (f", {failed} failed" if failed else ""))
+    return len(entries), failed
+
+
+class GreetingBundle:
+    def __init__(self, path=BUNDLE_FILE):
+        with open(path, 'rb') as f:
+            blob = f.read()
+        if blob[:8] != MAGIC:
+            raise ValueError(f"{path} is not a greeting bundle")
+        (size,) = struct.unpack('<I', blob[8:12])
+        index = json.loads(blob[12:12 + size])
+        self.backend = index['backend']
+        self.lang = index['lang']
+        self.tld = index['tld']
+        self.entries = {key: tuple(span) for key, span in index['entries'].items()}
+        self.audio = memoryview(blob)[12 + size:]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, text):
+        """MP3 bytes for `text`, or None if it was not pre-rendered."""
+        span = self.entries.get(cache_key(text, self.lang, self.tld, None, self.backend))
+        if span is None:
+            metrics.inc('greeting_bundle_miss')
+            return None
+        metrics.inc('greeting_bundle_hit')
+        offset, length = span
+        return bytes(self.audio[offset:offset + length])
+
+
+_bundle = None
+_loaded = False
+
+
+def init_greeting_bundle(path=BUNDLE_FILE):
+    """The pre-rendered greetings, or None if no bundle has been built."""
+    global _bundle, _loaded
+    if not _loaded:
+        _loaded = True
+        try:
+            _bundle = GreetingBundle(path)
+            print(f"🔈 Loaded {len(_bundle)} pre-rendered greetings")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Greeting bundle not loaded: {e}")
+    return _bundle
+
+
+if __name__ == '__main__':
+    from vision_pipeline import load_encodings
+    _, ids = load_encodings()
+    build_bundle(ids)
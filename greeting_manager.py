@@ -1,15 +1,25 @@
 import time
 import random
+from collections import OrderedDict
+
+UNKNOWN_GREETING = "Hello! Welcome to M G M Model School."
 
 class GreetingManager:
-    def __init__(self):
+    def __init__(self, clock=time.time):
+        # Time source (replay.py passes a virtual clock so runs are reproducible)
+        self.clock = clock
+
         # Track when we last saw/greeted someone
         # Store: {name: timestamp}
         self.last_greeted = {}
+        # Unknown visitors by temporary id (visitor_clusters.py), oldest first
+        self.visitors_greeted = OrderedDict()
         
         # Configuration
         self.LONG_ABSENCE_THRESHOLD = 1800  # 30 minutes (Full greeting)
         self.SHORT_COOLDOWN = 60            # 1 minute (No greeting at all to avoid spam)
+        self.VISITOR_COOLDOWN = 600         # 10 minutes before the same stranger is welcomed again
+        self.MAX_VISITORS = 256             # Bound on remembered visitor timers
         # Between 1 min and 1 hour -> Short/Casual greeting
         
         self.nicknames = {
@@ -37,34 +47,44 @@ class GreetingManager:
         if name == "Unknown":
             # Rate limit unknown greetings to once every 30 seconds
             last = self.last_greeted.get("Unknown", 0)
-            return (time.time() - last) > 30
+            return (self.clock() - last) > 30
 
         last = self.last_greeted.get(name, 0)
         # Don't greet if we just saw them less than SHORT_COOLDOWN ago
-        return (time.time() - last) > self.SHORT_COOLDOWN
+        return (self.clock() - last) > self.SHORT_COOLDOWN
+
+    def mark_greeted(self, name):
+        """Start `name`'s cooldown without greeting (e.g. just enrolled by voice)."""
+        self.last_greeted[name] = self.clock()
 
     def get_greeting(self, name):
         """Get the appropriate greeting text based on time since last meeting."""
         if not self.should_greet(name):
             return None
             
-        now = time.time()
+        now = self.clock()
         last = self.last_greeted.get(name, 0)
         self.last_greeted[name] = now  # Update timestamp
         
         # Scenario 1: New person or Long time no see (Standard Formal Greeting)
         if last == 0 or (now - last) > self.LONG_ABSENCE_THRESHOLD:
-            # Check for VIP intro first
-            if name in self.special_intros:
-                return self.special_intros[name]
-            return f"Hello {name}! Welcome to MGM Model School."
+            return self._get_formal_greeting(name)
 
         # Scenario 2: Casual re-encounter (Short greeting)
         # Condition: Seen relatively recently (between 1 min and 1 hour)
         return self._get_casual_greeting(name)
 
+    def _get_formal_greeting(self, name):
+        # Check for VIP intro first
+        if name in self.special_intros:
+            return self.special_intros[name]
+        return f"Hello {name}! Welcome to MGM Model School."
+
     def _get_casual_greeting(self, name):
         """Generate a varied casual greeting."""
+        return random.choice(self._casual_options(name))
+
+    def _casual_options(self, name):
         # Priority 1: Explicit nickname
         if name in self.nicknames:
             short_name = self.nicknames[name]
@@ -75,7 +95,7 @@ class GreetingManager:
         else:
             short_name = name
         
-        options = [
+        return [
             f"Hi again {short_name}!",
             f"Welcome back {short_name}.",
             f"Good to see you {short_name}.",
@@ -83,10 +103,23 @@ class GreetingManager:
             f"Hello there {short_name}!"
             
         ]
-        return random.choice(options)
 
-    def get_unknown_greeting(self):
+    def all_greetings(self, name):
+        """Every greeting get_greeting() can say to `name` (for greeting_bundle.py)."""
+        return [self._get_formal_greeting(name)] + self._casual_options(name)
+
+    def should_greet_visitor(self, visitor_id):
+        """Per-stranger timer, so two visitors don't block each other."""
+        last = self.visitors_greeted.get(visitor_id, 0)
+        return (self.clock() - last) > self.VISITOR_COOLDOWN
+
+    def get_unknown_greeting(self, visitor_id=None):
         """Greeting for unknown people."""
-        now = time.time()
+        now = self.clock()
         self.last_greeted["Unknown"] = now
-        return "Hello! Welcome to M G M Model School."
+        if visitor_id:
+            self.visitors_greeted[visitor_id] = now
+            self.visitors_greeted.move_to_end(visitor_id)
+            while len(self.visitors_greeted) > self.MAX_VISITORS:
+                self.visitors_greeted.popitem(last=False)
+        return UNKNOWN_GREETING
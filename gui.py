@@ -1,14 +1,16 @@
 import sys
+import time
 
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt, QTimer
 from PyQt5.QtGui import QImage, QPixmap, QFont
 from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QLabel, QApplication
 
 from FaceRecognition import FaceRecognitionThread
+import metrics
 
 
 class FaceRecognitionSignals(QObject):
-    frame_signal = pyqtSignal(QImage)
+    frame_ready = pyqtSignal()
     name_signal = pyqtSignal(str)
     image_signal = pyqtSignal(QImage)
 
@@ -28,6 +30,9 @@ class MainWindow(QWidget):
         self.webcam_label = QLabel()
         self.webcam_label.setAlignment(Qt.AlignLeft)
         webcam_layout.addWidget(self.webcam_label)
+        # Displayed FPS / frames dropped because the UI was behind
+        self.stats_label = QLabel()
+        webcam_layout.addWidget(self.stats_label)
 
         image_layout = QVBoxLayout()
         self.image_label = QLabel()
@@ -43,15 +48,21 @@ class MainWindow(QWidget):
 
         self.face_recognition_signals = FaceRecognitionSignals()
         # Connect the frame signal from the face recognition thread to UI update slot
-        self.face_recognition_signals.frame_signal.connect(self.update_frame)
+        self.face_recognition_signals.frame_ready.connect(self.update_frame)
         self.face_recognition_signals.name_signal.connect(self.update_name)
         self.face_recognition_signals.image_signal.connect(self.update_avatar)
 
+        self.displayed_frames = 0
+        self.stats_time = time.monotonic()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
+
 
     def start_face_recognition(self):
         # Create the face recognition thread
         self.face_recognition_thread = FaceRecognitionThread()
-        self.face_recognition_thread.frame_signal.connect(self.face_recognition_signals.frame_signal.emit)
+        self.face_recognition_thread.frame_ready.connect(self.face_recognition_signals.frame_ready.emit)
         self.face_recognition_thread.name_signal.connect(self.face_recognition_signals.name_signal.emit)
         self.face_recognition_thread.image_signal.connect(self.face_recognition_signals.image_signal.emit)
         self.face_recognition_thread.start()
@@ -59,13 +70,33 @@ class MainWindow(QWidget):
     def stop_face_recognition(self):
         if self.face_recognition_thread is not None:
             self.face_recognition_thread.stop()
-            self.face_recognition_thread.join()
-
-    @pyqtSlot(QImage)
-    def update_frame(self, q_image):
-        # Update UI with processed image
+            self.face_recognition_thread.wait()
+
+    @pyqtSlot()
+    def update_frame(self):
+        # Only the newest frame is shown; older ones were dropped by the thread
+        if self.face_recognition_thread is None:
+            return
+        slot = self.face_recognition_thread.frame_slot
+        q_image = slot.take()
+        if q_image is None:
+            return
+        # Update UI with processed image (QPixmap holds its own copy)
         pixmap = QPixmap.fromImage(q_image)
         self.webcam_label.setPixmap(pixmap)
+        slot.recycle(q_image)
+        self.displayed_frames += 1
+
+    @pyqtSlot()
+    def update_stats(self):
+        now = time.monotonic()
+        fps = self.displayed_frames / max(1e-6, now - self.stats_time)
+        self.displayed_frames = 0
+        self.stats_time = now
+        dropped = self.face_recognition_thread.frame_slot.dropped if self.face_recognition_thread else 0
+        self.stats_label.setText(f"Display: {fps:.1f} FPS | Dropped: {dropped}")
+        metrics.set_gauge('gui_display_fps', round(fps, 2))
+        metrics.set_gauge('gui_dropped_frames', dropped)
 
     @pyqtSlot(QImage)
     def update_avatar(self, q_image):
@@ -90,4 +121,6 @@ if __name__ == '__main__':
 
     main_window.show()
 
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    main_window.stop_face_recognition()
+    sys.exit(exit_code)
@@ -3,6 +3,8 @@ import os
 import time
 import threading
 import random
+
+from state_bus import bus
 try:
     import pigpio
 except ImportError:
@@ -47,11 +49,25 @@ class HeadController(threading.Thread):
         
         self.last_face_time = 0
         self.is_speaking = False
+        self.parked = False   # Idle power mode: centred, servos released
+        self.released = False
+        self.woken = threading.Event()
         self.running = True
+        bus.subscribe(lambda old, new: self.set_speaking(new.speaking), keys=('speaking',))
 
     def set_speaking(self, status):
         self.is_speaking = status
 
+    def park(self):
+        """Centre the head and release the servos (idle power mode)."""
+        self.target_pan = CENTER_PWM
+        self.target_tilt = CENTER_PWM
+        self.parked = True
+
+    def wake(self):
+        self.parked = False
+        self.woken.set()
+
     def track_face(self, face_center_x, face_center_y, frame_w=160, frame_h=120):
         """
         Adjust targets based on face position in frame.
@@ -81,6 +97,31 @@ class HeadController(threading.Thread):
         print("🤖 HeadController: Started movement loop.")
         while self.running:
             now = time.time()
+
+            # 0. PARKED (Idle power mode): settle at centre, then stop driving the servos
+            if self.parked:
+                if not self.released:
+                    self.current_pan += (self.target_pan - self.current_pan) * SMOOTHING
+                    self.current_tilt += (self.target_tilt - self.current_tilt) * SMOOTHING
+                    settled = abs(self.current_pan - CENTER_PWM) < 5 and abs(self.current_tilt - CENTER_PWM) < 5
+                    if self.pi:
+                        try:
+                            if settled:
+                                self.pi.set_servo_pulsewidth(PAN_PIN, 0)
+                                self.pi.set_servo_pulsewidth(TILT_PIN, 0)
+                            else:
+                                self.pi.set_servo_pulsewidth(PAN_PIN, int(self.current_pan))
+                                self.pi.set_servo_pulsewidth(TILT_PIN, int(self.current_tilt))
+                        except:
+                            pass
+                    self.released = settled
+                if self.released:
+                    self.woken.wait(1.0)  # Nothing to drive until wake()
+                    self.woken.clear()
+                else:
+                    time.sleep(0.02)
+                continue
+            self.released = False
             
             # 1. HANDLE GESTURES (When speaking)
             if self.is_speaking:
@@ -112,6 +153,7 @@ class HeadController(threading.Thread):
 
     def stop(self):
         self.running = False
+        self.woken.set()
         if self.pi:
             self.pi.set_servo_pulsewidth(PAN_PIN, 0) # Release servos
             self.pi.set_servo_pulsewidth(TILT_PIN, 0)
@@ -1,74 +1,58 @@
 import os
-import pickle
-import cv2
-import numpy as np
-import cvzone
-import face_recognition
-import time
-from speaker import speak, is_speaking
+import signal
+from speaker import speak, is_speaking, stop_speaking, play_earcon, init_speaker_thread
 from sr_class import SpeechRecognitionThread
-import shared_state
 from greeting_manager import GreetingManager
 from head_controller import init_head
+from vision_pipeline import build_pipeline, load_encodings
+from vision_engine import VisionEngine
+from vision_sinks import KioskSink, HeadlessSink
+from attendance import AttendanceSink, init_attendance
+from enrollment import EnrollmentSink, init_enrollment
+from power import init_power
+from governor import init_governor
+from presence import PresenceSink, init_presence
+import metrics
 
 # Adapter for SR thread
 class SpeakerAdapter:
-    def speak(self, text):
-        speak(text)
+    def speak(self, text, kind='answer'):
+        speak(text, kind)
+
+    def stop(self):
+        """Silence: cut off the current speech and drop the queue."""
+        stop_speaking()
+
+    def cancel(self, kind=None):
+        return init_speaker_thread().cancel(kind)
+
+    def earcon(self, name):
+        return play_earcon(name)
 
 speaker_adapter = SpeakerAdapter()
 
-# Global Configuration
-FACE_MATCH_TOLERANCE = float(os.environ.get('FACE_MATCH_TOLERANCE', '0.50'))
-MAX_FACES = int(os.environ.get('FACE_MAX_FACES', '4'))
-FRAME_SKIP = 5  # Increased for speed (Process face every 5 frames)
-RESIZE_FACTOR = 0.20 # Downscale more (0.20 instead of 0.25)
+# Global Configuration (recognition defaults live in vision_pipeline.py)
+# OMNIS_HEADLESS=1 runs without the kiosk window, OMNIS_MJPEG=1 adds the live view stream
+HEADLESS = os.environ.get('OMNIS_HEADLESS', '0') == '1'
+MJPEG = os.environ.get('OMNIS_MJPEG', '0') == '1'
+ATTENDANCE = os.environ.get('OMNIS_ATTENDANCE', '1') == '1'
+# OMNIS_CAMERAS="entrance=0@2,reception=1" runs several cameras on one recognition pool (see multi_camera.py)
+CAMERAS = os.environ.get('OMNIS_CAMERAS', '')
+# OMNIS_ENROLL=0 stops OMNIS asking unknown visitors for their name
+ENROLL = os.environ.get('OMNIS_ENROLL', '1') == '1'
+# OMNIS_POWER=0 keeps full speed even when nobody is around (see power.py)
+POWER = os.environ.get('OMNIS_POWER', '1') == '1'
+# OMNIS_GOVERNOR=0 disables thermal stepping (see governor.py)
+GOVERNOR = os.environ.get('OMNIS_GOVERNOR', '1') == '1'
+# OMNIS_CLIPS=1 records debug clips around unknown faces / shaky matches (see clip_recorder.py)
+CLIPS = os.environ.get('OMNIS_CLIPS', '0') == '1'
 
 # Initialize Greeting Manager
 greeter = GreetingManager()
 
-# Load Resources
-print("Loading Resources...")
-try:
-    imgBackground = cv2.imread('Resources/background.png')
-    folderModePath = 'Resources/Modes'
-    imgModeList = [cv2.imread(os.path.join(folderModePath, p)) for p in sorted(os.listdir(folderModePath))]
-except Exception as e:
-    print(f"Warning: Could not load background/modes: {e}")
-    imgBackground = np.zeros((720, 1280, 3), np.uint8) # Fallback black screen
-    imgModeList = []
-
-# Load Encodings
-print("Loading Encoded File...")
-try:
-    with open(r'images/encoded_file.p', 'rb') as f:
-        encode_list_known_with_ids = pickle.load(f)
-    encode_list_known, studentIds = encode_list_known_with_ids
-    print(f"Loaded {len(studentIds)} people.")
-except Exception as e:
-    print(f"Error loading encodings: {e}")
-    encode_list_known, studentIds = [], []
-
-# Reset shared state
-try:
-    shared_state.awaiting_name = False
-except:
-    pass
-
 def main():
-    global imgBackground
-    cap = cv2.VideoCapture(0)
-    cap.set(3, 640)
-    cap.set(4, 480)
-    
-    mode_type = 0
     speech_thread = None
-    
-    # Trackers
-    frame_count = 0
-    current_faces = []      # Last detected face locations
-    current_ids = []        # Last detected face IDs
-    
+
     # Start Voice Listener Immediately (Always-on Assistant)
     print("Starting Voice Assistant...")
     try:
@@ -81,157 +65,90 @@ def main():
     # Initialize Head Controller
     head = init_head()
 
-    print("Starting OMNIS Main Loop...")
-    
-    try:
-        while True:
-            success, img = cap.read()
-            if not success or img is None:
-                if frame_count % 30 == 0:
-                    print("⚠️ Warning: Camera not reading. Check connection.")
-                # Create a black placeholder image so the GUI still shows up
-                img = np.zeros((480, 640, 3), np.uint8)
-                success = True
-            
-            frame_count += 1
-            
-            # --- VISION PIPELINE (Optimized) ---
-            # Only run heavy Face Recognition every N frames
-            if frame_count % FRAME_SKIP == 0:
-                imgS = cv2.resize(img, (0, 0), None, RESIZE_FACTOR, RESIZE_FACTOR)
-                imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
-                
-                try:
-                    face_locs = face_recognition.face_locations(imgS)
-                    # Limit faces to prevent lag
-                    if len(face_locs) > MAX_FACES:
-                        face_locs = face_locs[:MAX_FACES]
-                        
-                    if face_locs:
-                        face_encs = face_recognition.face_encodings(imgS, face_locs)
-                        
-                        new_ids = []
-                        for encodeFace in face_encs:
-                            matches = face_recognition.compare_faces(encode_list_known, encodeFace, tolerance=FACE_MATCH_TOLERANCE)
-                            face_dist = face_recognition.face_distance(encode_list_known, encodeFace)
-                            
-                            match_index = np.argmin(face_dist) if len(face_dist) > 0 else -1
-                            
-                            if match_index != -1 and matches[match_index]:
-                                new_ids.append(studentIds[match_index])
-                            else:
-                                new_ids.append("Unknown")
-                        
-                        current_faces = face_locs
-                        current_ids = new_ids
-                        # Update shared state for Voice Commands ("Who is here?")
-                        shared_state.detected_people = current_ids
-                    else:
-                        current_faces = []
-                        current_ids = []
-                        shared_state.detected_people = []
-                        
-                except Exception as e:
-                    print(f"Face Rec Error: {e}")
-
-            # --- HEAD TRACKING ---
-            if head:
-                head.set_speaking(is_speaking())
-                if current_faces:
-                    # Target the first face detected
-                    y1, x2, y2, x1 = current_faces[0]
-                    cx = (x1 + x2) / 2
-                    cy = (y1 + y2) / 2
-                    # Note: We pass resized coordinates (relative to RESIZE_FACTOR frame)
-                    head.track_face(cx, cy)
-            
-            # --- DRAWING PIPELINE ---
+    # Latency metrics: local Prometheus endpoint + periodic summary line
+    metrics.start_metrics_server()
+    metrics.start_summary_logger()
+
+    # Attendance / event log (SQLite writer thread, never blocks the loop)
+    attendance = init_attendance() if ATTENDANCE else None
+
+    def on_greeting(greeting_text, person_id):
+        nonlocal speech_thread
+        print(f"Greeting: {greeting_text}")
+        speak(greeting_text, 'greeting')
+        if attendance:
+            attendance.log_event('greeting', person_id, greeting_text)
+
+        # Trigger Voice Listener if not active
+        # (Thread is now started globally, so we just ensure it's still running)
+        if person_id and not (speech_thread and speech_thread.is_alive()):
+            # Restart if crashed
             try:
-                # Paste webcam feed
-                imgBackground[162:162+480, 55:55+640] = img
-                if imgModeList:
-                    imgBackground[44:44+633, 808:808+414] = imgModeList[mode_type]
-            except Exception:
-                pass # Prevent crash if resize fails or bg image mismatch
-            
-            detected_person_for_greeting = None
-            
-            if current_faces:
-                # We have faces (either fresh or cached from previous frame)
-                for i, (y1, x2, y2, x1) in enumerate(current_faces):
-                    # Scale back up (1 / 0.20 = 5)
-                    y1, x2, y2, x1 = y1*5, x2*5, y2*5, x1*5
-                    person_id = current_ids[i]
-                    
+                speech_thread = SpeechRecognitionThread(speaker_adapter)
+                speech_thread.daemon = True
+                speech_thread.start()
+            except: pass
+
+    display = HeadlessSink() if HEADLESS else KioskSink("Face Attendance")
+    sinks = [display]
+    if MJPEG:
+        # Streams the kiosk screen, or the annotated camera feed when headless
+        from mjpeg_server import MjpegSink
+        sinks.append(MjpegSink(kiosk=None if HEADLESS else display))
+
+    hub = None
+    if CAMERAS:
+        # Several cameras: the hub recognises all of them, the loop shows the first one
+        from multi_camera import CameraHub, parse_camera_spec
+        hub = CameraHub(parse_camera_spec(CAMERAS), *load_encodings())
+        if attendance:
+            def log_sightings(camera, result):
+                for person_id in result.ids:
                     if person_id != "Unknown":
-                        # Known Face
-                        mode_type = 1
-                        bbox = (55+x1, 162+y1, x2 - x1, y2 - y1)
-                        imgBackground = cvzone.cornerRect(imgBackground, bbox=bbox, rt=0)
-                        
-                        # Find the largest/main face to greet
-                        detected_person_for_greeting = person_id
-                        
-                        # UI: Name
-                        (w, h), _ = cv2.getTextSize(person_id, cv2.FONT_HERSHEY_COMPLEX, 1, 1)
-                        offset = (414 - w) / 2
-                        cv2.putText(imgBackground, str(person_id), (808 + int(offset), 445), cv2.FONT_HERSHEY_COMPLEX, 1, (50, 50, 50), 1)
-                        
-                        # UI: Image
-                        img_path = f'images/faces/{person_id}.jpg'
-                        if os.path.exists(img_path):
-                            student_img = cv2.imread(img_path)
-                            if student_img is not None:
-                                try:
-                                    student_img = cv2.resize(student_img, (216, 216))
-                                    imgBackground[175:175 + 216, 909:909 + 216] = student_img
-                                except: pass
-                    
-                    else:
-                        # Unknown Face
-                        mode_type = 0
-                        cv2.rectangle(imgBackground, (55+x1, 162+y1), (55+x2, 162+y2), (0, 0, 255), 2)
-                        
-            else:
-                mode_type = 0
-
-
-            # --- GREETING PIPELINE ---
-            # Don't interrupt if already speaking or listening
-            if not is_speaking():
-                if detected_person_for_greeting:
-                    # Check our smart manager
-                    greeting_text = greeter.get_greeting(detected_person_for_greeting)
-                    if greeting_text:
-                        print(f"Greeting: {greeting_text}")
-                        speak(greeting_text)
-                        
-                        # Trigger Voice Listener if not active
-                        # (Thread is now started globally, so we just ensure it's still running)
-                        if not (speech_thread and speech_thread.is_alive()):
-                             # Restart if crashed
-                            try:
-                                speech_thread = SpeechRecognitionThread(speaker_adapter)
-                                speech_thread.daemon = True
-                                speech_thread.start()
-                            except: pass
-
-                elif len(current_ids) > 0 and "Unknown" in current_ids:
-                    # Maybe greet unknown?
-                    if greeter.should_greet("Unknown"):
-                        msg = greeter.get_unknown_greeting()
-                        speak(msg)
-
-
-            cv2.imshow("Face Attendance", imgBackground)
-            if cv2.waitKey(1) == ord('q'):
-                break
-                
-    except KeyboardInterrupt:
-        print("Stopping...")
+                        attendance.record_sighting(person_id, result.ts)
+            hub.on_result.append(log_sightings)
+        hub.start()
+        pipeline, source, clusters = hub.pipeline_for(greeter=greeter), hub.display_source(), hub.clusters
+        galleries = list(hub.pipelines.values())
+    else:
+        if attendance:
+            sinks.append(AttendanceSink(attendance))
+        pipeline, source = build_pipeline(greeter=greeter), 0
+        clusters, galleries = pipeline.clusters, [pipeline]
+
+    if CLIPS:
+        from clip_recorder import ClipRecorderSink
+        clips = ClipRecorderSink()
+        sinks.append(clips)
+        if hasattr(signal, 'SIGUSR1'):
+            # Manual trigger: kill -USR1 <pid>
+            signal.signal(signal.SIGUSR1, lambda signum, frame: clips.trigger('manual'))
+
+    # Presence index for "who is here / who was here" (the vision loop is its only writer)
+    sinks.append(PresenceSink(init_presence(), hub=hub))
+
+    # Voice enrollment of unknown visitors (needs visitor clustering)
+    if ENROLL and clusters is not None:
+        enrollment = init_enrollment(clusters, ask=speak, pipelines=galleries, greeter=greeter)
+        sinks.append(EnrollmentSink(enrollment))
+
+    power = init_power() if POWER else None
+    governor = init_governor() if GOVERNOR else None
+    engine = VisionEngine(pipeline, source=source, sinks=sinks, head=head, is_speaking=is_speaking,
+                          on_greeting=on_greeting, publish_state=hub is None, power=power,
+                          governor=governor)
+
+    print("Starting OMNIS Main Loop...")
+    try:
+        engine.run()
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
+        if power:
+            print(f"Power report: {power.report()}")
+        if hub:
+            hub.stop()
+        if attendance:
+            # Hub mode has no AttendanceSink to close it: write what is still queued
+            attendance.close()
         if speech_thread:
             speech_thread.stop()
 
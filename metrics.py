@@ -0,0 +1,210 @@
+"""
+Low-overhead latency metrics for OMNIS.
+
+Every hot path records its duration into a per-stage histogram:
+
+    import metrics
+    with metrics.timed('asr'):
+        text = recognizer.recognize_google(audio)
+    metrics.observe('detect', seconds)
+
+Each histogram keeps lifetime Prometheus buckets plus a small ring of recent
+samples for rolling percentiles. `start_metrics_server()` serves them in
+Prometheus text format on a local port and `start_summary_logger()` prints a
+one-line summary periodically. Recording costs a perf_counter() pair, a
+bisect and an uncontended lock (see bench_metrics.py), so it stays on in
+production. Set OMNIS_METRICS=0 to turn it into a no-op.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get('OMNIS_METRICS', '1') != '0'
+METRICS_HOST = os.environ.get('OMNIS_METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('OMNIS_METRICS_PORT', '9108'))
+SUMMARY_INTERVAL = float(os.environ.get('OMNIS_METRICS_LOG_INTERVAL', '60'))
+
+# Seconds. Covers sub-ms draw calls up to multi-second Gemini/gTTS calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+WINDOW = 512  # Recent samples kept per stage for rolling percentiles
+
+
+class Histogram:
+    def __init__(self, name, buckets=DEFAULT_BUCKETS, window=WINDOW):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+            self.recent.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count, list(self.recent)
+
+    def percentiles(self, qs=(0.5, 0.9, 0.99)):
+        """Rolling percentiles (seconds) over the recent window."""
+        with self.lock:
+            recent = sorted(self.recent)
+        if not recent:
+            return {}
+        last = len(recent) - 1
+        return {q: recent[min(last, int(q * len(recent)))] for q in qs}
+
+
+class Registry:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, name):
+        h = self.histograms.get(name)
+        if h is None:
+            with self.lock:
+                h = self.histograms.setdefault(name, Histogram(name))
+        return h
+
+    def observe(self, name, seconds):
+        if ENABLED:
+            self.histogram(name).observe(seconds)
+
+    def inc(self, name, amount=1):
+        if ENABLED:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        if ENABLED:
+            self.gauges[name] = value
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP omnis_stage_latency_seconds Latency of OMNIS pipeline stages.",
+            "# TYPE omnis_stage_latency_seconds histogram",
+        ]
+        for name in sorted(self.histograms):
+            counts, total, count, _ = self.histograms[name].snapshot()
+            cumulative = 0
+            for le, c in zip(self.histograms[name].buckets, counts):
+                cumulative += c
+                lines.append(f'omnis_stage_latency_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'omnis_stage_latency_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'omnis_stage_latency_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'omnis_stage_latency_seconds_count{{stage="{name}"}} {count}')
+
+        if self.counters:
+            lines.append("# TYPE omnis_events_total counter")
+            for name in sorted(self.counters):
+                lines.append(f'omnis_events_total{{event="{name}"}} {self.counters[name]}')
+        if self.gauges:
+            lines.append("# TYPE omnis_gauge gauge")
+            for name in sorted(self.gauges):
+                lines.append(f'omnis_gauge{{name="{name}"}} {self.gauges[name]}')
+        return "\n".join(lines) + "\n"
+
+    def summary_line(self):
+        parts = []
+        for name in sorted(self.histograms):
+            p = self.histograms[name].percentiles((0.5, 0.99))
+            if p:
+                parts.append(f"{name} p50={p[0.5] * 1000:.1f}ms p99={p[0.99] * 1000:.1f}ms")
+        return " | ".join(parts)
+
+
+REGISTRY = Registry()
+
+
+def observe(name, seconds):
+    REGISTRY.observe(name, seconds)
+
+
+def inc(name, amount=1):
+    REGISTRY.inc(name, amount)
+
+
+def set_gauge(name, value):
+    REGISTRY.set_gauge(name, value)
+
+
+class timed:
+    """Context manager: `with timed('gemini'): ...` records the block's duration."""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = REGISTRY.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass  # Keep the console for OMNIS logs
+
+
+_server = None
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics on a daemon thread. Returns the server, or None if disabled/failed."""
+    global _server
+    if _server is not None:
+        return _server
+    if not ENABLED or not port:
+        return None
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True, name='metrics-http').start()
+    print(f"📈 Metrics at http://{host}:{port}/metrics")
+    return _server
+
+
+def start_summary_logger(interval=SUMMARY_INTERVAL):
+    """Print a rolling p50/p99 summary every `interval` seconds (0 disables)."""
+    if not ENABLED or interval <= 0:
+        return None
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            line = REGISTRY.summary_line()
+            if line:
+                print(f"📈 {line}")
+
+    t = threading.Thread(target=_loop, daemon=True, name='metrics-summary')
+    t.start()
+    return t
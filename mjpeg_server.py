@@ -0,0 +1,187 @@
+"""
+MJPEG live view sink for VisionEngine.
+
+Serves the kiosk frame (or, headless, the annotated camera feed) at
+http://<robot>:8090/ as multipart/x-mixed-replace so it can be watched
+from any browser.
+
+Cost model:
+- Nobody watching: publish() returns on its first line, and the encoder
+  thread sleeps.
+- Watching: at most OMNIS_MJPEG_FPS times a second, the vision thread
+  copies the frame into a spare buffer (one memcpy). The encoder thread
+  annotates and JPEG-encodes it once, and every client is sent those same
+  bytes.
+- A slow client always picks up the newest JPEG when its socket is free.
+  The frames in between are dropped for that client only (counted as
+  mjpeg_dropped), so it never holds up the loop or other viewers.
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+import metrics
+from vision_sinks import Sink
+
+MJPEG_PORT = int(os.environ.get('OMNIS_MJPEG_PORT', '8090'))
+MJPEG_QUALITY = int(os.environ.get('OMNIS_MJPEG_QUALITY', '80'))
+MJPEG_FPS = float(os.environ.get('OMNIS_MJPEG_FPS', '10'))
+SEND_TIMEOUT = 10.0  # Give up on a client whose socket has not drained for this long
+BOUNDARY = 'omnisframe'
+
+
+def annotate(dst, frame, faces):
+    """Copy `frame` into `dst` and draw the face boxes/names on it."""
+    np.copyto(dst, frame)
+    for (y1, x2, y2, x1), person_id in faces:
+        color = (0, 0, 255) if person_id == "Unknown" else (0, 255, 0)
+        cv2.rectangle(dst, (x1, y1), (x2, y2), color, 2, cv2.LINE_AA)
+        cv2.putText(dst, person_id, (x1, max(0, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return dst
+
+
+class MjpegSink(Sink):
+    name = 'mjpeg'
+
+    def __init__(self, port=MJPEG_PORT, host='0.0.0.0', quality=MJPEG_QUALITY, fps=MJPEG_FPS, kiosk=None):
+        self.port = port
+        self.host = host
+        self.quality = quality
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.kiosk = kiosk  # KioskSink whose rendered screen to stream (must publish before us)
+        self.server = None
+        self.clients = 0
+        self.closed = False
+
+        # Vision thread -> encoder: `back` is filled while the encoder works on `front`
+        self.frame_lock = threading.Lock()
+        self.frame_ready = threading.Condition(self.frame_lock)
+        self.back = None
+        self.front = None
+        self.back_faces = None  # Faces to draw, or None when the frame is already annotated
+        self.pending = False
+        self.last_publish = 0.0
+        self.canvas = None
+
+        # Encoder -> clients
+        self.cond = threading.Condition()
+        self.jpeg = None
+        self.seq = 0
+
+    def open(self):
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/stream.mjpg'):
+                    self.send_error(404)
+                    return
+                self.connection.settimeout(SEND_TIMEOUT)
+                self.send_response(200)
+                self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                sink.serve_client(self.wfile)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"⚠️ MJPEG stream not started on port {self.port}: {e}")
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True, name='mjpeg-http').start()
+        threading.Thread(target=self._encoder, daemon=True, name='mjpeg-encoder').start()
+        print(f"📺 Live view at http://{self.host}:{self.port}/")
+
+    # --- HTTP client threads ---
+
+    def serve_client(self, wfile):
+        with self.cond:
+            self.clients += 1
+            metrics.set_gauge('mjpeg_clients', self.clients)
+        last_seq = self.seq
+        try:
+            while not self.closed:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.seq != last_seq or self.closed, timeout=5)
+                    jpeg, seq = self.jpeg, self.seq
+                if jpeg is None or seq == last_seq:
+                    continue
+                if last_seq and seq - last_seq > 1:
+                    metrics.inc('mjpeg_dropped', seq - last_seq - 1)  # This client fell behind
+                last_seq = seq
+                wfile.write(f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n'.encode())
+                wfile.write(jpeg)
+                wfile.write(b'\r\n')
+        except (BrokenPipeError, ConnectionResetError, TimeoutError, OSError):
+            pass
+        finally:
+            with self.cond:
+                self.clients -= 1
+                metrics.set_gauge('mjpeg_clients', self.clients)
+
+    # --- Vision thread ---
+
+    def publish(self, result):
+        if not self.clients:
+            return True  # Nobody watching: no copy, no encode
+        now = time.monotonic()
+        if now - self.last_publish < self.interval:
+            return True
+        self.last_publish = now
+
+        screen = getattr(self.kiosk, 'screen', None) if self.kiosk is not None else None
+        src, faces = (screen, None) if screen is not None else (result.frame, result.faces)
+        with self.frame_lock:
+            if self.back is None or self.back.shape != src.shape:
+                self.back = np.empty_like(src)
+            np.copyto(self.back, src)
+            self.back_faces = list(faces) if faces is not None else None
+            if self.pending:
+                metrics.inc('mjpeg_dropped')  # Encoder still busy with an older frame
+            self.pending = True
+            self.frame_ready.notify()
+        return True
+
+    # --- Encoder thread ---
+
+    def _encoder(self):
+        while not self.closed:
+            with self.frame_lock:
+                self.frame_ready.wait_for(lambda: self.pending or self.closed, timeout=5)
+                if not self.pending:
+                    continue
+                self.back, self.front = self.front, self.back
+                faces = self.back_faces
+                self.pending = False
+
+            t0 = time.perf_counter()
+            frame = self.front
+            if faces is not None:
+                if self.canvas is None or self.canvas.shape != frame.shape:
+                    self.canvas = np.empty_like(frame)
+                frame = annotate(self.canvas, frame, faces)
+            ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            metrics.observe('mjpeg_encode', time.perf_counter() - t0)
+            if ok:
+                with self.cond:
+                    self.jpeg = buf.tobytes()
+                    self.seq += 1
+                    self.cond.notify_all()
+
+    def close(self):
+        self.closed = True
+        with self.frame_lock:
+            self.frame_ready.notify_all()
+        with self.cond:
+            self.cond.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
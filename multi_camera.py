@@ -0,0 +1,391 @@
+"""
+Multiple cameras on one robot controller.
+
+Each camera gets a CameraFeed thread that only captures (latest frame wins,
+nothing queues up). A single CameraHub owns a small pool of recognition
+workers shared by all cameras. Whenever a worker is free it picks the camera
+with the lowest virtual time among those with a fresh frame that are due
+for detection (stride scheduling): a camera with priority 2 gets twice the
+detections of a priority 1 camera under load, and no camera can starve
+another. Only one job per camera is ever in flight.
+
+Results from every camera are merged into one presence view (who is where,
+last seen when), mirrored into the state bus. All cameras
+share one VisitorClusters, so a stranger walking from one camera to the
+next keeps the same visitor id and is counted once. HubPipeline
+lets a VisionEngine display any one camera with the hub's results, so the
+kiosk, sinks and greeting logic work unchanged.
+
+OMNIS_CAMERAS="entrance=0@2,reception=1" -> name=source@priority
+"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+from state_bus import bus
+from frame_buffers import FrameBufferPool
+from vision_engine import open_capture
+from vision_pipeline import VisionPipeline, RESIZE_FACTOR, FRAME_SKIP
+from visitor_clusters import VisitorClusters, VISITOR_SLOTS
+
+CAMERA_WORKERS = int(os.environ.get('OMNIS_CAMERA_WORKERS', '2'))
+DETECT_HZ = float(os.environ.get('OMNIS_DETECT_HZ', str(30.0 / FRAME_SKIP)))  # per camera, like FRAME_SKIP at 30 FPS
+PRESENCE_WINDOW = 3.0  # Seconds a sighting counts as "here now" in the merged view
+
+
+def parse_camera_spec(spec):
+    """"entrance=0@2,reception=rtsp://..." -> [(name, source, priority)]."""
+    cameras = []
+    for i, part in enumerate(p.strip() for p in spec.split(',') if p.strip()):
+        name = f"cam{i}"
+        if '=' in part and '://' not in part.split('=', 1)[0]:
+            name, part = part.split('=', 1)
+        priority = 1.0
+        if '@' in part:
+            rest, prio = part.rsplit('@', 1)
+            if prio.replace('.', '', 1).isdigit():  # not the user@host of a URL
+                part, priority = rest, float(prio)
+        source = int(part) if part.isdigit() else part
+        cameras.append((name.strip(), source, priority))
+    return cameras
+
+
+class CameraFeed(threading.Thread):
+    """Capture-only thread for one camera. Keeps just the latest frame."""
+
+    def __init__(self, name, source, priority=1.0, width=640, height=480):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.name = name
+        self.source = source
+        self.priority = max(0.01, priority)
+        # 3 slots: the capture thread never writes the published slot while a consumer copies it
+        self.pool = FrameBufferPool(width, height, RESIZE_FACTOR, slots=3)
+        self.lock = threading.Lock()
+        self.new_frame = threading.Condition(self.lock)
+        self.frame = None
+        self.frame_ts = 0.0
+        self.seq = 0
+        self.on_frame = None  # Set by CameraHub to wake workers
+        self.running = True
+
+        # Stats
+        self.captured = 0
+        self.failures = 0
+        self.fps = 0.0
+        self._fps_count = 0
+        self._fps_time = time.monotonic()
+
+    def run(self):
+        cap = open_capture(self.source, self.pool.width, self.pool.height)
+        while self.running:
+            success, frame = self.pool.read(cap)
+            if not success:
+                self.failures += 1
+                if self.failures % 30 == 1:
+                    print(f"⚠️ Camera '{self.name}' not reading. Check connection.")
+                time.sleep(0.1)
+                if self.failures % 50 == 0 and hasattr(cap, 'release'):
+                    cap.release()
+                    cap = open_capture(self.source, self.pool.width, self.pool.height)
+                continue
+
+            with self.lock:
+                self.frame = frame
+                self.frame_ts = time.time()
+                self.seq += 1
+                self.new_frame.notify_all()
+            self.captured += 1
+            self._update_fps()
+            if self.on_frame:
+                self.on_frame(self)
+        if hasattr(cap, 'release'):
+            cap.release()
+
+    def _update_fps(self):
+        self._fps_count += 1
+        now = time.monotonic()
+        if now - self._fps_time >= 1.0:
+            self.fps = self._fps_count / (now - self._fps_time)
+            self._fps_count = 0
+            self._fps_time = now
+            metrics.set_gauge(f'camera_{self.name}_fps', round(self.fps, 2))
+
+    def copy_latest(self, dst):
+        """Copy the latest frame into `dst`. Returns (seq, capture ts) or (0, 0) if none yet."""
+        with self.lock:
+            if self.frame is None:
+                return 0, 0.0
+            if self.frame.shape == dst.shape:
+                np.copyto(dst, self.frame)
+            else:
+                cv2.resize(self.frame, (dst.shape[1], dst.shape[0]), dst=dst)
+            return self.seq, self.frame_ts
+
+    def downscale_latest(self, pipeline):
+        """Downscale the latest frame into `pipeline`'s own buffer. Returns (seq, ts, small rgb)."""
+        with self.lock:
+            if self.frame is None:
+                return 0, 0.0, None
+            return self.seq, self.frame_ts, pipeline.pool.downscale(self.frame)
+
+    def stop(self):
+        self.running = False
+
+
+class CameraResult:
+    __slots__ = ('seq', 'frame_seq', 'faces', 'ids', 'visitors', 'margins', 'ts', 'latency')
+
+    def __init__(self, seq=0, frame_seq=0, faces=(), ids=(), visitors=(), margins=(), ts=0.0, latency=0.0):
+        self.seq = seq              # Result counter for this camera
+        self.frame_seq = frame_seq  # Feed frame the result was computed on
+        self.faces = list(faces)    # Small-frame (top, right, bottom, left)
+        self.ids = list(ids)
+        self.visitors = list(visitors)  # Visitor id per face, None for known faces
+        self.margins = list(margins)
+        self.ts = ts                # Capture time of that frame
+        self.latency = latency      # Capture -> result, seconds
+
+
+class CameraHub:
+    def __init__(self, cameras, known_encodings, known_ids, workers=CAMERA_WORKERS,
+                 detect_hz=DETECT_HZ, width=640, height=480, clusters=None):
+        self.cond = threading.Condition()
+        self.feeds = {}
+        self.pipelines = {}
+        self.results = {}
+        self.vtime = {}
+        self.last_dispatch = {}
+        self.busy = set()
+        self.clock = 0.0  # Virtual time of the last dispatched job
+        self.min_interval = 1.0 / detect_hz if detect_hz > 0 else 0.0
+        self.detect_scale = 1  # Interval multiplier set by the thermal governor
+        self.on_result = []  # callables(camera name, CameraResult)
+        self.presence_lock = threading.Lock()
+        self.last_seen = {}  # person -> (camera, ts)
+        self.running = False
+        if clusters is None and VISITOR_SLOTS > 0:
+            clusters = VisitorClusters()
+        self.clusters = clusters
+
+        for name, source, priority in cameras:
+            feed = CameraFeed(name, source, priority, width, height)
+            feed.on_frame = self._frame_arrived
+            self.feeds[name] = feed
+            # Per-camera pipeline: own buffers and cached results, shared gallery
+            self.pipelines[name] = VisionPipeline(known_encodings, known_ids, frame_skip=1,
+                                                  width=width, height=height, clusters=clusters)
+            self.results[name] = CameraResult()
+            self.vtime[name] = 0.0
+            self.last_dispatch[name] = 0.0
+        self.processed = {name: 0 for name in self.feeds}
+
+        self.workers = [threading.Thread(target=self._worker, daemon=True, name=f'recognizer-{i}')
+                        for i in range(max(1, workers))]
+        self.max_active = len(self.workers)  # Lowered by the thermal governor
+
+    @property
+    def primary(self):
+        return next(iter(self.feeds))
+
+    def start(self):
+        self.running = True
+        for feed in self.feeds.values():
+            feed.start()
+        for worker in self.workers:
+            worker.start()
+        print(f"📷 Camera hub: {', '.join(self.feeds)} sharing {len(self.workers)} recognition workers")
+        return self
+
+    def stop(self):
+        self.running = False
+        for feed in self.feeds.values():
+            feed.stop()
+        with self.cond:
+            self.cond.notify_all()
+
+    def _frame_arrived(self, feed):
+        with self.cond:
+            self.cond.notify()
+
+    # --- Scheduling ---
+
+    def _next_job(self):
+        """Pick the due camera with the lowest virtual time. Caller holds self.cond."""
+        now = time.monotonic()
+        best, best_v, wait = None, None, 0.1
+        if len(self.busy) >= self.max_active:
+            return None, wait
+        interval = self.min_interval * self.detect_scale
+        for name, feed in self.feeds.items():
+            if name in self.busy or feed.seq == self.results[name].frame_seq:
+                continue
+            due = self.last_dispatch[name] + interval - now
+            if due > 0:
+                wait = min(wait, due)
+                continue
+            # Idle cameras don't bank credit: floor at the current virtual clock
+            v = max(self.vtime[name], self.clock)
+            if best is None or v < best_v:
+                best, best_v = name, v
+        if best is not None:
+            self.busy.add(best)
+            self.clock = best_v
+            self.vtime[best] = best_v + 1.0 / self.feeds[best].priority
+            self.last_dispatch[best] = now
+        return best, wait
+
+    def _worker(self):
+        while self.running:
+            with self.cond:
+                name, wait = self._next_job()
+                while name is None and self.running:
+                    self.cond.wait(wait)
+                    name, wait = self._next_job()
+            if name is None:
+                break
+            try:
+                self._process(name)
+            except Exception as e:
+                print(f"Face Rec Error ({name}): {e}")
+            finally:
+                with self.cond:
+                    self.busy.discard(name)
+                    self.cond.notify()
+
+    def _process(self, name):
+        feed, pipeline = self.feeds[name], self.pipelines[name]
+        t0 = time.perf_counter()
+        frame_seq, frame_ts, imgS = feed.downscale_latest(pipeline)
+        if imgS is None:
+            return
+        pipeline.recognize(imgS)
+        metrics.observe(f'camera_{name}_recognize', time.perf_counter() - t0)
+
+        now = time.time()
+        result = CameraResult(self.results[name].seq + 1, frame_seq, pipeline.faces, pipeline.ids,
+                              pipeline.visitors, pipeline.margins, frame_ts, now - frame_ts)
+        self.results[name] = result
+        self.processed[name] += 1
+        metrics.observe(f'camera_{name}_latency', result.latency)
+
+        with self.presence_lock:
+            for person in result.ids:
+                if person != "Unknown":
+                    self.last_seen[person] = (name, now)
+        bus.update(detected_people=self.detected_people(), detected_visitors=self.detected_visitors())
+        for callback in self.on_result:
+            callback(name, result)
+
+    # --- Merged presence view ---
+
+    def detected_people(self, window=PRESENCE_WINDOW):
+        """Everyone seen by any camera within `window` seconds.
+
+        Unknown faces appear once per visitor id (once per face per camera
+        when clustering is off).
+        """
+        now = time.time()
+        people = []
+        with self.presence_lock:
+            people.extend(p for p, (_, ts) in self.last_seen.items() if now - ts <= window)
+        seen = set()
+        for result in list(self.results.values()):
+            if now - result.ts > window:
+                continue
+            for pid, visitor in zip(result.ids, result.visitors):
+                if pid == "Unknown" and (visitor is None or visitor not in seen):
+                    seen.add(visitor)
+                    people.append(pid)
+        return people
+
+    def detected_visitors(self, window=PRESENCE_WINDOW):
+        """Distinct visitor ids in view of any camera within `window` seconds."""
+        now = time.time()
+        visitors = []
+        for result in list(self.results.values()):
+            if now - result.ts <= window:
+                visitors.extend(v for v in result.visitors if v and v not in visitors)
+        return visitors
+
+    def presence(self):
+        """{person: (camera, last seen ts)} across all cameras."""
+        with self.presence_lock:
+            return dict(self.last_seen)
+
+    def stats(self):
+        out = {}
+        for name, feed in self.feeds.items():
+            out[name] = {
+                'priority': feed.priority,
+                'capture_fps': round(feed.fps, 2),
+                'processed': self.processed[name],
+                'latency_ms': round(self.results[name].latency * 1000, 1),
+                'in_view': list(self.results[name].ids),
+            }
+        return out
+
+    # --- Display one camera through VisionEngine ---
+
+    def display_source(self, name=None):
+        return _FeedSource(self.feeds[name or self.primary])
+
+    def pipeline_for(self, name=None, greeter=None):
+        return HubPipeline(self, name or self.primary, greeter)
+
+
+class _FeedSource:
+    """cv2.VideoCapture-style read() over a CameraFeed (waits for a new frame)."""
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.last_seq = 0
+
+    def read(self, image=None):
+        with self.feed.new_frame:
+            self.feed.new_frame.wait_for(lambda: self.feed.seq != self.last_seq, timeout=1.0)
+        if image is None:
+            image = self.feed.pool.black.copy()
+        seq, _ = self.feed.copy_latest(image)
+        if not seq:
+            return False, None
+        self.last_seq = seq
+        return True, image
+
+    def release(self):
+        pass
+
+
+class HubPipeline(VisionPipeline):
+    """VisionPipeline whose recognition happens in the CameraHub workers."""
+
+    def __init__(self, hub, name, greeter=None):
+        feed = hub.feeds[name]
+        VisionPipeline.__init__(self, [], [], width=feed.pool.width, height=feed.pool.height,
+                                resize_factor=feed.pool.scale, greeter=greeter)
+        self.hub = hub
+        self.name = name
+        self.result_seq = 0
+        self.active_interval = hub.min_interval
+
+    def set_idle(self, idle, detect_interval):
+        """Idle power mode (power.py): slow detection on every camera, not just this one."""
+        if idle:
+            self.active_interval = self.hub.min_interval
+            self.hub.min_interval = max(self.hub.min_interval, detect_interval)
+        else:
+            self.hub.min_interval = self.active_interval
+
+    def process(self, img) -> bool:
+        self.frame_count += 1
+        self.timings = {}
+        result = self.hub.results[self.name]
+        if result.seq == self.result_seq:
+            return False
+        self.result_seq = result.seq
+        self.faces, self.ids, self.visitors, self.margins = result.faces, result.ids, result.visitors, result.margins
+        return True
@@ -0,0 +1,135 @@
+"""
+Offline text-to-speech with espeak-ng, as PCM for the shared audio stream.
+
+Two engines produce the same output (16-bit mono PCM, resampled to the
+stream's rate):
+
+- EspeakLibrary: libespeak-ng loaded once through ctypes and kept
+  initialised. Each phrase is one espeak_Synth() call in synchronous mode,
+  with the samples collected by a callback. There is no process start and
+  no device open, and the text is passed as data, never through a shell.
+- EspeakProcess: one `espeak-ng --stdout --stdin` run per phrase, with the
+  text on stdin. This is the fallback when the library cannot be loaded.
+
+A long-running `espeak-ng --stdin` process was the other option, but its
+--stdout output has no boundary between phrases, so the library binding is
+the persistent engine. bench_offline_tts.py compares the per-phrase latency
+of the two.
+"""
+import ctypes
+import ctypes.util
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import metrics
+from audio_out import resample_pcm
+
+ESPEAK_VOICE = os.environ.get('OMNIS_ESPEAK_VOICE', 'en')
+ESPEAK_SPEED = int(os.environ.get('OMNIS_ESPEAK_SPEED', '160'))  # Words per minute
+ESPEAK_PITCH = int(os.environ.get('OMNIS_ESPEAK_PITCH', '40'))   # 0-99
+
+# speak_lib.h
+AUDIO_OUTPUT_SYNCHRONOUS = 2
+POS_CHARACTER = 1
+ESPEAK_CHARS_UTF8 = 1
+ESPEAK_RATE = 1
+ESPEAK_PITCH_PARAM = 3
+SYNTH_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int, ctypes.c_void_p)
+
+
+class EspeakLibrary:
+    name = 'library'
+
+    def __init__(self, voice=ESPEAK_VOICE, speed=ESPEAK_SPEED, pitch=ESPEAK_PITCH):
+        path = ctypes.util.find_library('espeak-ng')
+        if path is None:
+            raise OSError("libespeak-ng not found")
+        self.lib = ctypes.CDLL(path)
+        self.lib.espeak_Synth.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int,
+                                          ctypes.c_uint, ctypes.c_uint, ctypes.c_void_p, ctypes.c_void_p]
+        self.rate = self.lib.espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0, None, 0)
+        if self.rate <= 0:
+            raise OSError("espeak_Initialize failed")
+        self.lock = threading.Lock()  # The library is not re-entrant
+        self.buffer = []
+        self.callback = SYNTH_CALLBACK(self._collect)  # Keep a reference for the library's lifetime
+        self.lib.espeak_SetSynthCallback(self.callback)
+        self.lib.espeak_SetVoiceByName(voice.encode())
+        self.lib.espeak_SetParameter(ESPEAK_RATE, speed, 0)
+        self.lib.espeak_SetParameter(ESPEAK_PITCH_PARAM, pitch, 0)
+
+    def _collect(self, wav, numsamples, events):
+        if numsamples > 0:
+            self.buffer.append(ctypes.string_at(wav, numsamples * 2))
+        return 0
+
+    def synthesize(self, text):
+        """(16-bit mono PCM bytes, sample rate) for `text`."""
+        data = text.encode('utf-8') + b'\0'
+        with self.lock:
+            self.buffer = []
+            self.lib.espeak_Synth(data, len(data), 0, POS_CHARACTER, 0, ESPEAK_CHARS_UTF8, None, None)
+            self.lib.espeak_Synchronize()
+            pcm = b''.join(self.buffer)
+        return pcm, self.rate
+
+
+class EspeakProcess:
+    name = 'spawn'
+
+    def __init__(self, voice=ESPEAK_VOICE, speed=ESPEAK_SPEED, pitch=ESPEAK_PITCH):
+        self.binary = shutil.which('espeak-ng')
+        if self.binary is None:
+            raise OSError("espeak-ng not found")
+        self.args = [self.binary, '--stdout', '--stdin', '-v', voice, '-s', str(speed), '-p', str(pitch)]
+
+    def synthesize(self, text):
+        out = subprocess.run(self.args, input=text.encode('utf-8'), capture_output=True, timeout=30)
+        if out.returncode != 0:
+            raise RuntimeError(f"espeak-ng failed ({out.returncode})")
+        # Streamed WAV: the header's length fields are not filled in, so find the samples directly
+        wav = out.stdout
+        start = wav.find(b'data', 12) + 8
+        if start < 8:
+            raise RuntimeError("espeak-ng returned no audio")
+        return wav[start:], int.from_bytes(wav[24:28], 'little')
+
+
+class OfflineTTS:
+    def __init__(self, engine=None):
+        self.engine = engine or self._open_engine()
+
+    @staticmethod
+    def _open_engine():
+        try:
+            return EspeakLibrary()
+        except OSError as e:
+            print(f"⚠️ libespeak-ng not available ({e}), spawning espeak-ng per phrase")
+            return EspeakProcess()
+
+    def pcm(self, text, rate):
+        """16-bit mono PCM for `text` at `rate` Hz."""
+        t0 = time.perf_counter()
+        pcm, src_rate = self.engine.synthesize(text)
+        pcm = resample_pcm(pcm, src_rate, rate)
+        metrics.observe('offline_tts', time.perf_counter() - t0)
+        return pcm
+
+
+_offline = None
+_failed = False
+
+
+def init_offline_tts():
+    """The shared OfflineTTS, or None when espeak-ng is not installed."""
+    global _offline, _failed
+    if _offline is None and not _failed:
+        try:
+            _offline = OfflineTTS()
+        except OSError as e:
+            _failed = True
+            print(f"⚠️ Offline TTS not available: {e}")
+    return _offline
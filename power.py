@@ -0,0 +1,194 @@
+"""
+Idle power mode for unattended hours.
+
+The PowerManager is driven by VisionEngine once per frame. After
+IDLE_AFTER seconds with no face, no motion, no speech and nothing being
+said, it drops into IDLE:
+
+- camera frames are paced to IDLE_FPS (the loop sleeps between reads)
+- face detection runs every IDLE_DETECT_INTERVAL seconds instead of every
+  FRAME_SKIP frames
+- sinks are told to refresh lazily (Sink.set_idle), so the kiosk redraws
+  about once a second
+- the HeadController is parked at centre and its servos are released
+
+Motion is checked on every frame with a 32x24 grey thumbnail diff (~40 us
+at 640x480). Motion, a face, speech (poke() from the speech thread) or
+the speaker talking all switch back to ACTIVE at once, and detection is
+forced on the very next frame.
+
+Wall time and process CPU time are accumulated per state and exported as
+`power_<state>_seconds` / `power_<state>_cpu_pct` gauges.
+"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+
+IDLE_AFTER = float(os.environ.get('OMNIS_IDLE_AFTER', '120'))      # Quiet seconds before idling
+IDLE_FPS = float(os.environ.get('OMNIS_IDLE_FPS', '5'))
+ACTIVE_FPS = float(os.environ.get('OMNIS_ACTIVE_FPS', '30'))  # Restored on wake if the camera reports no FPS
+IDLE_DETECT_INTERVAL = float(os.environ.get('OMNIS_IDLE_DETECT_INTERVAL', '2'))
+MOTION_THRESHOLD = float(os.environ.get('OMNIS_MOTION_THRESHOLD', '6'))  # Mean abs grey diff (0-255)
+THUMB_SIZE = (32, 24)
+SAMPLE_SIZE = (160, 120)  # Nearest-neighbour sample first: INTER_AREA on the full frame is ~6x slower
+
+ACTIVE = 'active'
+IDLE = 'idle'
+
+
+class PowerManager:
+    def __init__(self, idle_after=IDLE_AFTER, idle_fps=IDLE_FPS, idle_detect_interval=IDLE_DETECT_INTERVAL,
+                 motion_threshold=MOTION_THRESHOLD, active_fps=ACTIVE_FPS, clock=time.monotonic,
+                 cpu_clock=time.process_time):
+        self.idle_after = idle_after
+        self.idle_fps = max(0.5, idle_fps)
+        self.idle_detect_interval = idle_detect_interval
+        self.motion_threshold = motion_threshold
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.engine = None
+
+        self.state = ACTIVE
+        self.last_activity = clock()
+        self.last_frame = 0.0
+        self.active_frame_skip = None
+        self.default_active_fps = active_fps
+        self.active_fps = active_fps
+        self.poked = False  # Set from other threads (speech)
+
+        # Motion detection buffers
+        self.sample = np.zeros((SAMPLE_SIZE[1], SAMPLE_SIZE[0], 3), np.uint8)
+        self.thumb = np.zeros((THUMB_SIZE[1], THUMB_SIZE[0], 3), np.uint8)
+        self.gray = np.zeros((THUMB_SIZE[1], THUMB_SIZE[0]), np.uint8)
+        self.prev_gray = None
+        self.diff = np.zeros_like(self.gray)
+
+        # Per-state accounting
+        self.accounted_at = clock()
+        self.cpu_since = cpu_clock()
+        self.seconds = {ACTIVE: 0.0, IDLE: 0.0}
+        self.cpu_seconds = {ACTIVE: 0.0, IDLE: 0.0}
+        self.transitions = 0
+        self.lock = threading.Lock()
+
+    def attach(self, engine):
+        self.engine = engine
+        self.active_frame_skip = engine.pipeline.frame_skip
+
+    # --- Any thread ---
+
+    def poke(self, reason='speech'):
+        """Activity seen outside the vision loop (e.g. voice heard)."""
+        self.poked = True
+
+    # --- Vision loop ---
+
+    def before_frame(self):
+        """Pace capture while idle."""
+        if self.state == IDLE:
+            delay = self.last_frame + 1.0 / self.idle_fps - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+        self.last_frame = self.clock()
+
+    def update(self, img, faces=False, speaking=False):
+        """Called once per frame after recognition. Returns the current state."""
+        now = self.clock()
+        motion = self._motion(img)
+        if faces or speaking or motion or self.poked:
+            self.poked = False
+            self.last_activity = now
+            if self.state == IDLE:
+                self._enter(ACTIVE, 'motion' if motion else 'speech' if speaking else 'face' if faces else 'poke')
+        elif self.state == ACTIVE and now - self.last_activity >= self.idle_after:
+            self._enter(IDLE, f'quiet for {int(now - self.last_activity)}s')
+        elif now - self.accounted_at >= 10.0:
+            self._account()  # Keep the gauges current during long stretches
+        return self.state
+
+    def _motion(self, img):
+        if img is None:
+            return False
+        cv2.resize(img, SAMPLE_SIZE, dst=self.sample, interpolation=cv2.INTER_NEAREST)
+        cv2.resize(self.sample, THUMB_SIZE, dst=self.thumb, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.thumb, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        if self.prev_gray is None:
+            self.prev_gray = self.gray.copy()
+            return False
+        cv2.absdiff(self.gray, self.prev_gray, dst=self.diff)
+        np.copyto(self.prev_gray, self.gray)
+        return float(self.diff.mean()) > self.motion_threshold
+
+    def _enter(self, state, reason):
+        self._account()
+        self.state = state
+        self.transitions += 1
+        idle = state == IDLE
+        engine = self.engine
+        if engine is not None:
+            pipeline = engine.pipeline
+            if idle:
+                pipeline.frame_skip = max(1, int(round(self.idle_fps * self.idle_detect_interval)))
+            else:
+                pipeline.frame_skip = self.active_frame_skip
+                # Detect on the very next frame
+                pipeline.frame_count = pipeline.frame_skip - 1
+            if hasattr(pipeline, 'set_idle'):
+                pipeline.set_idle(idle, self.idle_detect_interval)  # multi_camera.HubPipeline
+            cap = engine.cap
+            if cap is not None and hasattr(cap, 'set'):
+                if idle:
+                    fps = cap.get(cv2.CAP_PROP_FPS)
+                    # Some backends report 0 (or -1): fall back to the configured rate so wake restores it
+                    self.active_fps = fps if fps and fps > 0 else self.default_active_fps
+                    cap.set(cv2.CAP_PROP_FPS, self.idle_fps)
+                else:
+                    cap.set(cv2.CAP_PROP_FPS, self.active_fps)
+            if engine.head is not None and hasattr(engine.head, 'park'):
+                engine.head.park() if idle else engine.head.wake()
+            for sink in engine.sinks:
+                sink.set_idle(idle)
+        metrics.set_gauge('power_idle', int(idle))
+        print(f"{'💤' if idle else '⚡'} Power: {state} ({reason})")
+
+    def _account(self):
+        with self.lock:
+            now, cpu = self.clock(), self.cpu_clock()
+            self.seconds[self.state] += now - self.accounted_at
+            self.cpu_seconds[self.state] += cpu - self.cpu_since
+            self.accounted_at, self.cpu_since = now, cpu
+        for state in (ACTIVE, IDLE):
+            metrics.set_gauge(f'power_{state}_seconds', round(self.seconds[state], 1))
+            metrics.set_gauge(f'power_{state}_cpu_pct', self._cpu_pct(state))
+
+    def _cpu_pct(self, state):
+        wall = self.seconds[state]
+        return round(100.0 * self.cpu_seconds[state] / wall, 1) if wall > 0 else 0.0
+
+    def report(self):
+        """{state: {'seconds', 'cpu_seconds', 'cpu_pct'}} including the current stretch."""
+        self._account()
+        return {state: {'seconds': round(self.seconds[state], 1),
+                        'cpu_seconds': round(self.cpu_seconds[state], 1),
+                        'cpu_pct': self._cpu_pct(state)}
+                for state in (ACTIVE, IDLE)}
+
+
+_power = None
+
+
+def init_power(**kwargs):
+    global _power
+    if _power is None:
+        _power = PowerManager(**kwargs)
+    return _power
+
+
+def get_power():
+    """The PowerManager driving the vision loop, or None."""
+    return _power
@@ -0,0 +1,182 @@
+"""
+Time-windowed presence index for "who is here" and visitor questions.
+
+One writer (the vision loop, through PresenceSink) records who is in view
+on every detection pass. Readers (the voice thread) never take a lock. On
+each write the writer builds a new immutable PresenceSnapshot and swaps it
+in with a single reference assignment, which is atomic in CPython, so a
+reader always sees one consistent snapshot.
+
+A snapshot holds everyone seen within RETAIN seconds, ordered by last
+sighting, with the sighting times in a parallel sorted tuple:
+
+    here_now() / seen_within(600)  bisect on the times: O(log n) + results
+    count_today()                  maintained counters: O(1)
+    visit_started(person)          dict lookup: O(1)
+
+Building a snapshot is O(people seen in the last RETAIN seconds), a few
+microseconds for a school entrance at detection rate.
+"""
+import bisect
+import os
+import time
+from collections import OrderedDict
+from datetime import date
+
+from vision_sinks import Sink
+
+PRESENT_WINDOW = 5.0  # Seconds since last sighting that still counts as "here now"
+RETAIN = float(os.environ.get('OMNIS_PRESENCE_RETAIN', '3600'))  # Longest "who was here" window
+VISIT_GAP = float(os.environ.get('OMNIS_VISIT_GAP', '300'))       # Same rule as attendance.py
+
+
+class PresenceSnapshot:
+    """Immutable view of presence at one moment (safe to read from any thread)."""
+    __slots__ = ('names', 'times', 'kinds', 'visit_start', 'unknown_now', 'unknown_ts',
+                 'today', 'known_today', 'visitors_today', 'version')
+
+    def __init__(self, names=(), times=(), kinds=None, visit_start=None, unknown_now=0, unknown_ts=0.0,
+                 known_today=0, visitors_today=0, today=None, version=0):
+        self.names = names                  # People ordered by last sighting (oldest first)
+        self.times = times                  # Their last-sighting times (ascending)
+        self.kinds = kinds or {}            # person -> 'known' | 'visitor'
+        self.visit_start = visit_start or {}
+        self.unknown_now = unknown_now      # Unclustered "Unknown" faces in the last pass that had any
+        self.unknown_ts = unknown_ts        # ...and when that was
+        self.known_today = known_today
+        self.visitors_today = visitors_today
+        self.today = today
+        self.version = version
+
+    def seen_since(self, ts):
+        """People last seen at or after `ts`, most recent first."""
+        i = bisect.bisect_left(self.times, ts)
+        return list(reversed(self.names[i:]))
+
+
+class PresenceIndex:
+    def __init__(self, present_window=PRESENT_WINDOW, retain=RETAIN, visit_gap=VISIT_GAP, clock=time.time):
+        self.present_window = present_window
+        self.retain = retain
+        self.visit_gap = visit_gap
+        self.clock = clock
+        self.snapshot = PresenceSnapshot()
+
+        # Writer-only state
+        self._recent = OrderedDict()  # person -> last seen, oldest first
+        self._kinds = {}
+        self._visit_start = {}
+        self._day = None
+        self._seen_today = set()
+        self._known_today = 0
+        self._visitors_today = 0
+        self._version = 0
+
+    # --- Writer (vision loop only) ---
+
+    def observe(self, known=(), visitors=(), unknown=0, ts=None):
+        """Record one detection pass: known ids, visitor ids and unclustered unknown faces."""
+        ts = ts or self.clock()
+        day = date.fromtimestamp(ts)
+        if day != self._day:
+            self._day = day
+            self._seen_today.clear()
+            self._known_today = self._visitors_today = 0
+
+        for kind, people in (('known', known), ('visitor', visitors)):
+            for person in people:
+                last = self._recent.pop(person, None)
+                if last is None or ts - last > self.visit_gap:
+                    self._visit_start[person] = ts
+                self._recent[person] = ts
+                self._kinds[person] = kind
+                if person not in self._seen_today:
+                    self._seen_today.add(person)
+                    if kind == 'known':
+                        self._known_today += 1
+                    else:
+                        self._visitors_today += 1
+
+        # Drop people older than the longest window we answer for
+        cutoff = ts - self.retain
+        while self._recent:
+            person, last = next(iter(self._recent.items()))
+            if last >= cutoff:
+                break
+            del self._recent[person]
+            self._kinds.pop(person, None)
+            self._visit_start.pop(person, None)
+
+        old = self.snapshot
+        self._version += 1
+        self.snapshot = PresenceSnapshot(
+            tuple(self._recent), tuple(self._recent.values()), dict(self._kinds), dict(self._visit_start),
+            unknown or old.unknown_now, ts if unknown else old.unknown_ts,
+            self._known_today, self._visitors_today, day, self._version)
+
+    # --- Readers (any thread, no locks) ---
+
+    def here_now(self, window=None):
+        """(known people, visitor ids, anonymous unknown faces) seen within `window` seconds."""
+        snap, now = self.snapshot, self.clock()
+        people = snap.seen_since(now - (window or self.present_window))
+        known = [p for p in people if snap.kinds.get(p) == 'known']
+        visitors = [p for p in people if snap.kinds.get(p) == 'visitor']
+        unknown = snap.unknown_now if now - snap.unknown_ts <= (window or self.present_window) else 0
+        return known, visitors, unknown
+
+    def seen_within(self, seconds):
+        """(known people, visitor ids) seen in the last `seconds` (up to RETAIN)."""
+        snap = self.snapshot
+        people = snap.seen_since(self.clock() - seconds)
+        return ([p for p in people if snap.kinds.get(p) == 'known'],
+                [p for p in people if snap.kinds.get(p) == 'visitor'])
+
+    def count_today(self):
+        """(known people, unknown visitors) seen today."""
+        snap = self.snapshot
+        if snap.today != date.fromtimestamp(self.clock()):
+            return 0, 0
+        return snap.known_today, snap.visitors_today
+
+    def visit_started(self, person):
+        """Start of `person`'s current visit, or None."""
+        return self.snapshot.visit_start.get(person)
+
+
+class PresenceSink(Sink):
+    """Feeds the PresenceIndex from the vision loop (the index's only writer)."""
+    name = 'presence'
+
+    def __init__(self, index, hub=None):
+        self.index = index
+        self.hub = hub  # multi_camera.CameraHub: index its merged view instead of one camera
+
+    def publish(self, result):
+        if not result.refreshed:
+            return True
+        if self.hub is not None:
+            people = self.hub.detected_people()
+            visitors = self.hub.detected_visitors()
+        else:
+            people = result.ids
+            visitors = [v for v in result.visitors if v]
+        known = [p for p in people if p != "Unknown"]
+        unknown = max(0, people.count("Unknown") - len(visitors))
+        self.index.observe(known, visitors, unknown)
+        return True
+
+
+_presence = None
+
+
+def init_presence(**kwargs):
+    global _presence
+    if _presence is None:
+        _presence = PresenceIndex(**kwargs)
+    return _presence
+
+
+def get_presence():
+    """The PresenceIndex fed by the vision loop, or None."""
+    return _presence
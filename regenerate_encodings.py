@@ -103,6 +103,13 @@ def regenerate_encodings():
     print("ENCODING REGENERATION COMPLETE!")
     print("=" * 50)
     print(f"Total faces encoded: {len(encode_list)}")
+
+    # Pre-render everyone's greetings so the speaker never synthesizes them live
+    try:
+        from greeting_bundle import build_bundle
+        build_bundle(studentIds[:len(encode_list)])
+    except Exception as e:
+        print(f"Greeting bundle not built: {e}")
     print("You can now run your OMNIS robot with fresh encodings.")
 
 if __name__ == '__main__':
@@ -3,7 +3,7 @@ import pickle
 import cv2
 import numpy as np
 
-ENCODE_FILE = 'encoded_file.p'
+ENCODE_FILE = 'images/encoded_file.p'  # Same gallery vision_pipeline.py loads
 FACES_DIR = 'images/faces'
 
 def _safe_name(name: str) -> str:
@@ -14,15 +14,19 @@ def _safe_name(name: str) -> str:
     return s.upper()
 
 def register_name(name: str, encoding, face_image=None):
-    """Register `name` for the provided face encoding and optional image.
+    """Register `name` for the provided face encoding(s) and optional image.
 
-    - Appends the encoding and name to `encoded_file.p`.
-    - Saves `face_image` to `images/faces/<NAME>.jpg` if provided.
-    Returns True on success.
+    - Appends the encoding (or each of a list of encodings) and name to `ENCODE_FILE`.
+    - Saves `face_image` (BGR) to `images/faces/<NAME>.jpg` if provided.
+    Returns the registered id (truthy) on success, False otherwise.
     """
     if encoding is None:
         print("[register_face] No encoding provided; aborting registration")
         return False
+    encodings = list(encoding) if isinstance(encoding, list) or np.ndim(encoding) == 2 else [encoding]
+    if not encodings:
+        print("[register_face] No encoding provided; aborting registration")
+        return False
 
     os.makedirs(FACES_DIR, exist_ok=True)
     person = _safe_name(name)
@@ -44,9 +48,10 @@ def register_name(name: str, encoding, face_image=None):
         else:
             encode_list_known, studentIds = [], []
 
-        # Append
-        encode_list_known.append(encoding)
-        studentIds.append(person)
+        # Append (several encodings of one person all map to the same id)
+        for enc in encodings:
+            encode_list_known.append(enc)
+            studentIds.append(person)
 
         # Write to temp file and replace
         tmp = ENCODE_FILE + '.tmp'
@@ -54,7 +59,7 @@ def register_name(name: str, encoding, face_image=None):
             pickle.dump((encode_list_known, studentIds), f)
         os.replace(tmp, ENCODE_FILE)
         print(f"[register_face] Registered {person} (encodings={len(studentIds)})")
-        return True
+        return person
     except Exception as e:
         print(f"[register_face] Error saving encoding: {e}")
         return False
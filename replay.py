@@ -0,0 +1,189 @@
+"""
+Headless record/replay harness for the vision pipeline.
+
+Feeds a video file or a directory of images through the same
+VisionPipeline that main.py uses (detect -> encode -> match -> tracking ->
+greeting) with no camera, window, speaker or servos, and writes a JSON
+report with per-stage latency percentiles, FPS and the ids recognised on
+every frame.
+
+Time is virtual: the greeting cooldowns see `frame_index / fps` instead of
+the wall clock, and frames are processed back to back, so two runs over the
+same input make the same decisions and only the latencies differ.
+
+Usage:
+    python replay.py <video file | image dir> [--fps 30] [--out report.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from greeting_manager import GreetingManager
+from vision_pipeline import (STAGES, VisionPipeline, load_encodings, FACE_MATCH_TOLERANCE,
+                             MAX_FACES, FRAME_SKIP, RESIZE_FACTOR, ENCODINGS_FILE)
+from visitor_clusters import VisitorClusters, VISITOR_SLOTS
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+# Virtual clock origin (GreetingManager treats timestamp 0 as "never seen")
+REPLAY_EPOCH = 1_700_000_000.0
+
+
+class VirtualClock:
+    def __init__(self, fps, start=REPLAY_EPOCH):
+        self.fps = fps
+        self.start = start
+        self.frame_index = 0
+
+    def __call__(self):
+        return self.start + self.frame_index / self.fps
+
+
+class ReplaySource:
+    """Frames from a video file or an image directory, resized to the pipeline size.
+
+    Exposes the cv2.VideoCapture read(image=None) interface so the pipeline's
+    preallocated capture buffers are used exactly as with a live camera.
+    """
+
+    def __init__(self, path, width=640, height=480):
+        self.size = (width, height)
+        self.images = None
+        self.cap = None
+        self.pos = 0
+        if os.path.isdir(path):
+            self.images = sorted(os.path.join(path, p) for p in os.listdir(path)
+                                 if p.lower().endswith(IMAGE_EXTS))
+        else:
+            self.cap = cv2.VideoCapture(path)
+            if not self.cap.isOpened():
+                raise IOError(f"Could not open video: {path}")
+
+    def read(self, image=None):
+        if self.images is not None:
+            frame = None
+            while frame is None and self.pos < len(self.images):
+                frame = cv2.imread(self.images[self.pos])
+                self.pos += 1
+            if frame is None:
+                return False, None
+        else:
+            ok, frame = self.cap.read()
+            if not ok or frame is None:
+                return False, None
+
+        if image is not None and image.shape[:2] == (self.size[1], self.size[0]):
+            cv2.resize(frame, self.size, dst=image)
+            return True, image
+        return True, cv2.resize(frame, self.size)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+def percentiles(values):
+    if not values:
+        return None
+    arr = np.asarray(values) * 1000.0
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(arr, 50)), 3),
+        'p90_ms': round(float(np.percentile(arr, 90)), 3),
+        'p99_ms': round(float(np.percentile(arr, 99)), 3),
+        'max_ms': round(float(arr.max()), 3),
+        'mean_ms': round(float(arr.mean()), 3),
+    }
+
+
+def run_replay(path, fps=30.0, frame_skip=FRAME_SKIP, tolerance=FACE_MATCH_TOLERANCE, max_faces=MAX_FACES,
+               resize_factor=RESIZE_FACTOR, encodings=ENCODINGS_FILE):
+    clock = VirtualClock(fps)
+    known_encodings, known_ids = load_encodings(encodings)
+    pipeline = VisionPipeline(known_encodings, known_ids, tolerance=tolerance,
+                              max_faces=max_faces, frame_skip=frame_skip,
+                              resize_factor=resize_factor, greeter=GreetingManager(clock=clock),
+                              clusters=VisitorClusters(clock=clock) if VISITOR_SLOTS > 0 else None)
+    source = ReplaySource(path, pipeline.pool.width, pipeline.pool.height)
+
+    stage_times = {name: [] for name in STAGES + ('track', 'greet', 'frame')}
+    frames = []
+    t_start = time.perf_counter()
+    try:
+        while True:
+            success, img = pipeline.read(source)
+            if not success:
+                break
+
+            t0 = time.perf_counter()
+            refreshed = pipeline.process(img)
+            for name, seconds in pipeline.timings.items():
+                stage_times[name].append(seconds)
+
+            t1 = time.perf_counter()
+            target = pipeline.tracking_target()
+            t2 = time.perf_counter()
+            greeting = pipeline.choose_greeting(speaking=False)
+            t3 = time.perf_counter()
+            stage_times['track'].append(t2 - t1)
+            stage_times['greet'].append(t3 - t2)
+            stage_times['frame'].append(t3 - t0)
+
+            frames.append({
+                'frame': clock.frame_index,
+                't': round(clock.frame_index / fps, 4),
+                'processed': refreshed,
+                'ids': list(pipeline.ids),
+                'visitors': list(pipeline.visitors),
+                'boxes': [list(loc) for loc, _ in pipeline.full_size_faces()],
+                'track': [round(v, 2) for v in target[:2]] if target else None,
+                'greeting': greeting,
+            })
+            clock.frame_index += 1
+    finally:
+        source.release()
+    wall = time.perf_counter() - t_start
+
+    return {
+        'source': path,
+        'config': {'fps': fps, 'frame_skip': frame_skip, 'tolerance': tolerance,
+                   'max_faces': max_faces, 'resize_factor': resize_factor},
+        'frames_total': len(frames),
+        'wall_seconds': round(wall, 3),
+        'fps': round(len(frames) / wall, 2) if wall > 0 else None,
+        'stages': {name: percentiles(v) for name, v in stage_times.items()},
+        'frames': frames,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a video/image folder through the vision pipeline")
+    parser.add_argument('source', help="video file or directory of images")
+    parser.add_argument('--fps', type=float, default=30.0, help="source frame rate for the virtual clock")
+    parser.add_argument('--frame-skip', type=int, default=FRAME_SKIP)
+    parser.add_argument('--tolerance', type=float, default=FACE_MATCH_TOLERANCE)
+    parser.add_argument('--max-faces', type=int, default=MAX_FACES)
+    parser.add_argument('--resize', type=float, default=RESIZE_FACTOR)
+    parser.add_argument('--encodings', default=ENCODINGS_FILE)
+    parser.add_argument('--out', help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_replay(args.source, fps=args.fps, frame_skip=args.frame_skip,
+                        tolerance=args.tolerance, max_faces=args.max_faces,
+                        resize_factor=args.resize, encodings=args.encodings)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Replayed {report['frames_total']} frames at {report['fps']} FPS -> {args.out}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -20,12 +20,12 @@ sudo apt-get install -y python3-pip python3-dev portaudio19-dev python3-pyaudio
 echo ""
 echo "Installing Python packages..."
 pip3 install --upgrade pip
-pip3 install opencv-python face-recognition SpeechRecognition gtts pygame cvzone google-generativeai numpy
+pip3 install opencv-python face-recognition SpeechRecognition gtts pygame cvzone google-generativeai numpy miniaudio
 
 # Install additional audio dependencies
 echo ""
 echo "Installing additional audio dependencies..."
-sudo apt-get install -y alsa-utils pulseaudio
+sudo apt-get install -y alsa-utils pulseaudio espeak-ng mpg123
 
 echo ""
 echo "========================================"
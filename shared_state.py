@@ -1,16 +1,29 @@
 """
-Lightweight in-memory shared state for coordination between
-the face-detection loop (`main.py`) and the speech thread (`sr_class.py`).
+Compatibility view of the state bus (state_bus.py) under the old
+module-global names.
 
-This avoids complex IPC and is fine while the process runs in one interpreter.
+Reading shared_state.detected_people returns the field from the current
+snapshot, and assigning shared_state.awaiting_name = False is one
+bus.update(). New code should use state_bus.bus directly, and update
+related fields (awaiting_name/_encoding/_face_image) in one call.
 """
-from typing import Optional
-import numpy as np
+import sys
+import types
 
-# When True, the speech thread should treat the next recognized phrase as a name
-awaiting_name: bool = False
-# The face encoding (128-d float array) captured for the unknown primary face
-awaiting_encoding: Optional[object] = None
-# Small RGB image (numpy array) cropped around the unknown face (ready to write)
-awaiting_face_image: Optional[object] = None
-detected_people = [] # Live list of people currently in frame
+from state_bus import FIELDS, bus
+
+
+class _SharedState(types.ModuleType):
+    def __getattr__(self, name):
+        if name in FIELDS:
+            return getattr(bus.state, name)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in FIELDS:
+            bus.update(**{name: value})
+        else:
+            super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _SharedState
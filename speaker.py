@@ -1,121 +1,433 @@
+"""
+Text-to-speech output.
+
+speak() queues text for the speaker thread, which runs a two-stage
+pipeline:
+
+- The prefetch thread takes the most urgent queued text, splits it into
+  sentences and synthesizes them one at a time (through tts_cache, so
+  repeats are free), at most PREFETCH chunks ahead of playback.
+- The playback thread (GTTSThread.run) plays the most urgent ready chunk.
+  With PyAudio available, chunks are decoded to PCM on the prefetch thread
+  and written to one long-lived stream (audio_out.py); otherwise each is
+  played from its cache file with mpg123/pygame. Greetings come
+  pre-rendered from greeting_bundle.py.
+  Acknowledgements ("Yes?") and tones are played from memory (earcons.py)
+  without going through the prefetch thread at all.
+
+Sentences missing from the cache go through tts_router.py: gTTS if it can
+deliver within the deadline, otherwise the persistent espeak-ng engine
+(offline_tts.py). Once an utterance falls back to espeak-ng, the rest of it
+stays in that voice.
+
+Sentence N+1, and the next queued text, are synthesized while sentence N
+plays, so a long Gemini answer starts after its first sentence instead of
+after the whole MP3.
+
+Every text has a kind, and kinds have priorities: 'urgent' (quick
+acknowledgements) before 'answer' before 'greeting'. An urgent text
+overtakes a long answer at the next sentence boundary. Greetings older
+than GREETING_TTL seconds are dropped rather than spoken late. cancel()
+drops queued texts, and interrupt() also cuts off whatever is playing.
+Both threads block on one condition variable; nothing polls.
+
+The bus's `speaking` field follows real playback: it goes True when the
+first chunk of a text starts playing (and `speech_count` goes up) and
+False once the last chunk has been played out of the device buffer, or
+the playback was cut off. wait_until_silent() and on_speaking() wake
+listeners on those edges.
+
+Time from speak() to the first audio is recorded as `playback_start`
+(and `playback_start_<kind>`), the silence between chunks as
+`tts_chunk_gap`, and each speaking stretch as `speech_duration`.
+"""
+import heapq
 import os
+import re
+import subprocess
 import threading
 import time
-import uuid
-import pygame
-from gtts import gTTS
+try:
+    import pygame
+except ImportError:
+    pygame = None
+import metrics
+from audio_devices import get_profile
+from audio_out import init_audio_output
+from earcons import EarconBank
+from greeting_bundle import init_greeting_bundle
+from offline_tts import init_offline_tts
+from state_bus import bus
+from tts_cache import init_tts_cache
+from tts_router import TTSRouter
+
+PREFETCH = int(os.environ.get('OMNIS_TTS_PREFETCH', '2'))  # Chunks synthesized ahead of playback
+GREETING_TTL = float(os.environ.get('OMNIS_GREETING_TTL', '6'))  # Seconds before a queued greeting is stale
+PRIORITIES = {'urgent': 0, 'answer': 1, 'greeting': 2}
+MIN_CHUNK = 40    # Characters; shorter sentences are joined to the next one
+MAX_CHUNK = 200   # Characters; longer sentences are split at commas
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
 
-# Shared state to check if speaker is active
-_global_speaker_active = False
 
 def is_speaking():
-    return _global_speaker_active
+    return bus.state.speaking
 
-def speak_offline(text):
-    """Fast offline TTS using espeak-ng"""
+def _run_player(args, stop=None):
+    """Run an audio command to completion, or until `stop` is set. False if it failed."""
     try:
-        # Use espeak-ng for instant feedback
-        # -s 150 (speed), -p 50 (pitch), -v en (voice)
-        os.system(f"espeak-ng -s 160 -p 40 '{text}' > /dev/null 2>&1")
-        return True
-    except:
+        proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
         return False
+    while True:
+        try:
+            return proc.wait(timeout=0.05) == 0
+        except subprocess.TimeoutExpired:
+            if stop is not None and stop.is_set():
+                proc.terminate()
+                proc.wait()
+                return True  # Cut off on purpose, not a failure
+
+def speak_offline(text, stop=None):
+    """Fast offline TTS using espeak-ng"""
+    # Use espeak-ng for instant feedback
+    # -s 150 (speed), -p 50 (pitch), -v en (voice)
+    return _run_player(['espeak-ng', '-s', '160', '-p', '40', text], stop)
+
+def split_sentences(text, min_chunk=MIN_CHUNK, max_chunk=MAX_CHUNK):
+    """Split `text` into speakable chunks of roughly a sentence each."""
+    pieces = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if len(sentence) > max_chunk:
+            pieces.extend(p for p in _CLAUSE_END.split(sentence) if p)
+        elif sentence:
+            pieces.append(sentence)
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) < min_chunk:
+            chunks[-1] += ' ' + piece
+        else:
+            chunks.append(piece)
+    if len(chunks) > 1 and len(chunks[-1]) < min_chunk:
+        tail = chunks.pop()
+        chunks[-1] += ' ' + tail
+    return chunks
+
+def play_audio_file(filename, stop=None):
+    """Play an MP3 file and return when it has finished (or `stop` is set)."""
+    # ALSA device (the Pi's USB speakers) from the saved profile; it also set AUDIODEV/SDL_* once
+    device = get_profile()['alsa_device']
+
+    # Try mpg123 first on Linux if available (more reliable for MP3 on Pi)
+    if os.name != 'nt':
+        try:
+            # Try to use mpg123 which handles card selection well
+            if _run_player(['mpg123', '-q', '-a', device, filename], stop):
+                return
+        except:
+            pass
+
+    if pygame is None:
+        print("Audio Error: no mpg123 and no pygame")
+        return
+    try:
+        # Re-initialize mixer if needed
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=4096)
+
+        pygame.mixer.music.load(filename)
+        pygame.mixer.music.play()
+
+        while pygame.mixer.music.get_busy():
+            if stop is not None and stop.wait(0.1):
+                pygame.mixer.music.stop()
+                break
+            if stop is None:
+                time.sleep(0.1)
+
+        try:
+            if hasattr(pygame.mixer.music, 'unload'):
+                pygame.mixer.music.unload()
+        except:
+            pass
+    except Exception as e:
+        print(f"Pygame Audio Error: {e}")
+
+
+class _Utterance:
+    __slots__ = ('text', 'kind', 'priority', 'seq', 'generation', 't_queued', 'chunks', 'next', 'offline')
+
+    def __init__(self, text, kind, seq, generation):
+        self.text = text
+        self.kind = kind
+        self.priority = PRIORITIES.get(kind, PRIORITIES['answer'])
+        self.seq = seq
+        self.generation = generation      # interrupt() count when queued
+        self.t_queued = time.perf_counter()
+        self.chunks = None                # Sentences, once the prefetch thread has split the text
+        self.next = 0                     # Next chunk to synthesize
+        self.offline = False              # Fell back to espeak-ng: keep that voice for the rest
+
+
+class _Chunk:
+    __slots__ = ('utterance', 'text', 'path', 'index', 'last', 'pcm', 'rate')
+
+    def __init__(self, utterance, text, path, index, last, pcm=None, rate=None):
+        self.utterance = utterance
+        self.text = text          # None when synthesis failed (nothing to play)
+        self.path = path          # Audio file, or None to use espeak-ng
+        self.index = index        # Position within its utterance
+        self.last = last
+        self.pcm = pcm            # Decoded audio for the shared output stream
+        self.rate = rate          # Sample rate pcm was decoded at (the stream may have reopened at another)
+
+    def order(self):
+        return (self.utterance.priority, self.utterance.seq, self.index)
+
 
 class GTTSThread(threading.Thread):
-    def __init__(self):
+    def __init__(self, cache=None, play=None, output=None, offline=None, bundle=None, router=None,
+                 pipelined=True, prefetch=PREFETCH, greeting_ttl=GREETING_TTL):
         threading.Thread.__init__(self)
-        self.queue = []
-        self.lock = threading.Lock()
+        self.cond = threading.Condition()
+        self.pending = []          # Heap of (priority, seq, _Utterance) waiting for synthesis
+        self.ready = []            # Synthesized _Chunks waiting for playback
+        self.seq = 0
+        self.generation = 0
+        self.stop_playback = threading.Event()  # Set by interrupt() to cut off the current chunk
+        self.current = None        # _Chunk being played (guarded by cond)
+        self.speech_started = None
         self.running = True
+        self.cache = cache or init_tts_cache()
+        self.play = play or play_audio_file
+        # audio_out.AudioOutput; a custom `play` means file playback unless an output is given too
+        self.output = output if output is not None or play is not None else init_audio_output()
+        # offline_tts.OfflineTTS: the fallback voice as PCM into the same stream (else espeak-ng plays it itself)
+        # offline=False / bundle=False turn those off
+        self.offline = (offline if offline is not None or self.output is None else init_offline_tts()) or None
+        self.bundle = (bundle if bundle is not None else init_greeting_bundle()) or None
+        self.earcons = EarconBank(self.output, self.cache, self.offline) if self.output is not None else None
+        self.router = router or self._default_router()
+        self.pipelined = pipelined  # False: synthesize each text whole (for comparison)
+        self.prefetch = max(1, prefetch)
+        self.greeting_ttl = greeting_ttl
+        self.prefetcher = threading.Thread(target=self._prefetch, daemon=True, name='tts-prefetch')
 
-    def run(self):
-        global _global_speaker_active
+    # --- Any thread ---
+
+    def speak(self, text, kind='answer'):
+        pcm = self.earcons.match(text) if self.earcons is not None else None
+        self._enqueue(text, kind, pcm, self.earcons.rate if pcm is not None else None)
+
+    def earcon(self, name, kind='urgent'):
+        """Play a tone from the earcon bank (listen_start, listen_stop, error). False if unavailable."""
+        pcm = self.earcons.get(name) if self.earcons is not None else None
+        if pcm is None:
+            return False
+        self._enqueue(name, kind, pcm, self.earcons.rate)
+        return True
+
+    def _enqueue(self, text, kind, pcm=None, rate=None):
+        with self.cond:
+            self.seq += 1
+            utterance = _Utterance(text, kind, self.seq, self.generation)
+            if pcm is not None:
+                self.ready.append(_Chunk(utterance, text, None, 0, True, pcm, rate))  # Already rendered
+            else:
+                heapq.heappush(self.pending, (utterance.priority, utterance.seq, utterance))
+            self.cond.notify_all()
+
+    def cancel(self, kind=None):
+        """Drop queued texts (of `kind`, or all) that have not started playing. Returns how many."""
+        with self.cond:
+            dropped = {u.seq for _, _, u in self.pending if u.next == 0 and (kind is None or u.kind == kind)}
+            dropped.update(c.utterance.seq for c in self.ready
+                           if c.index == 0 and (kind is None or c.utterance.kind == kind))
+            self.pending = [e for e in self.pending if e[1] not in dropped]
+            heapq.heapify(self.pending)
+            self.ready = [c for c in self.ready if c.utterance.seq not in dropped]
+            self.cond.notify_all()
+        if dropped:
+            metrics.inc('speech_cancelled', len(dropped))
+        return len(dropped)
+
+    def interrupt(self):
+        """Stop talking now: cut off the current sentence and drop everything queued."""
+        with self.cond:
+            self.generation += 1
+            self.pending = []
+            self.ready = []
+            self.stop_playback.set()
+            self.cond.notify_all()
+            idle = self.current is None
+        if idle:  # Otherwise the playback thread reports the end once the chunk has stopped
+            self._speaking(False)
+        metrics.inc('speech_interrupted')
+
+    def tts_stats(self):
+        """Per-backend latency / error counters from the router."""
+        return self.router.stats()
+
+    # --- Prefetch thread: text -> synthesized chunks ---
+
+    def _default_router(self):
+        router = TTSRouter()
+        router.register(self.cache.backend.name, self._render_online)
+        router.register('espeak', self._render_offline, online=False)
+        return router
+
+    def _render_online(self, text):
+        if self.output is not None:
+            rate = self.output.rate
+            return self.output.decode(self.cache.load(text), rate), None, rate
+        return None, self.cache.fetch(text), None
+
+    def _render_offline(self, text):
+        if self.offline is not None:
+            rate = self.output.rate
+            return self.offline.pcm(text, rate), None, rate
+        return None, None, None  # espeak-ng speaks it at playback time
+
+    def _render(self, utterance, text):
+        """(pcm, path, rate) for one chunk: the cached copy, or whichever backend delivers in time."""
+        if not utterance.offline and self.cache.get(text) is not None:
+            return self._render_online(text)
+        backend, audio = self.router.render(text, utterance.kind, offline_only=utterance.offline)
+        utterance.offline = backend == 'espeak'
+        return audio
+
+    def _stale(self, utterance):
+        """Interrupted, or a greeting that waited too long to start (which kills the whole greeting)."""
+        if utterance.generation == self.generation and not (
+                utterance.kind == 'greeting' and time.perf_counter() - utterance.t_queued > self.greeting_ttl):
+            return False
+        utterance.generation = -1
+        return True
+
+    def _next_utterance(self):
+        with self.cond:
+            while self.running:
+                if self.pending:
+                    utterance = self.pending[0][2]
+                    if utterance.priority == 0 or len(self.ready) < self.prefetch:
+                        heapq.heappop(self.pending)
+                        if utterance.generation == self.generation and (utterance.next > 0 or not self._stale(utterance)):
+                            return utterance
+                        metrics.inc('speech_dropped_stale')
+                        continue
+                self.cond.wait()
+        return None
+
+    def _prefetch(self):
         while self.running:
-            text_to_speak = None
-            
-            self.lock.acquire()
-            if self.queue:
-                text_to_speak = self.queue.pop(0)
-            self.lock.release()
-
-            if text_to_speak:
-                _global_speaker_active = True
-                try:
-                    # SPEED OPTIMIZATION: Use offline TTS for short common phrases
-                    # This makes greetings and basic ACKs instant.
-                    short_phrases = ["yes?", "ok.", "hello!", "hi.", "welcome."]
-                    text_lower = text_to_speak.lower().strip()
-                    
-                    if len(text_to_speak) < 25 or any(p in text_lower for p in short_phrases):
-                        if speak_offline(text_to_speak):
-                             _global_speaker_active = False # Reset immediately
-                             continue
-
-                    # 1. Generate Audio file (High Quality for AI answers)
-                    filename = f"speak_{uuid.uuid4()}.mp3"
-                    tts = gTTS(text=text_to_speak, lang='en', tld='com')
-                    tts.save(filename)
-
-                    # 2. Play Audio (Cross Platform)
-                    # For Raspberry Pi USB speakers (Card 1)
-                    if os.path.exists('/proc/asound/card1'):
-                         os.environ['AUDIODEV'] = 'hw:1,0'
-                         os.environ['SDL_PATH_ALSA_DEVICE'] = 'hw:1,0'
-                         os.environ['SDL_ALSA_DEVICE'] = 'hw:1,0'
-
-                    # Try mpg123 first on Linux if available (more reliable for MP3 on Pi)
-                    played = False
-                    if os.name != 'nt':
+            utterance = self._next_utterance()
+            if utterance is None:
+                return
+            if utterance.chunks is None:
+                text_to_speak = utterance.text
+                # Pre-rendered greeting: no synthesis at all (without a stream, the cached file is used below)
+                if utterance.kind == 'greeting' and self.bundle is not None and self.output is not None:
+                    audio = self.bundle.get(text_to_speak)
+                    if audio is not None:
                         try:
-                            # Try to use mpg123 which handles card selection well
-                            device = "hw:1,0" if os.path.exists('/proc/asound/card1') else "default"
-                            res = os.system(f"mpg123 -q -a {device} {filename} > /dev/null 2>&1")
-                            if res == 0:
-                                played = True
-                        except:
-                            pass
-
-                    if not played:
-                        try:
-                            # Re-initialize mixer if needed
-                            if not pygame.mixer.get_init():
-                                pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=4096)
-                            
-                            pygame.mixer.music.load(filename)
-                            pygame.mixer.music.play()
-                            
-                            while pygame.mixer.music.get_busy():
-                                time.sleep(0.1)
-                                
-                            try:
-                                if hasattr(pygame.mixer.music, 'unload'):
-                                    pygame.mixer.music.unload()
-                            except:
-                                pass
+                            rate = self.output.rate
+                            pcm = self.output.decode(audio, rate)
+                            self._add_ready(_Chunk(utterance, text_to_speak, None, 0, True, pcm, rate))
+                            continue
                         except Exception as e:
-                            print(f"Pygame Audio Error: {e}")
-                    
-                    # Cleanup
-                    if os.path.exists(filename):
-                        try:
-                            os.remove(filename)
-                        except:
-                            pass
+                            print(f"Speaker Error: {e}")
+                utterance.chunks = split_sentences(text_to_speak) if self.pipelined else [text_to_speak.strip()]
 
+            i = utterance.next
+            try:
+                pcm, path, rate = self._render(utterance, utterance.chunks[i])
+            except Exception as e:
+                print(f"Speaker Error: {e}")
+                self._add_ready(_Chunk(utterance, None, None, i, True))  # Ends the utterance
+                continue
+            utterance.next = i + 1
+            last = utterance.next >= len(utterance.chunks)
+            self._add_ready(_Chunk(utterance, utterance.chunks[i], path, i, last, pcm, rate))
+            if not last:
+                with self.cond:  # Rest of it goes back in line, so something more urgent can overtake
+                    heapq.heappush(self.pending, (utterance.priority, utterance.seq, utterance))
+
+    def _add_ready(self, chunk):
+        with self.cond:
+            if chunk.utterance.generation == self.generation:
+                self.ready.append(chunk)
+                self.cond.notify_all()
+
+    # --- Playback thread ---
+
+    def _next_chunk(self):
+        with self.cond:
+            while self.running:
+                if self.ready:
+                    chunk = min(self.ready, key=_Chunk.order)
+                    self.ready.remove(chunk)
+                    self.cond.notify_all()  # Room to prefetch another
+                    if chunk.utterance.generation != self.generation or (chunk.index == 0 and self._stale(chunk.utterance)):
+                        metrics.inc('speech_dropped_stale')
+                        continue
+                    self.stop_playback.clear()
+                    self.current = chunk
+                    return chunk
+                self.cond.wait()
+        return None
+
+    def _speaking(self, speaking):
+        """Publish a start / end edge (no-op if already in that state). Only the playback thread starts."""
+        state = bus.state
+        if state.speaking == speaking:
+            return
+        if speaking:
+            self.speech_started = time.perf_counter()
+            bus.update(speaking=True, speech_count=state.speech_count + 1)
+        elif bus.update(speaking=False) is not state and self.speech_started is not None:
+            metrics.observe('speech_duration', time.perf_counter() - self.speech_started)
+
+    def run(self):
+        if self.earcons is not None:
+            # Own thread: rendering the phrases may take several gTTS calls, which must not hold up real speech
+            threading.Thread(target=self.earcons.load, daemon=True, name='earcon-load').start()
+        self.prefetcher.start()
+        last_end = None
+        while self.running:
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+
+            if chunk.text is not None:
+                self._speaking(True)
+                now = time.perf_counter()
+                if chunk.index == 0:
+                    wait = now - chunk.utterance.t_queued
+                    metrics.observe('playback_start', wait)
+                    metrics.observe(f'playback_start_{chunk.utterance.kind}', wait)
+                elif last_end is not None:
+                    metrics.observe('tts_chunk_gap', now - last_end)
+                try:
+                    if chunk.pcm is not None:
+                        self.output.play(chunk.pcm, self.stop_playback, chunk.rate)
+                        if chunk.last:
+                            self.output.drain(self.stop_playback)
+                    elif chunk.path is None:
+                        speak_offline(chunk.text, self.stop_playback)
+                    else:
+                        self.play(chunk.path, self.stop_playback)
                 except Exception as e:
                     print(f"Speaker Error: {e}")
-                finally:
-                    _global_speaker_active = False
-            else:
-                time.sleep(0.1)
-
-    def speak(self, text):
-        self.lock.acquire()
-        self.queue.append(text)
-        self.lock.release()
+                last_end = time.perf_counter()
+            with self.cond:
+                self.current = None
+            if chunk.last or self.stop_playback.is_set():
+                self._speaking(False)
 
     def stop(self):
         self.running = False
+        self.interrupt()
 
 # Global helper for main.py
 _global_speaker_thread = None
@@ -127,7 +439,28 @@ def init_speaker_thread():
         _global_speaker_thread.start()
     return _global_speaker_thread
 
-def speak(text):
+def speak(text, kind='answer'):
     """Global speak function called by main.py"""
     s = init_speaker_thread()
-    s.speak(text)
+    s.speak(text, kind)
+
+def play_earcon(name):
+    """Play a tone (listen_start, listen_stop, error) if the audio stream is available."""
+    return init_speaker_thread().earcon(name)
+
+def tts_stats():
+    """Per-backend TTS latency and error rates (empty before the speaker starts)."""
+    return _global_speaker_thread.tts_stats() if _global_speaker_thread is not None else {}
+
+def wait_until_silent(timeout=None):
+    """Block until nothing is playing. False on timeout."""
+    return bus.wait_for(lambda s: not s.speaking, timeout=timeout) is not None
+
+def on_speaking(callback):
+    """Call `callback(speaking)` on every start / end of speech. Returns an unsubscribe function."""
+    return bus.subscribe(lambda old, new: callback(new.speaking), keys=('speaking',))
+
+def stop_speaking():
+    """Cut off the current speech and drop everything queued."""
+    if _global_speaker_thread is not None:
+        _global_speaker_thread.interrupt()
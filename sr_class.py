@@ -1,6 +1,7 @@
 import threading
 import time
 import os
+import re
 import ctypes
 import speech_recognition as sr
 
@@ -19,11 +20,24 @@ except:
     pass
 # ---------------------
 
-from speaker import GTTSThread, is_speaking
+from audio_devices import get_profile, update_profile
+from speaker import GTTSThread, is_speaking, wait_until_silent
+from state_bus import bus
 from ai_response import get_chat_response
 from school_data import get_school_answer_enhanced
-import shared_state
 from register_face import register_name
+from enrollment import get_enrollment
+from power import get_power
+from presence import get_presence
+import metrics
+
+
+def parse_minutes(text, default=10):
+    """"last 20 minutes" -> 20, "last hour" -> 60, otherwise `default`."""
+    match = re.search(r'(\d+)\s*(minute|min|hour)', text)
+    if match:
+        return int(match.group(1)) * (60 if match.group(2) == 'hour' else 1)
+    return 60 if 'hour' in text else default
 
 
 class SpeechRecognitionThread(threading.Thread):
@@ -35,6 +49,7 @@ class SpeechRecognitionThread(threading.Thread):
         self.conversation_active = False
         self.microphone = None
         self.conversation_timeout = 15
+        self.cued_at = 0  # bus speech_count when listen_start last played
         
         env_wake = os.environ.get('WAKE_WORDS')
         if env_wake:
@@ -49,7 +64,24 @@ class SpeechRecognitionThread(threading.Thread):
         self.recognizer.phrase_threshold = 0.3
         self.recognizer.non_speaking_duration = 0.3 # faster turnaround
 
-    def _open_microphone(self) -> bool:
+    def _open_microphone(self, reconnect=False) -> bool:
+        t0 = time.perf_counter()
+        profile = get_profile(recheck=reconnect)
+
+        # Last mic that worked on this hardware: open it and reuse its calibration
+        mic = profile.get('microphone')
+        if mic is not None:
+            try:
+                self.microphone = sr.Microphone(device_index=mic['index'])
+                with self.microphone:
+                    pass
+                self.recognizer.energy_threshold = mic['energy_threshold']
+                print(f"✅ Mic Connected on Index {'Default' if mic['index'] is None else mic['index']} (saved profile)")
+                metrics.observe('mic_reconnect' if reconnect else 'mic_open', time.perf_counter() - t0)
+                return True
+            except Exception as e:
+                print(f"[Microphone] Saved index {mic['index']} failed ({e}), searching...")
+
         # Debug: List all microphones
         print("\nSearching for microphones...")
         try:
@@ -60,11 +92,9 @@ class SpeechRecognitionThread(threading.Thread):
             print("  (Could not list microphones)")
 
         # On Windows, using default (index=None) is usually best.
-        # On Pi, we might need specific indices.
+        # On Pi, we might need specific indices (input devices from the profile, preferred first).
         indices_to_try = [None] # None = System Default
-        
-        # Add index 1, 0, 2 just in case
-        for i in range(len(mics) if 'mics' in locals() else 3):
+        for i in profile['inputs'] or range(len(mics) if 'mics' in locals() else 3):
              if i not in indices_to_try: indices_to_try.append(i)
 
         for idx in indices_to_try:
@@ -79,6 +109,8 @@ class SpeechRecognitionThread(threading.Thread):
                     self.recognizer.adjust_for_ambient_noise(source, duration=1.0)
                 
                 print(f"✅ Mic Connected on Index {name}")
+                update_profile(microphone={'index': idx, 'energy_threshold': self.recognizer.energy_threshold})
+                metrics.observe('mic_reconnect' if reconnect else 'mic_open', time.perf_counter() - t0)
                 return True
             except Exception as e:
                 # print(f"   Failed index {idx}: {e}")
@@ -87,6 +119,14 @@ class SpeechRecognitionThread(threading.Thread):
         print("❌ Could not find any working microphone.")
         return False
 
+    def _cue_listen(self):
+        """Play listen_start and wait for it to end, so the mic does not hear it."""
+        count = bus.state.speech_count
+        if self.speaker.earcon('listen_start'):
+            bus.wait_for(lambda s: s.speech_count != count, timeout=0.5)
+            wait_until_silent(timeout=1.0)
+        self.cued_at = bus.state.speech_count
+
     def run(self) -> None:
         print("\n" + "=" * 50)
         print("🎤 VOICE RECOGNITION STARTED")
@@ -100,9 +140,12 @@ class SpeechRecognitionThread(threading.Thread):
         while not self.stop_event.is_set():
             try:
                 # 1. Wait if speaking BEFORE opening the mic
-                while is_speaking() and not self.stop_event.is_set():
-                    # Reduced poll time from 0.5 to 0.1 for better responsiveness
-                    time.sleep(0.1)
+                # (woken when playback really ends, re-checking stop every second)
+                while not self.stop_event.is_set() and not wait_until_silent(timeout=1.0):
+                    pass
+                # In a conversation, a tone after each of our replies says the mic is open again
+                if self.conversation_active and bus.state.speech_count != self.cued_at:
+                    self._cue_listen()
 
                 with self.microphone as source:
                     # Only adjust for noise if we aren't already in conversation
@@ -129,6 +172,7 @@ class SpeechRecognitionThread(threading.Thread):
                         # Double check speaker just before listening
                         if is_speaking():
                             continue
+                        spoken = bus.state.speech_count
 
                         # Dynamic energy adjustment helps in noisy environments
                         audio_data = self.recognizer.listen(
@@ -137,39 +181,47 @@ class SpeechRecognitionThread(threading.Thread):
                             phrase_time_limit=10
                         )
 
-                        # Skip processing if we started speaking while listening (rare but possible)
-                        if is_speaking():
+                        # Someone spoke: bring the vision loop out of idle before ASR even returns
+                        power = get_power()
+                        if power:
+                            power.poke('speech')
+
+                        # Skip processing if we spoke at any point while listening (the mic heard us)
+                        if is_speaking() or bus.state.speech_count != spoken:
                             print("🔇 Discarding audio (speaker started)")
                             continue
 
                         print("🔄 Processing audio...")
-                        text = self.recognizer.recognize_google(audio_data)
+                        with metrics.timed('asr'):
+                            text = self.recognizer.recognize_google(audio_data)
                         print(f"📝 Heard: '{text}'")
                         
                         # Fix common mishearings of "Omnis"
                         text_lower = text.lower()
                         text_lower = text_lower.replace("omni's", "omnis").replace("omni", "omnis").replace("omens", "omnis").replace("honest", "omnis")
                         
-                        if getattr(shared_state, 'awaiting_name', False):
+                        state = bus.state
+                        if state.awaiting_name:
                             name_spoken = text.strip()
                             greetings = {'hello', 'hi', 'hey', 'thanks', 'thank you'}
                             norm = name_spoken.lower().strip()
+                            enrollment = get_enrollment()
                             if not name_spoken or norm in greetings or len(''.join(ch for ch in norm if ch.isalpha())) < 2:
                                 self.speaker.speak("I didn't catch a name.")
-                                shared_state.awaiting_name = False
-                                shared_state.awaiting_encoding = None
-                                shared_state.awaiting_face_image = None
+                                if enrollment:
+                                    enrollment.cancel()
+                                bus.update(awaiting_name=False, awaiting_encoding=None, awaiting_face_image=None)
                                 continue
-                            enc = getattr(shared_state, 'awaiting_encoding', None)
-                            img = getattr(shared_state, 'awaiting_face_image', None)
-                            ok = register_name(name_spoken, enc, img)
+                            if enrollment:
+                                # Saved on the enrollment thread; False if the question already timed out
+                                ok = enrollment.submit_name(name_spoken)
+                            else:
+                                ok = register_name(name_spoken, state.awaiting_encoding, state.awaiting_face_image)
                             if ok:
                                 self.speaker.speak(f"Thanks {name_spoken}, I will remember you.")
                             else:
-                                self.speaker.speak(f"Sorry, I couldn't save your name.")
-                            shared_state.awaiting_name = False
-                            shared_state.awaiting_encoding = None
-                            shared_state.awaiting_face_image = None
+                                self.speaker.speak("Sorry, I couldn't save your name. Please try again.")
+                            bus.update(awaiting_name=False, awaiting_encoding=None, awaiting_face_image=None)
                             continue
 
                         tokens = text_lower.split()
@@ -194,23 +246,47 @@ class SpeechRecognitionThread(threading.Thread):
                             # 1. SILENCE / STOP
                             if any(x in question for x in ["silence", "silent", "stop talking", "shut up", "hush"]):
                                 print("\n🛑 SILENCE COMMAND DETECTED")
-                                self.speaker.stop() # Stop current thread? Or just queue?
-                                # We need a way to clear the queue in speaker.py really.
-                                # For now, we just don't reply and reset state.
+                                self.speaker.stop() # Cut off current speech and drop the queue
                                 self.conversation_active = False 
                                 # Maybe a quick ACK?
                                 # self.speaker.speak("Ok.")
                                 continue
                                 
+                            presence = get_presence()
+
+                            # 2a. WHO WAS HERE? / HOW MANY VISITORS TODAY?
+                            if presence and any(x in question for x in ["who was here", "who came", "who has been here"]):
+                                minutes = parse_minutes(question, default=10)
+                                knowns, visitors = presence.seen_within(minutes * 60)
+                                if not knowns and not visitors:
+                                    self.speaker.speak(f"Nobody in the last {minutes} minutes.")
+                                else:
+                                    parts = [", ".join(knowns)] if knowns else []
+                                    if visitors:
+                                        parts.append(f"{len(visitors)} visitors I don't know")
+                                    self.speaker.speak(f"In the last {minutes} minutes I saw " + " and ".join(parts) + ".")
+                                continue
+                            if presence and any(x in question for x in ["how many visitors", "how many people"]):
+                                known_count, visitor_count = presence.count_today()
+                                self.speaker.speak(f"Today I have seen {known_count} people I know "
+                                                   f"and {visitor_count} visitors.")
+                                continue
+
                             # 2. WHO IS HERE?
                             if any(x in question for x in ["who is here", "who are inside", "detect people", "guess me", "who am i"]):
-                                people = getattr(shared_state, 'detected_people', [])
+                                if presence:
+                                    knowns, visitors, anonymous = presence.here_now()
+                                    people = knowns + ["Unknown"] * (len(visitors) + anonymous)
+                                else:
+                                    people = list(bus.state.detected_people)
                                 if not people:
                                     self.speaker.speak("I don't see anyone right now.")
                                 else:
                                     # Filter out 'Unknown'
                                     knowns = [p for p in people if p != "Unknown"]
-                                    unknown_count = people.count("Unknown")
+                                    # Distinct strangers when visitor clustering is on
+                                    visitors = [] if presence else bus.state.detected_visitors
+                                    unknown_count = len(set(visitors)) or people.count("Unknown")
                                     
                                     response_parts = []
                                     if knowns:
@@ -227,26 +303,30 @@ class SpeechRecognitionThread(threading.Thread):
                                 
                             # 3. RESUME / CONTINUE
                             if any(x in question for x in ["continue", "speak again", "hello silence", "resume"]):
-                                self.speaker.speak("Ok, I am listening.")
+                                self.speaker.speak("Ok, I am listening.", 'urgent')
                                 self.conversation_active = True
                                 continue
 
 
                             if has_wake_word:
                                print("\n✅ WAKE WORD DETECTED!\n")
-                               self.speaker.speak("Yes?") # Quick ack
+                               # Someone is talking to us: queued greetings can wait for another time
+                               self.speaker.cancel('greeting')
+                               self.speaker.speak("Yes?", 'urgent') # Quick ack
                                self.conversation_active = True
 
                             
                             if question and len(question) >= 3:
                                 print(f"❓ Question: {question}\n")
-                                school_ans = get_school_answer_enhanced(question)
+                                with metrics.timed('school_lookup'):
+                                    school_ans = get_school_answer_enhanced(question)
                                 if school_ans:
                                     print(f"🏫 School Response: {school_ans}\n")
                                     self.speaker.speak(school_ans)
                                 else:
                                     print("🤖 Getting AI response...")
-                                    resp = get_chat_response(question)
+                                    with metrics.timed('gemini'):
+                                        resp = get_chat_response(question)
                                     if isinstance(resp, dict) and 'choices' in resp:
                                         answer = resp['choices'][0]['message']['content']
                                         print(f"💬 AI Response: {answer}\n")
@@ -266,18 +346,23 @@ class SpeechRecognitionThread(threading.Thread):
                             timeout_count += 1
                             if timeout_count >= 3:
                                 print("⏱️ Timeout - say 'OMNIS' to start again\n")
+                                self.speaker.earcon('listen_stop')
                                 self.conversation_active = False
                                 timeout_count = 0
                     except sr.UnknownValueError:
                         print("   (Didn't catch that)\n")
                     except sr.RequestError as ex:
                         print(f"❌ Speech error: {ex}\n")
+                        self.speaker.earcon('error')
                     except Exception as e:
                         print(f"❌ Loop Error: {e}")
                         time.sleep(1)
             except Exception as e:
                 print(f"❌ Microphone Error: {e}")
                 time.sleep(2)
+                # Device gone or replugged: reopen (re-probing only if the hardware changed)
+                while not self.stop_event.is_set() and not self._open_microphone(reconnect=True):
+                    time.sleep(1)
                 
     def stop(self):
         self.stop_event.set()
@@ -0,0 +1,129 @@
+"""
+Versioned state bus shared by the vision loop, the speech thread, the
+speaker and the head controller.
+
+The state is one immutable State snapshot. Writers call update() with
+every field that belongs together (e.g. awaiting_name with the encoding
+and photo it refers to), so a reader never sees half of a change. Each
+change bumps `version`. Readers either take bus.state (a single reference
+read, no lock) or block until something changes:
+
+    bus.wait_for(lambda s: not s.speaking, timeout=5)
+    state = bus.wait_change(since=state.version, timeout=1)
+
+subscribe() registers a callback that runs on a writer's thread, after
+the state lock is released, with (old, new) for every change to the given
+keys. Changes are delivered one at a time in version order, even when
+several threads write at once: each update() queues its change and then
+drains the queue under a delivery lock, so it returns only after its own
+change has been delivered (by itself or by the writer ahead of it).
+"""
+import threading
+from collections import deque, namedtuple
+
+FIELDS = (
+    'awaiting_name',        # The speech thread should treat the next phrase as a name
+    'awaiting_encoding',    # Face encodings captured for the unknown face being enrolled
+    'awaiting_face_image',  # BGR crop of that face (ready for cv2.imwrite)
+    'detected_people',      # Ids currently in frame
+    'detected_visitors',    # Temporary ids of the unknown people in frame, see visitor_clusters.py
+    'speaking',             # The speaker is playing audio (from the first sample written to the end of the last)
+    'speech_count',         # Times speaking has gone True: compare before/after to catch speech in between
+)
+DEFAULTS = (False, None, None, (), (), False, 0)
+
+
+def _same(a, b):
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except (ValueError, TypeError):  # numpy arrays: compare by identity
+        return False
+
+
+class State(namedtuple('State', ('version',) + FIELDS)):
+    __slots__ = ()
+
+
+class StateBus:
+    def __init__(self):
+        self.state = State(0, *DEFAULTS)
+        self.cond = threading.Condition()
+        self.subscribers = []  # (callback, keys or None)
+        self.outbox = deque()  # (old, new, changed) waiting for delivery, in version order
+        self.delivery = threading.Lock()
+        self.delivering = None  # Thread currently running callbacks
+
+    def snapshot(self):
+        return self.state
+
+    def get(self, key):
+        return getattr(self.state, key)
+
+    def update(self, **fields):
+        """Set several fields atomically. Returns the new state (unchanged if nothing differed)."""
+        for key in fields:
+            if key not in FIELDS:
+                raise KeyError(f"Unknown state field: {key}")
+        if 'detected_people' in fields:
+            fields['detected_people'] = tuple(fields['detected_people'])
+        if 'detected_visitors' in fields:
+            fields['detected_visitors'] = tuple(fields['detected_visitors'])
+        with self.cond:
+            old = self.state
+            changed = [k for k, v in fields.items() if not _same(getattr(old, k), v)]
+            if not changed:
+                return old
+            new = old._replace(version=old.version + 1, **{k: fields[k] for k in changed})
+            self.state = new
+            self.cond.notify_all()
+            self.outbox.append((old, new, changed))
+        if self.delivering is not threading.current_thread():  # Else the running delivery loop picks it up
+            self._deliver()
+        return new
+
+    def _deliver(self):
+        with self.delivery:
+            self.delivering = threading.current_thread()
+            try:
+                while True:
+                    with self.cond:
+                        if not self.outbox:
+                            return
+                        old, new, changed = self.outbox.popleft()
+                        subscribers = list(self.subscribers)
+                    for callback, keys in subscribers:
+                        if keys is None or any(k in keys for k in changed):
+                            try:
+                                callback(old, new)
+                            except Exception as e:
+                                print(f"[state] Subscriber error: {e}")
+            finally:
+                self.delivering = None
+
+    def wait_for(self, predicate, timeout=None):
+        """Block until predicate(state) is true. Returns the state, or None on timeout."""
+        with self.cond:
+            if self.cond.wait_for(lambda: predicate(self.state), timeout):
+                return self.state
+        return None
+
+    def wait_change(self, since, timeout=None):
+        """Block until the version moves past `since`. Returns the current state either way."""
+        return self.wait_for(lambda s: s.version > since, timeout) or self.state
+
+    def subscribe(self, callback, keys=None):
+        """Call callback(old, new) on every change (to `keys`, if given). Returns an unsubscribe function."""
+        entry = (callback, tuple(keys) if keys else None)
+        with self.cond:
+            self.subscribers.append(entry)
+
+        def unsubscribe():
+            with self.cond:
+                if entry in self.subscribers:
+                    self.subscribers.remove(entry)
+        return unsubscribe
+
+
+bus = StateBus()
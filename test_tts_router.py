@@ -0,0 +1,51 @@
+"""
+Offline check of the TTS router's fallback and recovery (no network, no audio).
+
+A fake online backend is slow for its first call and fast afterwards. The
+first text misses the deadline and falls back to the offline voice; while
+the online backend is skipped as too slow, a background probe finds it
+fast again and later texts go back to it.
+
+Usage: python test_tts_router.py
+"""
+import sys
+import time
+
+import tts_router
+from tts_router import TTSRouter
+
+
+class SlowThenFast:
+    def __init__(self, slow=0.5, fast=0.01):
+        self.delays = [slow]
+        self.fast = fast
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        time.sleep(self.delays.pop(0) if self.delays else self.fast)
+        return 'online'
+
+
+def main():
+    tts_router.PROBE_EVERY = 0.3
+    online = SlowThenFast()
+    router = TTSRouter(deadline=0.2, urgent_deadline=0.2)
+    router.register('online', online)
+    router.register('offline', lambda text: 'offline', online=False)
+
+    used = []
+    for i in range(12):
+        used.append(router.render(f"Sentence number {i} for the recovery check.")[0])
+        time.sleep(0.5 if i == 0 else 0.1)  # Let the late first call finish: the backend now looks slow
+    stats = router.stats()['online']
+    print(f"Backends used: {used}")
+    print(f"Online stats: {stats}")
+
+    ok = used[:2] == ['offline', 'offline'] and used[-1] == 'online' and stats['skipped'] >= 1 and stats['probes'] >= 1
+    print("✅ Slow-then-fast backend is used again" if ok else "❌ Backend never recovered")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Persistent, content-addressed cache of synthesized speech.
+
+Each utterance is stored once under TTS_CACHE_DIR as <sha256>.mp3, where
+the hash covers the backend, voice, language, TLD and the text (with its
+whitespace collapsed). Greetings and school answers repeat all day, so
+after the first time they play straight from disk, without the network.
+
+- Misses are written to a temporary file and os.replace()d into place, so
+  a crash or power cut never leaves a truncated MP3 behind a valid name.
+- The total size is kept under TTS_CACHE_MB by evicting the least
+  recently used files. Hits bump the file's mtime, so the LRU order
+  survives restarts.
+- StubBackend returns fake audio without the network, so hits, misses and
+  eviction can be exercised offline (see bench_tts_cache.py).
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import metrics
+
+TTS_CACHE_DIR = os.environ.get('OMNIS_TTS_CACHE', 'tts_cache')
+TTS_CACHE_MB = float(os.environ.get('OMNIS_TTS_CACHE_MB', '200'))
+GTTS_TIMEOUT = float(os.environ.get('OMNIS_GTTS_TIMEOUT', '10'))  # Seconds per request; frees stuck router workers
+SUFFIX = '.mp3'
+
+
+class GTTSBackend:
+    """Google TTS over the network (needs the gtts package)."""
+    name = 'gtts'
+
+    def synthesize(self, text, lang='en', tld='com', voice=None):
+        from gtts import gTTS
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang, tld=tld, timeout=GTTS_TIMEOUT).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class StubBackend:
+    """Offline stand-in: deterministic fake audio, optional delay, counts calls."""
+    name = 'stub'
+
+    def __init__(self, delay=0.0, bytes_per_char=200):
+        self.delay = delay
+        self.bytes_per_char = bytes_per_char
+        self.calls = 0
+
+    def synthesize(self, text, lang='en', tld='com', voice=None):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        seed = hashlib.sha256(text.encode('utf-8')).digest()
+        return (seed * (len(text) * self.bytes_per_char // len(seed) + 1))[:max(1, len(text)) * self.bytes_per_char]
+
+
+def cache_key(text, lang='en', tld='com', voice=None, backend='gtts'):
+    text = ' '.join(text.split())
+    raw = '\0'.join((backend, voice or '', lang, tld, text))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, root=TTS_CACHE_DIR, max_bytes=int(TTS_CACHE_MB * 1024 * 1024), backend=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.backend = backend or GTTSBackend()
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size, least recently used first
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        found = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith('.tmp'):
+                try:
+                    os.remove(path)  # Left over from an interrupted write
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[:-len(SUFFIX)], st.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total += size
+        self._evict()
+
+    def path(self, key):
+        return os.path.join(self.root, key + SUFFIX)
+
+    def key(self, text, lang='en', tld='com', voice=None):
+        return cache_key(text, lang, tld, voice, self.backend.name)
+
+    def get(self, text, lang='en', tld='com', voice=None):
+        """Path of the cached audio, or None."""
+        key = self.key(text, lang, tld, voice)
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self.lock:  # Deleted behind our back
+                self.total -= self.entries.pop(key, 0)
+            return None
+        return path
+
+    def put(self, key, data):
+        """Store `data` under `key` atomically. Returns the path."""
+        path = self.path(key)
+        tmp = os.path.join(self.root, f"{key}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            self.total += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            self._evict(keep=key)
+        return path
+
+    def fetch(self, text, lang='en', tld='com', voice=None):
+        """Path of the audio for `text`, synthesizing (and caching) it on a miss."""
+        path = self.get(text, lang, tld, voice)
+        if path is not None:
+            self.hits += 1
+            metrics.inc('tts_cache_hit')
+            return path
+        return self._miss(text, lang, tld, voice)[1]
+
+    def load(self, text, lang='en', tld='com', voice=None):
+        """Audio bytes for `text` (read from the cache, or synthesized and cached)."""
+        path = self.get(text, lang, tld, voice)
+        if path is not None:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.hits += 1
+                metrics.inc('tts_cache_hit')
+                return data
+            except OSError:
+                pass
+        return self._miss(text, lang, tld, voice)[0]
+
+    def _miss(self, text, lang, tld, voice):
+        self.misses += 1
+        metrics.inc('tts_cache_miss')
+        with metrics.timed('tts_synthesis'):
+            data = self.backend.synthesize(text, lang=lang, tld=tld, voice=voice)
+        return data, self.put(self.key(text, lang, tld, voice), data)
+
+    def _evict(self, keep=None):
+        # Caller holds the lock (or is __init__)
+        while self.total > self.max_bytes and self.entries:
+            key, size = next(iter(self.entries.items()))
+            if key == keep:
+                break  # Never evict the entry just written, even if it alone is over budget
+            del self.entries[key]
+            self.total -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+        metrics.set_gauge('tts_cache_bytes', self.total)
+
+
+_cache = None
+
+
+def init_tts_cache(**kwargs):
+    global _cache
+    if _cache is None:
+        _cache = TTSCache(**kwargs)
+    return _cache
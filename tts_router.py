@@ -0,0 +1,199 @@
+"""
+Deadline-aware routing between TTS backends.
+
+The speaker used to pick a voice with a fixed rule: texts under 25
+characters (or containing a "short phrase") went to espeak-ng, everything
+else to gTTS with no time limit. A slow or dead network therefore meant
+silence for as long as gTTS took to fail, and a short text went offline
+even when gTTS was answering in 200 ms.
+
+TTSRouter holds the registered backends in preference order (gTTS first,
+the offline espeak-ng voice last) and tracks each one's latency (EWMA)
+and recent error rate. Every synthesis has a deadline: DEADLINE seconds,
+or URGENT_DEADLINE for urgent and short texts.
+
+- A backend whose expected latency is over the deadline is skipped.
+  Calls that miss the deadline still update the estimate when they finish
+  (a late failure, e.g. the gTTS request timeout, counts as an error, not
+  as a latency sample). While a backend is skipped as too slow, the text
+  is also sent to it in the background at most every PROBE_EVERY seconds;
+  a probe's latency replaces the estimate, so a backend that got fast
+  again is used again.
+- A backend with more than MAX_ERROR_RATE failures over its last
+  ERROR_WINDOW calls is skipped for RETRY_AFTER seconds.
+- Online backends run on a worker thread. If the deadline passes, the
+  next backend is used and the late result still lands in the TTS cache,
+  so the next time the text plays in the good voice.
+- The last backend (offline) has no deadline: it is the floor.
+
+stats() returns the per-backend counters; they are also published as
+tts_<name>_latency_ms / tts_<name>_error_rate gauges and the tts_<name>
+histogram.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import metrics
+
+DEADLINE = float(os.environ.get('OMNIS_TTS_DEADLINE', '2.5'))                # Seconds per sentence
+URGENT_DEADLINE = float(os.environ.get('OMNIS_TTS_URGENT_DEADLINE', '0.4'))  # Urgent and short texts
+SHORT_TEXT = 25        # Characters; shorter texts get URGENT_DEADLINE
+ERROR_WINDOW = 20      # Recent calls the error rate is computed over
+MAX_ERROR_RATE = 0.5
+RETRY_AFTER = 30.0     # Seconds a failing backend is skipped
+PROBE_EVERY = float(os.environ.get('OMNIS_TTS_PROBE_EVERY', '15'))  # Seconds between probes of a slow backend
+EWMA_ALPHA = 0.3
+
+
+class BackendStats:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.latency = None          # EWMA seconds
+        self.recent = deque(maxlen=ERROR_WINDOW)  # True = raised
+        self.down_until = 0.0
+        self.next_probe = 0.0
+        self.probes = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, failed=False):
+        with self.lock:
+            self.calls += 1
+        self._outcome(failed)
+        self.observe(seconds)
+
+    def _outcome(self, failed):
+        with self.lock:
+            self.errors += failed
+            self.recent.append(failed)
+            if len(self.recent) >= 3 and self.error_rate() > MAX_ERROR_RATE:
+                self.down_until = time.monotonic() + RETRY_AFTER
+                self.recent.clear()  # Fresh start after the cool-down
+        metrics.set_gauge(f'tts_{self.name}_error_rate', round(self.error_rate(), 3))
+
+    def timed_out(self):
+        # Not an error (the text may just have been long): the outcome comes in via finished()
+        with self.lock:
+            self.calls += 1
+            self.timeouts += 1
+            self.next_probe = time.monotonic() + PROBE_EVERY  # The late call is the first probe
+
+    def finished(self, future, seconds, probe=False):
+        """Outcome of a call nobody waited for: one that missed its deadline, or a probe."""
+        if future.cancelled() or future.exception() is not None:
+            self._outcome(True)
+        elif probe:
+            self._outcome(False)
+            self.observe(seconds, replace=True)
+        else:
+            self.observe(seconds)
+
+    def observe(self, seconds, replace=False):
+        with self.lock:
+            self.latency = seconds if self.latency is None or replace else \
+                EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.latency
+        metrics.set_gauge(f'tts_{self.name}_latency_ms', round(self.latency * 1000, 1))
+
+    def probe_due(self):
+        """True at most once per PROBE_EVERY seconds while the backend is skipped as too slow."""
+        now = time.monotonic()
+        with self.lock:
+            if now < self.down_until or now < self.next_probe:
+                return False
+            self.next_probe = now + PROBE_EVERY
+            self.calls += 1
+            self.probes += 1
+            return True
+
+    def error_rate(self):
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def usable(self, deadline):
+        """Healthy, and expected to finish within `deadline`."""
+        if time.monotonic() < self.down_until:
+            return False
+        return self.latency is None or self.latency <= deadline
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'skipped': self.skipped,
+                'probes': self.probes,
+                'latency_ms': None if self.latency is None else round(self.latency * 1000, 1),
+                'error_rate': round(self.error_rate(), 3),
+                'down': time.monotonic() < self.down_until,
+            }
+
+
+class TTSRouter:
+    def __init__(self, deadline=DEADLINE, urgent_deadline=URGENT_DEADLINE):
+        self.deadline = deadline
+        self.urgent_deadline = urgent_deadline
+        self.backends = []  # (name, render, online) in preference order
+        self.stats_by_name = {}
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='tts-router')
+
+    def register(self, name, render, online=True):
+        """Add a backend after the existing ones. `render(text)` returns its audio."""
+        self.backends.append((name, render, online))
+        self.stats_by_name[name] = BackendStats(name)
+
+    def deadline_for(self, text, kind='answer'):
+        return self.urgent_deadline if kind == 'urgent' or len(text.strip()) < SHORT_TEXT else self.deadline
+
+    def render(self, text, kind='answer', offline_only=False):
+        """(backend name, audio) from the first backend that delivers in time."""
+        deadline = self.deadline_for(text, kind)
+        last = len(self.backends) - 1
+        error = None
+        for i, (name, render, online) in enumerate(self.backends):
+            stats = self.stats_by_name[name]
+            if i < last and ((online and offline_only) or not stats.usable(deadline)):
+                stats.skipped += 1
+                if online and not offline_only and stats.probe_due():
+                    self._probe(stats, render, text)
+                continue
+            t0 = time.perf_counter()
+            future = None
+            try:
+                if online and i < last:
+                    future = self.pool.submit(render, text)
+                    audio = future.result(timeout=deadline)
+                else:
+                    audio = render(text)
+            except TimeoutError:
+                stats.timed_out()
+                future.add_done_callback(lambda f, s=stats, t0=t0: s.finished(f, time.perf_counter() - t0))
+                metrics.inc(f'tts_{name}_timeout')
+                print(f"[tts] {name} missed the {deadline:.1f}s deadline, falling back")
+                continue
+            except Exception as e:
+                stats.record(time.perf_counter() - t0, failed=True)
+                metrics.inc(f'tts_{name}_error')
+                print(f"[tts] {name} failed ({e}), falling back")
+                error = e
+                continue
+            dt = time.perf_counter() - t0
+            stats.record(dt)
+            metrics.observe(f'tts_{name}', dt)
+            return name, audio
+        raise RuntimeError(f"No TTS backend could speak the text ({error})")
+
+    def _probe(self, stats, render, text):
+        """Try a skipped backend in the background (its audio still lands in the TTS cache)."""
+        t0 = time.perf_counter()
+        self.pool.submit(render, text).add_done_callback(
+            lambda f: stats.finished(f, time.perf_counter() - t0, probe=True))
+        metrics.inc(f'tts_{stats.name}_probe')
+
+    def stats(self):
+        return {name: self.stats_by_name[name].snapshot() for name, _, _ in self.backends}
@@ -0,0 +1,161 @@
+"""
+One recognition loop for every OMNIS front-end.
+
+main.py (OpenCV kiosk), face_app.py / app.py, the PyQt GUI
+(FaceRecognition.FaceRecognitionThread) and headless/streaming setups all
+drive the same VisionEngine: capture -> VisionPipeline -> head tracking ->
+greeting -> output sinks. Front-ends differ only in the sinks they attach
+(see vision_sinks.py), and each sink's cost is recorded separately as the
+`sink_<name>` metric.
+"""
+import threading
+import time
+
+import cv2
+
+import metrics
+from state_bus import bus
+
+
+class FrameResult:
+    """What a sink receives for every captured frame."""
+    __slots__ = ('index', 'frame', 'success', 'refreshed', 'faces', 'greeting', 'speaking', 'visitors',
+                 'margins')
+
+    def __init__(self, index, frame, success, refreshed, faces, greeting, speaking, visitors=(), margins=()):
+        self.index = index          # Frame counter since start
+        self.frame = frame          # Full-size BGR camera frame (pooled buffer: copy to keep)
+        self.success = success      # False when `frame` is the black placeholder
+        self.refreshed = refreshed  # True when recognition ran on this frame
+        self.faces = faces          # [((top, right, bottom, left), id), ...] full-size coords
+        self.greeting = greeting    # Greeting text chosen this frame, or None
+        self.speaking = speaking
+        self.visitors = visitors    # Visitor id per face (None for known faces)
+        self.margins = margins      # Match margin per face (VisionPipeline.match_with_margin)
+
+    @property
+    def ids(self):
+        return [pid for _, pid in self.faces]
+
+
+def open_capture(source=0, width=640, height=480):
+    """cv2.VideoCapture for a camera index/URL, or pass through anything with read()."""
+    if hasattr(source, 'read'):
+        return source
+    cap = cv2.VideoCapture(source)
+    cap.set(3, width)
+    cap.set(4, height)
+    return cap
+
+
+class VisionEngine:
+    def __init__(self, pipeline, source=0, sinks=(), head=None, is_speaking=None,
+                 on_greeting=None, publish_state=True, power=None, governor=None):
+        self.pipeline = pipeline
+        self.source = source
+        self.cap = None
+        self.sinks = list(sinks)
+        self.head = head
+        self.is_speaking = is_speaking or (lambda: False)
+        self.on_greeting = on_greeting      # callable(text, person_id) or None (no greetings)
+        self.publish_state = publish_state  # Mirror ids into the state bus (detected_people)
+        self.power = power                  # power.PowerManager or None (always full speed)
+        self.governor = governor            # governor.ThermalGovernor or None
+        self.stop_event = threading.Event()
+        self.frame_count = 0
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def open(self):
+        if self.cap is None:
+            self.cap = open_capture(self.source, self.pipeline.pool.width, self.pipeline.pool.height)
+        for sink in self.sinks:
+            sink.open()
+        if self.power is not None:
+            self.power.attach(self)
+
+    def close(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"Sink {sink.name} close error: {e}")
+        if self.cap is not None and hasattr(self.cap, 'release'):
+            self.cap.release()
+        self.cap = None
+
+    def step(self) -> bool:
+        """Process one frame. Returns False when a sink asked to stop."""
+        if self.governor is not None:
+            self.governor.apply(self)
+        if self.power is not None:
+            self.power.before_frame()
+        t_frame = time.perf_counter()
+        success, img = self.pipeline.read(self.cap)
+        metrics.observe('capture', time.perf_counter() - t_frame)
+        if not success and self.frame_count % 30 == 0:
+            print("⚠️ Warning: Camera not reading. Check connection.")
+        self.frame_count += 1
+
+        # --- RECOGNITION (every frame_skip frames) ---
+        refreshed = False
+        try:
+            refreshed = self.pipeline.process(img)
+            for stage, seconds in self.pipeline.timings.items():
+                metrics.observe(stage, seconds)
+            if refreshed and self.publish_state:
+                # Shared state for Voice Commands ("Who is here?")
+                bus.update(detected_people=self.pipeline.ids, detected_visitors=self.pipeline.visitor_ids())
+        except Exception as e:
+            print(f"Face Rec Error: {e}")
+
+        speaking = self.is_speaking()
+        if self.power is not None:
+            self.power.update(img if success else None, faces=bool(self.pipeline.ids), speaking=speaking)
+
+        # --- HEAD TRACKING ---
+        if self.head:
+            target = self.pipeline.tracking_target()
+            if target:
+                # Target the first face detected (coordinates in the downscaled frame)
+                cx, cy, small_w, small_h = target
+                self.head.track_face(cx, cy, small_w, small_h)
+
+        # --- GREETING ---
+        greeting = None
+        if self.on_greeting is not None:
+            greeting = self.pipeline.choose_greeting(speaking=speaking)
+            if greeting:
+                self.on_greeting(greeting, self.pipeline.greet_target())
+
+        # --- OUTPUT SINKS ---
+        result = FrameResult(self.frame_count, img, success, refreshed,
+                             self.pipeline.full_size_faces(), greeting, speaking, self.pipeline.visitors,
+                             self.pipeline.margins)
+        keep_going = True
+        for sink in self.sinks:
+            t_sink = time.perf_counter()
+            try:
+                if sink.publish(result) is False:
+                    keep_going = False
+            except Exception as e:
+                print(f"Sink {sink.name} error: {e}")
+            metrics.observe(f'sink_{sink.name}', time.perf_counter() - t_sink)
+        metrics.observe('frame', time.perf_counter() - t_frame)
+        return keep_going
+
+    def run(self):
+        self.open()
+        try:
+            while not self.stop_event.is_set():
+                if not self.step():
+                    break
+        except KeyboardInterrupt:
+            print("Stopping...")
+        finally:
+            self.close()
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,215 @@
+"""
+Face recognition pipeline shared by every front-end (via vision_engine.py)
+and the headless replay harness (replay.py).
+
+Stages per processed frame: downscale -> detect -> encode -> match -> cluster
+(unknown faces get a temporary visitor id, see visitor_clusters.py).
+Tracking and greeting decisions are made from the cached results so both
+front-ends take exactly the same decisions for the same frames.
+"""
+import os
+import pickle
+import time
+
+import numpy as np
+import face_recognition
+
+from frame_buffers import FrameBufferPool
+from visitor_clusters import VisitorClusters, VISITOR_SLOTS
+
+STAGES = ('downscale', 'detect', 'encode', 'match', 'cluster')
+
+# Shared defaults for every front-end (main.py, face_app.py, app.py, gui.py)
+FACE_MATCH_TOLERANCE = float(os.environ.get('FACE_MATCH_TOLERANCE', '0.50'))
+MAX_FACES = int(os.environ.get('FACE_MAX_FACES', '4'))
+FRAME_SKIP = int(os.environ.get('FACE_FRAME_SKIP', '5'))  # Process face every 5 frames
+RESIZE_FACTOR = float(os.environ.get('FACE_RESIZE_FACTOR', '0.20'))
+ENCODINGS_FILE = 'images/encoded_file.p'
+
+
+def load_encodings(path=ENCODINGS_FILE):
+    """Load (encodings, ids) from the pickle written by EncodeGenerator.py."""
+    try:
+        with open(path, 'rb') as f:
+            encode_list_known, studentIds = pickle.load(f)
+        print(f"Loaded {len(studentIds)} people.")
+        return list(encode_list_known), list(studentIds)
+    except Exception as e:
+        print(f"Error loading encodings: {e}")
+        return [], []
+
+
+class VisionPipeline:
+    def __init__(self, known_encodings, known_ids, tolerance=FACE_MATCH_TOLERANCE, max_faces=MAX_FACES,
+                 frame_skip=FRAME_SKIP, resize_factor=RESIZE_FACTOR, width=640, height=480, greeter=None,
+                 clusters=None):
+        self.pool = FrameBufferPool(width, height, resize_factor)
+        self.known_ids = list(known_ids)
+        self.known_id_array = np.array(self.known_ids, dtype=object)
+        if len(known_encodings):
+            self.known_encodings = np.asarray(known_encodings, dtype=np.float64)
+        else:
+            self.known_encodings = np.empty((0, 128), dtype=np.float64)
+        self.tolerance = tolerance
+        self.max_faces = max_faces
+        self.frame_skip = max(1, frame_skip)
+        self.greeter = greeter
+        self.clusters = clusters  # VisitorClusters for unknown faces, or None
+        self.pending_known = []   # (id, encodings) enrolled from other threads, applied before matching
+
+        self.frame_count = 0
+        self.faces = []     # Last detected face locations (small-frame coords)
+        self.ids = []       # Last detected face IDs
+        self.visitors = []  # Temporary visitor id per face ("Visitor 3"), None for known faces
+        self.margins = []   # Distance of each match from the decision boundary (small = shaky)
+        self.timings = {}   # stage -> seconds, for the last processed frame
+
+    def read(self, cap):
+        return self.pool.read(cap)
+
+    def set_resize_factor(self, resize_factor):
+        """Switch the downscale factor (vision thread only; cached faces are dropped)."""
+        self.pool = FrameBufferPool(self.pool.width, self.pool.height, resize_factor)
+        self.faces, self.ids, self.visitors, self.margins = [], [], [], []
+
+    def process(self, img) -> bool:
+        """Run recognition on `img` every `frame_skip` frames.
+
+        Returns True when the cached faces/ids were refreshed this frame.
+        """
+        self.frame_count += 1
+        self.timings = {}
+        if self.frame_count % self.frame_skip != 0:
+            return False
+
+        t0 = time.perf_counter()
+        imgS = self.pool.downscale(img)
+        t1 = time.perf_counter()
+        self.recognize(imgS)
+        self.timings['downscale'] = t1 - t0
+        return True
+
+    def recognize(self, imgS):
+        """Detect -> encode -> match on an already downscaled RGB frame."""
+        if self.pending_known:
+            self._apply_pending_known()
+        t1 = time.perf_counter()
+        face_locs = face_recognition.face_locations(imgS)
+        # Limit faces to prevent lag
+        if len(face_locs) > self.max_faces:
+            face_locs = face_locs[:self.max_faces]
+        t2 = time.perf_counter()
+        face_encs = face_recognition.face_encodings(imgS, face_locs) if face_locs else []
+        t3 = time.perf_counter()
+        matches = [self.match_with_margin(enc) for enc in face_encs]
+        new_ids = [pid for pid, _ in matches]
+        t4 = time.perf_counter()
+        visitors = self.cluster(face_encs, new_ids)
+        t5 = time.perf_counter()
+
+        self.faces = face_locs
+        self.ids = new_ids
+        self.visitors = visitors
+        self.margins = [margin for _, margin in matches]
+        self.timings = {'detect': t2 - t1, 'encode': t3 - t2, 'match': t4 - t3, 'cluster': t5 - t4}
+
+    def match(self, encoding):
+        """Nearest known face within tolerance, else "Unknown"."""
+        return self.match_with_margin(encoding)[0]
+
+    def match_with_margin(self, encoding):
+        """(id, margin) for one encoding.
+
+        For a match, margin is the distance to flipping to "Unknown" or to the
+        next-closest person; for "Unknown", the distance to matching anyone.
+        """
+        if not len(self.known_ids):
+            return "Unknown", None
+        # One distance pass (compare_faces would recompute the same distances)
+        face_dist = np.linalg.norm(self.known_encodings - encoding, axis=1)
+        match_index = int(np.argmin(face_dist))
+        best = float(face_dist[match_index])
+        if best > self.tolerance:
+            return "Unknown", best - self.tolerance
+        person_id = self.known_ids[match_index]
+        margin = self.tolerance - best
+        others = face_dist[self.known_id_array != person_id]
+        if len(others):
+            margin = min(margin, float(others.min()) - best)
+        return person_id, margin
+
+    def add_known(self, person_id, encodings):
+        """Add a person to the live gallery (any thread; takes effect on the next processed frame)."""
+        self.pending_known.append((person_id, [np.asarray(e, dtype=np.float64) for e in encodings]))
+
+    def _apply_pending_known(self):
+        while self.pending_known:
+            person_id, encodings = self.pending_known.pop(0)
+            if not encodings:
+                continue
+            self.known_encodings = np.vstack([self.known_encodings] + [e.reshape(1, -1) for e in encodings])
+            self.known_ids = self.known_ids + [person_id] * len(encodings)
+            self.known_id_array = np.array(self.known_ids, dtype=object)
+
+    def cluster(self, encodings, ids):
+        """Visitor id for each "Unknown" face (None for known faces)."""
+        visitors = [None] * len(ids)
+        unknown = [i for i, pid in enumerate(ids) if pid == "Unknown"]
+        if self.clusters is None or not unknown:
+            return visitors
+        for i, visitor in zip(unknown, self.clusters.assign([encodings[i] for i in unknown])):
+            visitors[i] = visitor
+        return visitors
+
+    def visitor_ids(self):
+        """Temporary ids of the unknown faces currently in view."""
+        return [v for v in self.visitors if v]
+
+    def full_size_faces(self):
+        """Cached faces as (full-size location, id) pairs."""
+        return [(self.pool.scale_back(loc), pid) for loc, pid in zip(self.faces, self.ids)]
+
+    def tracking_target(self):
+        """Centre of the first face in small-frame coords + small frame size, or None."""
+        if not self.faces:
+            return None
+        y1, x2, y2, x1 = self.faces[0]
+        small_w, small_h = self.pool.small_size
+        return (x1 + x2) / 2, (y1 + y2) / 2, small_w, small_h
+
+    def greet_target(self):
+        """Known person to greet (last known face in frame), or None."""
+        person = None
+        for pid in self.ids:
+            if pid != "Unknown":
+                person = pid
+        return person
+
+    def choose_greeting(self, speaking=False):
+        """Greeting text for the current faces, or None. Updates greeter cooldowns."""
+        if self.greeter is None or speaking:
+            return None
+        person = self.greet_target()
+        if person:
+            return self.greeter.get_greeting(person)
+        if "Unknown" not in self.ids:
+            return None
+        visitors = self.visitor_ids()
+        if not visitors:
+            # No clustering: one shared timer for all unknown faces
+            return self.greeter.get_unknown_greeting() if self.greeter.should_greet("Unknown") else None
+        # Each stranger is greeted on their own timer
+        for visitor in visitors:
+            if self.greeter.should_greet_visitor(visitor):
+                return self.greeter.get_unknown_greeting(visitor)
+        return None
+
+
+def build_pipeline(greeter=None, encodings=ENCODINGS_FILE, width=640, height=480, clusters=None):
+    """VisionPipeline with the shared defaults and the known-face gallery loaded."""
+    print("Loading Encoded File...")
+    known_encodings, known_ids = load_encodings(encodings)
+    if clusters is None and VISITOR_SLOTS > 0:
+        clusters = VisitorClusters()
+    return VisionPipeline(known_encodings, known_ids, width=width, height=height, greeter=greeter,
+                          clusters=clusters)
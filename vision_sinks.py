@@ -0,0 +1,185 @@
+"""
+Output sinks for VisionEngine.
+
+A sink receives a FrameResult for every frame and renders it somewhere.
+`publish()` returns False to stop the engine (e.g. 'q' in the kiosk window).
+The PyQt sink lives in FaceRecognition.py and the MJPEG sink in
+mjpeg_server.py so PyQt/http are only imported by the front-ends using them.
+"""
+import os
+import time
+
+import cv2
+import cvzone
+import numpy as np
+
+import metrics
+
+IDLE_REFRESH = 1.0  # Kiosk redraw interval while the power manager is idle
+
+
+class Sink:
+    name = 'sink'
+
+    def open(self):
+        pass
+
+    def publish(self, result):
+        return True
+
+    def set_idle(self, idle):
+        """Power mode changed (power.py): sinks may refresh less while idle."""
+        pass
+
+    def close(self):
+        pass
+
+
+class HeadlessSink(Sink):
+    """No display. Logs when the set of recognised people changes."""
+    name = 'headless'
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.last_ids = None
+
+    def publish(self, result):
+        if result.refreshed:
+            ids = sorted(result.ids)
+            if ids != self.last_ids:
+                self.last_ids = ids
+                if self.verbose:
+                    print(f"👀 In view: {', '.join(ids) if ids else 'nobody'}")
+        return True
+
+
+def load_student_image(faces_dir, person_id, size=(216, 216)):
+    img_path = os.path.join(faces_dir, f'{person_id}.jpg')
+    if not os.path.exists(img_path):
+        return None
+    student_img = cv2.imread(img_path)
+    if student_img is None:
+        return None
+    try:
+        return cv2.resize(student_img, size)
+    except Exception:
+        return None
+
+
+class KioskSink(Sink):
+    """The OpenCV 'Face Attendance' kiosk: camera feed + mode panel + student card."""
+    name = 'kiosk'
+
+    def __init__(self, window_name="Face Attendance", background='Resources/background.png',
+                 modes_dir='Resources/Modes', faces_dir='images/faces', scale=1.0,
+                 position=None, overlay=None):
+        self.window_name = window_name
+        self.background_path = background
+        self.modes_dir = modes_dir
+        self.faces_dir = faces_dir
+        self.scale = scale
+        self.position = position  # (x, y) to move the window to, or None
+        self.overlay = overlay    # Optional callable(background) for extra UI
+        self.background = None
+        self.modes = []
+        self.scaled = None
+        self.student_images = {}  # id -> 216x216 photo (loaded once)
+        self.refresh_interval = 0.0  # Seconds between redraws (0 = every frame, raised while idle)
+        self.last_draw = 0.0
+        self.screen = None  # Last frame shown (read by the MJPEG sink on the same thread)
+
+    def open(self):
+        print("Loading Resources...")
+        try:
+            self.background = cv2.imread(self.background_path)
+            if self.background is None:
+                raise FileNotFoundError(self.background_path)
+            self.modes = [cv2.imread(os.path.join(self.modes_dir, p)) for p in sorted(os.listdir(self.modes_dir))]
+        except Exception as e:
+            print(f"Warning: Could not load background/modes: {e}")
+            self.background = np.zeros((720, 1280, 3), np.uint8)  # Fallback black screen
+            self.modes = []
+
+        self.cam_view = self.background[162:162+480, 55:55+640]
+        self.mode_view = self.background[44:44+633, 808:808+414]
+        self.photo_view = self.background[175:175+216, 909:909+216]
+        if self.scale != 1.0:
+            h, w = self.background.shape[:2]
+            self.scaled = np.zeros((int(h * self.scale), int(w * self.scale), 3), np.uint8)
+
+        cv2.namedWindow(self.window_name)
+        if self.position:
+            cv2.moveWindow(self.window_name, *self.position)
+
+    def student_image(self, person_id):
+        if person_id not in self.student_images:
+            self.student_images[person_id] = load_student_image(self.faces_dir, person_id)
+        return self.student_images[person_id]
+
+    def render(self, result):
+        """Draw `result` onto the kiosk background (in place) and return it."""
+        bg = self.background
+        mode_type = 0
+        try:
+            # Paste webcam feed (copy into preallocated views, no temporaries)
+            np.copyto(self.cam_view, result.frame)
+        except Exception:
+            pass  # Prevent crash if camera size and bg image mismatch
+
+        for (y1, x2, y2, x1), person_id in result.faces:
+            if person_id != "Unknown":
+                mode_type = 1
+            else:
+                cv2.rectangle(bg, (55+x1, 162+y1), (55+x2, 162+y2), (0, 0, 255), 2)
+
+        if self.modes:
+            try:
+                np.copyto(self.mode_view, self.modes[min(mode_type, len(self.modes) - 1)])
+            except Exception:
+                pass
+
+        for (y1, x2, y2, x1), person_id in result.faces:
+            if person_id == "Unknown":
+                continue
+            # Known Face
+            bbox = (55+x1, 162+y1, x2 - x1, y2 - y1)
+            cvzone.cornerRect(bg, bbox=bbox, rt=0)
+
+            # UI: Name
+            (w, h), _ = cv2.getTextSize(person_id, cv2.FONT_HERSHEY_COMPLEX, 1, 1)
+            offset = (414 - w) / 2
+            cv2.putText(bg, str(person_id), (808 + int(offset), 445), cv2.FONT_HERSHEY_COMPLEX, 1, (50, 50, 50), 1)
+
+            # UI: Image (cached, already 216x216)
+            student_img = self.student_image(person_id)
+            if student_img is not None:
+                np.copyto(self.photo_view, student_img)
+
+        if self.overlay is not None:
+            self.overlay(bg)
+        return bg
+
+    def set_idle(self, idle):
+        self.refresh_interval = IDLE_REFRESH if idle else 0.0
+
+    def publish(self, result):
+        t0 = time.perf_counter()
+        if self.refresh_interval and t0 - self.last_draw < self.refresh_interval:
+            # Idle: keep the window responsive but skip the redraw
+            return cv2.waitKey(1) != ord('q')
+        self.last_draw = t0
+        bg = self.render(result)
+        output = bg
+        if self.scaled is not None:
+            output = cv2.resize(bg, (self.scaled.shape[1], self.scaled.shape[0]), dst=self.scaled)
+        t1 = time.perf_counter()
+        self.screen = output
+
+        cv2.imshow(self.window_name, output)
+        key = cv2.waitKey(1)
+        metrics.observe('draw', t1 - t0)
+        metrics.observe('display', time.perf_counter() - t1)
+        return key != ord('q')
+
+    def close(self):
+        cv2.destroyAllWindows()
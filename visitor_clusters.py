@@ -0,0 +1,145 @@
+"""
+Online clustering of "Unknown" faces.
+
+Every unknown encoding is assigned to the nearest visitor cluster within
+tolerance, or opens a new one. Each cluster has a stable temporary id
+("Visitor 7") that greetings, "who is here" counts and enrollment can key
+on, instead of lumping all strangers together as "Unknown".
+
+The number of clusters is bounded: centroids live in one preallocated
+(slots, 128) array and the least recently seen cluster is evicted when a
+new visitor arrives and every slot is taken. Assigning a face is a single
+distance pass over at most `slots` rows, so the per-face cost does not
+grow with the number of visitors seen over the day.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import metrics
+
+VISITOR_SLOTS = int(os.environ.get('FACE_VISITOR_SLOTS', '64'))  # 0 disables clustering
+# Same default as FACE_MATCH_TOLERANCE (vision_pipeline.py)
+VISITOR_TOLERANCE = float(os.environ.get('FACE_VISITOR_TOLERANCE', os.environ.get('FACE_MATCH_TOLERANCE', '0.50')))
+MAX_SAMPLES = 8    # Encodings kept per visitor for enrollment
+MAX_WEIGHT = 20    # Centroid becomes a moving average after this many sightings
+
+
+class VisitorClusters:
+    def __init__(self, slots=VISITOR_SLOTS, tolerance=VISITOR_TOLERANCE, clock=time.time):
+        self.slots = max(1, slots)
+        self.tolerance = tolerance
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.centroids = np.zeros((self.slots, 128), dtype=np.float64)
+        self.active = np.zeros(self.slots, dtype=bool)
+        self.counts = np.zeros(self.slots, dtype=np.int64)
+        self.last_used = np.zeros(self.slots, dtype=np.int64)  # Assignment tick, for LRU
+        self.first_seen = np.zeros(self.slots, dtype=np.float64)
+        self.last_seen = np.zeros(self.slots, dtype=np.float64)
+        self.samples = [deque(maxlen=MAX_SAMPLES) for _ in range(self.slots)]
+        self.slot_ids = [None] * self.slots
+        self.slot_of = {}  # visitor id -> slot
+
+        self.tick = 0
+        self.next_id = 1
+        self.created = 0
+        self.evicted = 0
+
+    def assign(self, encodings):
+        """Visitor id for each unknown encoding of one frame (distinct faces never share a cluster)."""
+        ids = []
+        with self.lock:
+            self.tick += 1
+            now = self.clock()
+            taken = []
+            for enc in encodings:
+                enc = np.asarray(enc, dtype=np.float64)
+                slot = self._nearest(enc, taken)
+                if slot is None:
+                    slot = self._open(enc, now)
+                else:
+                    self._update(slot, enc, now)
+                taken.append(slot)
+                ids.append(self.slot_ids[slot])
+        return ids
+
+    def _nearest(self, enc, taken):
+        if not self.active.any():
+            return None
+        dist = np.linalg.norm(self.centroids - enc, axis=1)
+        dist[~self.active] = np.inf
+        if taken:
+            dist[taken] = np.inf
+        slot = int(np.argmin(dist))
+        return slot if dist[slot] <= self.tolerance else None
+
+    def _open(self, enc, now):
+        free = np.flatnonzero(~self.active)
+        if len(free):
+            slot = int(free[0])
+        else:
+            # Evict the least recently seen visitor
+            slot = int(np.argmin(self.last_used))
+            del self.slot_of[self.slot_ids[slot]]
+            self.evicted += 1
+            metrics.inc('visitor_evictions')
+        visitor_id = f"Visitor {self.next_id}"
+        self.next_id += 1
+        self.created += 1
+
+        self.centroids[slot] = enc
+        self.active[slot] = True
+        self.counts[slot] = 1
+        self.last_used[slot] = self.tick
+        self.first_seen[slot] = self.last_seen[slot] = now
+        self.samples[slot].clear()
+        self.samples[slot].append(enc.copy())
+        self.slot_ids[slot] = visitor_id
+        self.slot_of[visitor_id] = slot
+        return slot
+
+    def _update(self, slot, enc, now):
+        self.counts[slot] += 1
+        weight = min(self.counts[slot], MAX_WEIGHT)
+        self.centroids[slot] += (enc - self.centroids[slot]) / weight
+        self.last_used[slot] = self.tick
+        self.last_seen[slot] = now
+        self.samples[slot].append(enc.copy())
+
+    def encodings(self, visitor_id):
+        """Recent encodings of `visitor_id` (for enrollment), or []."""
+        with self.lock:
+            slot = self.slot_of.get(visitor_id)
+            return [] if slot is None else list(self.samples[slot])
+
+    def info(self, visitor_id):
+        with self.lock:
+            slot = self.slot_of.get(visitor_id)
+            if slot is None:
+                return None
+            return {
+                'sightings': int(self.counts[slot]),
+                'first_seen': float(self.first_seen[slot]),
+                'last_seen': float(self.last_seen[slot]),
+            }
+
+    def forget(self, visitor_id):
+        """Drop a visitor (e.g. once enrolled under a real name)."""
+        with self.lock:
+            slot = self.slot_of.pop(visitor_id, None)
+            if slot is not None:
+                self.active[slot] = False
+                self.slot_ids[slot] = None
+                self.samples[slot].clear()
+
+    def active_ids(self):
+        with self.lock:
+            return list(self.slot_of)
+
+    def __len__(self):
+        return len(self.slot_of)